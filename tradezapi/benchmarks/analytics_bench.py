@@ -0,0 +1,106 @@
+"""
+Timing of the portfolio analytics engine, end to end on an in-memory SQLite database.
+
+Stores Y years of synthetic trading-day closes for N holdings of one user plus the SPY
+benchmark as PriceBar rows (day by day, as daily ingests append them) and packs each
+stock's PriceSeries, as ingest_price_history does. Then times each step of
+GET /api/portfolios/me/analytics/ on its own: load_price_matrix(), the vectorized
+analytics, and portfolio_analytics() as the view calls it. For comparison it also times
+the loads from PriceBar: the aggregated query used for stocks without a series, and
+fetching (date, stock_id, close) rows through the ORM and pivoting them.
+
+    python -m benchmarks.analytics_bench --holdings 500 --years 10
+"""
+import argparse
+import datetime
+import json
+import time
+import numpy as np
+from .django_setup import setup_django
+
+setup_django()
+
+from django.core.management import call_command  # noqa: E402
+from tradez.analytics import (  # noqa: E402
+    TRADING_DAYS, _bar_columns, _pivot, build_price_matrix, compute_analytics, load_price_matrix,
+    pack_price_series, portfolio_analytics,
+)
+from tradez.models import Portfolio, PriceBar, Stock  # noqa: E402
+from users.models import User  # noqa: E402
+
+
+def synthetic_rows(holdings, days, seed=0):
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0.0004, 0.02, size=(days, holdings + 1))
+    closes = 100 * np.cumprod(1 + returns, axis=0)
+    start = datetime.date(2000, 1, 3)
+    dates = [start + datetime.timedelta(days=i) for i in range(days)]
+    return [(dates[d], s, float(closes[d, s])) for d in range(days) for s in range(holdings + 1)]
+
+
+def seed(holdings, days):
+    """A user holding `holdings` stocks, their closes and SPY's: (user, stock ids, SPY last)."""
+    stocks = Stock.objects.bulk_create([
+        Stock(symbol=f'S{i:05d}' if i < holdings else 'SPY', company_name=f'Stock {i}', purchase=100,
+              last_div=0, industry='Tech', market_cap=1)
+        for i in range(holdings + 1)
+    ])
+    stock_ids = [stock.id for stock in stocks]
+    PriceBar.objects.bulk_create(
+        (PriceBar(stock_id=stock_ids[s], date=d, open=close, high=close, low=close, close=close)
+         for d, s, close in synthetic_rows(holdings, days)),
+        batch_size=5000,
+    )
+    user = User.objects.create(username='bench', email='bench@example.com')
+    Portfolio.objects.bulk_create([Portfolio(user=user, stock_id=stock_id) for stock_id in stock_ids[:-1]])
+    for stock_id in stock_ids:
+        pack_price_series(stock_id)
+    return user, stock_ids
+
+
+def best_of(func, repeat):
+    """Fastest of `repeat` runs (seconds) and the last result."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--holdings', type=int, default=500)
+    parser.add_argument('--years', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    days = args.years * TRADING_DAYS
+    call_command('migrate', verbosity=0)
+    user, stock_ids = seed(args.holdings, days)
+    bars = PriceBar.objects.filter(stock_id__in=stock_ids)
+
+    load_s, (dates, prices) = best_of(lambda: load_price_matrix(stock_ids), args.repeat)
+    aggregated_s, (_, aggregated) = best_of(lambda: _pivot(*_bar_columns(stock_ids), stock_ids), args.repeat)
+    fetch_s, rows = best_of(lambda: list(bars.values_list('date', 'stock_id', 'close')), args.repeat)
+    pivot_s, (_, row_prices) = best_of(lambda: build_price_matrix(rows, stock_ids), args.repeat)
+    assert len(dates) == days and np.array_equal(prices, row_prices) and np.allclose(aggregated, prices, rtol=1e-12)
+    analytics_s, _ = best_of(lambda: compute_analytics(prices[:, :-1], benchmark=prices[:, -1]), args.repeat)
+    end_to_end_s, result = best_of(lambda: portfolio_analytics(user), args.repeat)
+    assert result['observations'] == days - 1 and result['benchmark'] == 'SPY'
+    print(json.dumps({
+        'holdings': args.holdings,
+        'trading_days': days,
+        'rows': len(rows),
+        'load_price_matrix_s': round(load_s, 4),
+        'analytics_s': round(analytics_s, 4),
+        'portfolio_analytics_s': round(end_to_end_s, 4),
+        'from_price_bars': {
+            'aggregated_load_s': round(aggregated_s, 4),
+            'row_fetch_s': round(fetch_s, 4),
+            'row_pivot_s': round(pivot_s, 4),
+        },
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Throughput of the bulk stock endpoints (validation + write), in rows per second.
+
+Calls StockBulkAPIView directly through DRF's request factory against a migrated
+in-memory SQLite database (or the database in DATABASE_URL-style settings if you adapt
+django_setup), so HTTP overhead is excluded.
+
+    python -m benchmarks.bulk_bench --rows 10000
+"""
+import argparse
+import json
+import time
+from .django_setup import setup_django
+
+setup_django(BULK_MAX_ITEMS=1_000_000)
+
+from django.core.management import call_command  # noqa: E402
+from rest_framework.test import APIRequestFactory, force_authenticate  # noqa: E402
+from tradez.models import Stock  # noqa: E402
+from tradez.views import StockBulkAPIView  # noqa: E402
+from users.models import User  # noqa: E402
+
+
+def stock_rows(count, prefix):
+    return [
+        {'symbol': f'{prefix}{i}', 'company_name': f'Company {i}', 'purchase': '12.34',
+         'last_div': '0.50', 'industry': 'Tech', 'market_cap': 1_000_000 + i}
+        for i in range(count)
+    ]
+
+
+def timed(view, request):
+    started = time.perf_counter()
+    response = view(request)
+    elapsed = time.perf_counter() - started
+    assert response.status_code in (200, 201), response.data
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=10000)
+    args = parser.parse_args()
+    call_command('migrate', verbosity=0)
+    user = User.objects.create_user(username='bench', password='x')
+    factory = APIRequestFactory()
+    view = StockBulkAPIView.as_view()
+
+    def request(method, path, body, content_type='application/json'):
+        req = getattr(factory, method)(path, body, content_type=content_type)
+        force_authenticate(req, user=user)
+        return req
+
+    results = {}
+    rows = stock_rows(args.rows, 'J')
+    results['create_json'] = timed(view, request('post', '/api/stocks/bulk/', json.dumps(rows)))
+    ndjson = '\n'.join(json.dumps(row) for row in stock_rows(args.rows, 'N'))
+    results['create_ndjson'] = timed(view, request('post', '/api/stocks/bulk/', ndjson, 'application/x-ndjson'))
+    results['upsert'] = timed(view, request('post', '/api/stocks/bulk/?upsert=true', json.dumps(rows)))
+    ids = list(Stock.objects.filter(symbol__startswith='J').values_list('id', flat=True))
+    updates = [{'id': pk, 'purchase': '13.00'} for pk in ids]
+    results['update'] = timed(view, request('patch', '/api/stocks/bulk/', json.dumps(updates)))
+    results['delete'] = timed(view, request('delete', '/api/stocks/bulk/', json.dumps(ids)))
+    print(json.dumps({
+        'rows': args.rows,
+        **{name: {'seconds': round(t, 3), 'rows_per_second': round(args.rows / t)} for name, t in results.items()},
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""
+Compare two JSON benchmark reports metric by metric.
+
+Prints every numeric value present in both reports (nested keys joined with dots, the
+run's "config" left out) with its relative change, so a run before and after a change
+can be diffed:
+
+    python -m benchmarks.load_bench --output before.json
+    python -m benchmarks.load_bench --output after.json
+    python -m benchmarks.compare before.json after.json
+"""
+import argparse
+import json
+
+
+def flatten(report, prefix=''):
+    """{'a.b': number} for every numeric leaf of a nested report."""
+    values = {}
+    for key, value in report.items():
+        name = f'{prefix}{key}'
+        if isinstance(value, dict):
+            values.update(flatten(value, name + '.'))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            values[name] = value
+    return values
+
+
+def compare(before, after):
+    """{metric: {'before', 'after', 'change_percent'}} over the metrics both reports have."""
+    before = flatten({k: v for k, v in before.items() if k != 'config'})
+    after = flatten({k: v for k, v in after.items() if k != 'config'})
+    return {
+        name: {
+            'before': before[name],
+            'after': after[name],
+            'change_percent': round((after[name] - before[name]) / before[name] * 100, 1) if before[name] else None,
+        }
+        for name in before if name in after
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('before')
+    parser.add_argument('after')
+    args = parser.parse_args()
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+    print(json.dumps(compare(before, after), indent=2))
+
+
+if __name__ == '__main__':
+    main()
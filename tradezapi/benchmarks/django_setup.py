@@ -0,0 +1,26 @@
+import django
+from django.conf import settings
+
+# Minimal Django configuration for benchmarks that only need the ORM models importable
+# (and, if they want, an in-memory SQLite database).
+
+
+def setup_django(**overrides):
+    """Configure Django once; `overrides` are extra or replacement settings."""
+    if not settings.configured:
+        settings.configure(**{
+            'INSTALLED_APPS': ['django.contrib.contenttypes', 'django.contrib.auth', 'users', 'tradez'],
+            'AUTH_USER_MODEL': 'users.User',
+            'SECRET_KEY': 'benchmarks-only-secret-key',  # SimpleJWT reads it on import
+            'DATABASES': {'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'}},
+            'USE_TZ': True,
+            'TIME_ZONE': 'UTC',  # as in tradezapi.settings; Django's default is America/Chicago
+            'CACHES': {
+                'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+                'responses': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'responses'},
+            },
+            'RESPONSE_CACHE_ENABLED': True,
+            'HTTP_CACHE_MAX_AGE': 0,
+            **overrides,
+        })
+        django.setup()
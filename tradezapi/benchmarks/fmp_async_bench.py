@@ -0,0 +1,59 @@
+"""
+Throughput of the sync FMPClient vs the AsyncFMPClient against a local FMP stub.
+
+Each request asks for a distinct symbol so nothing is served from the cache. The sync
+path models one worker thread (requests are serialized behind each upstream call); the
+async path issues the same requests from a single event loop.
+
+    python -m benchmarks.fmp_async_bench --requests 500 --latency 0.05
+"""
+import argparse
+import asyncio
+import json
+import time
+from tradez.fmp import FMPClient, LocalLRUCache
+from tradez.fmp_async import AsyncFMPClient
+from .fmp_stub import start_stub
+
+
+def run_sync(base_url, n):
+    client = FMPClient(api_key='bench', base_url=base_url, cache=LocalLRUCache(maxsize=n))
+    start = time.perf_counter()
+    for i in range(n):
+        client.get_stock_quote(f'SYNC{i}')
+    elapsed = time.perf_counter() - start
+    client.close()
+    return elapsed
+
+
+async def _run_async(base_url, n):
+    client = AsyncFMPClient(api_key='bench', base_url=base_url, cache=LocalLRUCache(maxsize=n))
+    start = time.perf_counter()
+    await asyncio.gather(*(client.get_stock_quote(f'ASYNC{i}') for i in range(n)))
+    elapsed = time.perf_counter() - start
+    await client.aclose()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--latency', type=float, default=0.05, help='stub upstream latency in seconds')
+    args = parser.parse_args()
+    stub, base_url = start_stub(latency=args.latency)
+    try:
+        sync_elapsed = run_sync(base_url, args.requests)
+        async_elapsed = asyncio.run(_run_async(base_url, args.requests))
+    finally:
+        stub.terminate()
+    print(json.dumps({
+        'requests': args.requests,
+        'upstream_latency_s': args.latency,
+        'sync_rps': round(args.requests / sync_elapsed, 1),
+        'async_rps': round(args.requests / async_elapsed, 1),
+        'speedup': round(sync_elapsed / async_elapsed, 1),
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
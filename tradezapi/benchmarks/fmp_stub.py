@@ -0,0 +1,53 @@
+import asyncio
+import json
+import multiprocessing
+import socket
+
+# Local FMP stand-in for benchmarks: answers GET /api/v3/quote/<SYM[,SYM...]> after a
+# fixed delay. It is an asyncio server in its own process, so it can hold thousands of
+# concurrent keep-alive connections without competing with the client for the GIL.
+
+
+async def _handle(reader, writer, latency):
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            # Skip headers; benchmark clients never send a body with GET
+            while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                pass
+            path = request_line.split()[1].decode().split('?', 1)[0]
+            symbols = path.rsplit('/', 1)[-1].split(',')
+            await asyncio.sleep(latency)
+            body = json.dumps([{'symbol': s, 'price': 100.0 + i} for i, s in enumerate(symbols)]).encode()
+            writer.write(
+                b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n'
+                + f'Content-Length: {len(body)}\r\n\r\n'.encode() + body
+            )
+            await writer.drain()
+    except (ConnectionError, IndexError):
+        pass
+    finally:
+        writer.close()
+
+
+def _serve(sock, latency):
+    async def main():
+        server = await asyncio.start_server(lambda r, w: _handle(r, w, latency), sock=sock, backlog=4096)
+        async with server:
+            await server.serve_forever()
+    asyncio.run(main())
+
+
+def start_stub(latency=0.05):
+    """Start the stub in a child process; returns (process, base_url ending in /api/v3/)."""
+    sock = socket.socket()
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(('127.0.0.1', 0))
+    sock.listen(4096)  # accept (queue) connections before the child's loop is up
+    port = sock.getsockname()[1]
+    process = multiprocessing.get_context('fork').Process(target=_serve, args=(sock, latency), daemon=True)
+    process.start()
+    sock.close()
+    return process, f'http://127.0.0.1:{port}/api/v3/'
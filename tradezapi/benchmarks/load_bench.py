@@ -0,0 +1,202 @@
+"""
+Scripted load scenario against a running server: login -> list -> portfolio summary.
+
+By default it seeds a fresh SQLite database (benchmarks.seed scale options), starts the
+FMP stub and `manage.py runserver` on it (--server-cmd runs something else, e.g.
+gunicorn or uvicorn), and drives it with --concurrency virtual users for --duration
+seconds. Each virtual user logs in as its own bench<i> user, then repeats
+    GET /api/stocks/ -> GET /api/portfolios/ -> GET /api/portfolios/me/summary/
+    -> GET /api/portfolios/me/valuation/ (live prices, from the stub)
+logging in again every --iterations-per-login rounds. Reports throughput and
+p50/p95/p99 latency per step as JSON (compare two runs with benchmarks.compare).
+
+    python -m benchmarks.load_bench --concurrency 20 --duration 30 --output run.json
+    python -m benchmarks.load_bench --url http://staging:8000   # already seeded with benchmarks.seed
+"""
+import argparse
+import contextlib
+import json
+import os
+import shlex
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import requests
+from .fmp_stub import start_stub
+from .seed import PASSWORD, add_scale_arguments
+from .stats import summarize
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # holds manage.py
+SERVER_CMD = '{python} manage.py runserver --noreload {host}:{port}'
+PAGE_SIZE = 20
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _wait_until_up(url, process, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'server exited with status {process.returncode}')
+        try:
+            requests.get(url + '/api/stocks/', timeout=1)  # 401 is fine: it is serving
+            return
+        except requests.ConnectionError:
+            time.sleep(0.2)
+    raise RuntimeError(f'server did not start within {timeout}s')
+
+
+@contextlib.contextmanager
+def local_server(args, workdir):
+    """Seed a SQLite database, start the FMP stub and the server; yields the base URL."""
+    env = {
+        **os.environ,
+        'DB_ENGINE': 'sqlite',
+        'DB_NAME': os.path.join(workdir, 'load_bench.sqlite3'),
+        'SECRET_KEY': os.environ.get('SECRET_KEY') or 'load-bench-secret-key-not-for-production-use',
+        'FMP_KEY': 'bench',
+        'THROTTLE_ENABLED': 'False',  # virtual users exceed the per-user quote budget by design
+    }
+    seed = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.seed', '--migrate', '--users', str(args.users), '--stocks', str(args.stocks),
+         '--holdings', str(args.holdings), '--comments', str(args.comments), '--seed', str(args.seed)],
+        env=env, cwd=PROJECT_DIR, check=True, capture_output=True, text=True,
+    )
+    stub, fmp_url = start_stub(args.fmp_latency)
+    port = _free_port()
+    command = args.server_cmd.format(python=shlex.quote(sys.executable), host='127.0.0.1', port=port)
+    log_path = os.path.join(workdir, 'server.log')
+    with open(log_path, 'w') as log:
+        server = subprocess.Popen(shlex.split(command), env={**env, 'FMP_BASE_URL': fmp_url},
+                                  cwd=PROJECT_DIR, stdout=log, stderr=log)
+    url = f'http://127.0.0.1:{port}'
+    try:
+        try:
+            _wait_until_up(url, server)
+        except RuntimeError as e:
+            with open(log_path) as log:
+                raise RuntimeError(f'{e}:\n{log.read()[-2000:]}') from None
+        yield url, json.loads(seed.stdout)
+    finally:
+        server.terminate()
+        server.wait(10)
+        stub.terminate()
+
+
+class VirtualUser(threading.Thread):
+    """One client session running the scenario in a loop until `stop_at`."""
+    def __init__(self, url, username, stop_at, iterations_per_login, record):
+        super().__init__(daemon=True)
+        self.url = url
+        self.username = username
+        self.stop_at = stop_at
+        self.iterations_per_login = iterations_per_login
+        self.record = record
+        self.session = requests.Session()
+
+    def request(self, step, method, path, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, self.url + path, timeout=30, **kwargs)
+            ok = response.status_code < 400
+        except requests.RequestException:
+            response, ok = None, False
+        self.record(step, time.perf_counter() - started, ok)
+        return response if ok else None
+
+    def login(self):
+        self.session.headers.pop('Authorization', None)
+        response = self.request('login', 'POST', '/api/auth/token/',
+                                json={'username': self.username, 'password': PASSWORD})
+        if response is not None:
+            self.session.headers['Authorization'] = f"Bearer {response.json()['access']}"
+        return response is not None
+
+    def run(self):
+        while time.monotonic() < self.stop_at:
+            if not self.login():
+                time.sleep(0.1)  # do not spin on a failing login
+                continue
+            for _ in range(self.iterations_per_login):
+                if time.monotonic() >= self.stop_at:
+                    return
+                self.request('stock_list', 'GET', f'/api/stocks/?page_size={PAGE_SIZE}')
+                self.request('portfolio_list', 'GET', f'/api/portfolios/?page_size={PAGE_SIZE}')
+                self.request('portfolio_summary', 'GET', '/api/portfolios/me/summary/')
+                self.request('portfolio_valuation', 'GET', '/api/portfolios/me/valuation/')
+
+
+def run_scenario(url, concurrency, duration, users, iterations_per_login):
+    samples = {}  # step -> [seconds]
+    errors = {}
+    lock = threading.Lock()
+
+    def record(step, seconds, ok):
+        with lock:
+            samples.setdefault(step, []).append(seconds)
+            if not ok:
+                errors[step] = errors.get(step, 0) + 1
+
+    started = time.monotonic()
+    clients = [
+        VirtualUser(url, f'bench{i % users}', started + duration, iterations_per_login, record)
+        for i in range(concurrency)
+    ]
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+    elapsed = time.monotonic() - started
+    every = [seconds for step_samples in samples.values() for seconds in step_samples]
+    return {
+        'elapsed_s': round(elapsed, 3),
+        'requests': len(every),
+        'errors': sum(errors.values()),
+        'total': summarize(every, elapsed),
+        'steps': {
+            step: {**summarize(step_samples, elapsed), 'errors': errors.get(step, 0)}
+            for step, step_samples in samples.items()
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    add_scale_arguments(parser)
+    parser.add_argument('--concurrency', type=int, default=10, help='virtual users')
+    parser.add_argument('--duration', type=float, default=20, help='seconds')
+    parser.add_argument('--iterations-per-login', type=int, default=10)
+    parser.add_argument('--fmp-latency', type=float, default=0.05, help='seconds the FMP stub waits per call')
+    parser.add_argument('--server-cmd', default=SERVER_CMD,
+                        help='command starting the server; {python}, {host} and {port} are substituted')
+    parser.add_argument('--url', help='use this running (and seeded) server instead of starting one')
+    parser.add_argument('--output', help='also write the report to this file')
+    args = parser.parse_args()
+
+    config = {'concurrency': args.concurrency, 'duration_s': args.duration,
+              'iterations_per_login': args.iterations_per_login}
+    if args.url:
+        report = {'config': {**config, 'url': args.url},
+                  **run_scenario(args.url.rstrip('/'), args.concurrency, args.duration, args.users,
+                                 args.iterations_per_login)}
+    else:
+        with tempfile.TemporaryDirectory() as workdir, local_server(args, workdir) as (url, scale):
+            report = {'config': {**config, 'server_cmd': args.server_cmd, 'fmp_latency_s': args.fmp_latency},
+                      'scale': scale,
+                      **run_scenario(url, args.concurrency, args.duration, args.users, args.iterations_per_login)}
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""
+Login throughput per core of the password hashers, inline and through the hashing pool.
+
+For each hasher (PBKDF2 at --iterations, plus Argon2 and bcrypt when argon2-cffi / bcrypt
+are installed), --concurrency threads check a user's password, which is what a login
+costs in CPU, for --duration seconds. This runs twice: once with Django's own hasher on the
+calling threads, and once through the bounded pool of users.hashers with --workers threads
+and room for --queue waiting hashes. Reports logins per second, per core and latency, and
+how many pooled checks were turned away (503) because the queue was full.
+
+    python -m benchmarks.login_bench --concurrency 32 --workers 4 --duration 5
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from .django_setup import setup_django
+from .stats import summarize
+
+setup_django(
+    PASSWORD_PBKDF2_ITERATIONS=1000000, PASSWORD_ARGON2_TIME_COST=2, PASSWORD_ARGON2_MEMORY_COST=102400,
+    PASSWORD_ARGON2_PARALLELISM=8, PASSWORD_BCRYPT_ROUNDS=12, PASSWORD_HASHING_WORKERS=1, PASSWORD_HASHING_QUEUE=16,
+)
+
+from django.conf import settings  # noqa: E402
+from django.contrib.auth import hashers  # noqa: E402
+from django.test import override_settings  # noqa: E402
+from users.hashers import PasswordHashingBusy  # noqa: E402
+from users.models import User  # noqa: E402
+
+
+class InlinePBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    """Django's PBKDF2 hasher, at the --iterations of the pooled one."""
+    @property
+    def iterations(self):
+        return settings.PASSWORD_PBKDF2_ITERATIONS
+
+
+HASHERS = {
+    # name: (hasher on the calling thread, the pooled one, library it needs); same costs
+    'pbkdf2': (f'{__name__}.InlinePBKDF2PasswordHasher', 'users.hashers.PBKDF2PasswordHasher', None),
+    'argon2': ('django.contrib.auth.hashers.Argon2PasswordHasher', 'users.hashers.Argon2PasswordHasher', 'argon2'),
+    'bcrypt': ('django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+               'users.hashers.BCryptSHA256PasswordHasher', 'bcrypt'),
+}
+PASSWORD = 'bench-password'
+
+
+def installed(module):
+    try:
+        __import__(module)
+    except ImportError:
+        return False
+    return True
+
+
+def run_logins(concurrency, duration):
+    """`concurrency` threads logging in for `duration` seconds: (latencies, rejected, elapsed)."""
+    user = User(username='bench')
+    user.set_password(PASSWORD)
+    latencies, rejected = [], []
+    deadline = time.perf_counter() + duration
+
+    def client():
+        times, refused = [], 0
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                assert user.check_password(PASSWORD)
+            except PasswordHashingBusy:
+                refused += 1
+                time.sleep(0.01)  # a client honouring Retry-After would wait longer
+                continue
+            times.append(time.perf_counter() - started)
+        latencies.extend(times)
+        rejected.append(refused)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, sum(rejected), time.perf_counter() - started
+
+
+def measure(hasher, concurrency, duration, cores):
+    with override_settings(PASSWORD_HASHERS=[hasher]):
+        latencies, rejected, elapsed = run_logins(concurrency, duration)
+    summary = summarize(latencies, elapsed)
+    summary['logins_per_core_per_s'] = round(summary.get('throughput_per_s', 0) / cores, 1)
+    summary['rejected'] = rejected
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--hashers', default='pbkdf2,argon2,bcrypt')
+    parser.add_argument('--iterations', type=int, default=1000000, help='PBKDF2 iterations')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--queue', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=5)
+    args = parser.parse_args()
+    cpus = os.cpu_count() or 1
+    report = {'config': {**vars(args), 'cpus': cpus}}
+    with override_settings(PASSWORD_PBKDF2_ITERATIONS=args.iterations,
+                           PASSWORD_HASHING_WORKERS=args.workers, PASSWORD_HASHING_QUEUE=args.queue):
+        for name in args.hashers.split(','):
+            django_hasher, pooled_hasher, library = HASHERS[name]
+            if library and not installed(library):
+                report[name] = {'skipped': f'{library} is not installed'}
+                continue
+            report[name] = {
+                'inline': measure(django_hasher, args.concurrency, args.duration, cpus),
+                'pooled': measure(pooled_hasher, args.concurrency, args.duration, min(args.workers, cpus)),
+            }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
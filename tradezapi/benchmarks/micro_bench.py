@@ -0,0 +1,94 @@
+"""
+Micro-benchmarks of the serializers and read views over seeded synthetic data.
+
+Seeds an in-memory SQLite database (see benchmarks.seed for the scale options), then
+times each serializer on a page of rows and each read view called through DRF's request
+factory (rendered to JSON, no HTTP), with the response cache off (the full view) and on
+(a cache hit).
+
+    python -m benchmarks.micro_bench --stocks 5000 --repeat 200
+"""
+import argparse
+import json
+import time
+from .django_setup import setup_django
+from .seed import add_scale_arguments, seed
+from .stats import summarize
+
+setup_django(ALLOWED_HOSTS=['*'], DB_REPLICA_CACHE_TIMEOUT=5, REQUEST_PROFILING=False)
+
+from django.core.management import call_command  # noqa: E402
+from django.test import override_settings  # noqa: E402
+from rest_framework.test import APIRequestFactory, force_authenticate  # noqa: E402
+from tradez.models import Stock, Portfolio, Comment  # noqa: E402
+from tradez.serializers import StockSerializer, PortfolioSerializer, CommentSerializer  # noqa: E402
+from tradez.views import (  # noqa: E402
+    StockListCreateAPIView, StockDetailAPIView, PortfolioListCreateAPIView,
+    PortfolioSummaryAPIView, CommentListCreateAPIView,
+)
+from users.models import User  # noqa: E402
+
+
+def timed(func, repeat):
+    """Per-call durations of `repeat` calls of func(), after one untimed warm-up call."""
+    func()
+    samples = []
+    started = time.perf_counter()
+    for _ in range(repeat):
+        t = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - t)
+    return summarize(samples, time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    add_scale_arguments(parser)
+    parser.add_argument('--page-size', type=int, default=100, help='rows per serialized page / list request')
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+    call_command('migrate', verbosity=0)
+    scale = seed(args.users, args.stocks, args.holdings, args.comments, args.seed)
+    user = User.objects.get(username='bench0')
+    size = args.page_size
+
+    stocks = list(Stock.objects.order_by('id')[:size])
+    portfolios = list(Portfolio.objects.select_related('user', 'stock').order_by('id')[:size])
+    comments = list(Comment.objects.select_related('user', 'stock').order_by('id')[:size])
+    serializers = {
+        'stock': lambda: StockSerializer(stocks, many=True).data,
+        'portfolio': lambda: PortfolioSerializer(portfolios, many=True).data,
+        'comment': lambda: CommentSerializer(comments, many=True).data,
+    }
+
+    factory = APIRequestFactory()
+
+    def call(view, path, **kwargs):
+        def run():
+            request = factory.get(path)
+            force_authenticate(request, user=user)
+            response = view(request, **kwargs)
+            assert response.status_code == 200, response.status_code
+            return response.render()
+        return run
+
+    views = {
+        'stock_list': call(StockListCreateAPIView.as_view(), f'/api/stocks/?page_size={size}'),
+        'stock_detail': call(StockDetailAPIView.as_view(), f'/api/stocks/{stocks[0].pk}/', pk=stocks[0].pk),
+        'portfolio_list': call(PortfolioListCreateAPIView.as_view(), f'/api/portfolios/?page_size={size}'),
+        'portfolio_summary': call(PortfolioSummaryAPIView.as_view(), '/api/portfolios/me/summary/'),
+        'comment_list': call(CommentListCreateAPIView.as_view(), f'/api/comments/?page_size={size}'),
+    }
+
+    report = {'scale': scale, 'page_size': size, 'repeat': args.repeat, 'serializers': {}, 'views': {}}
+    for name, func in serializers.items():
+        report['serializers'][name] = timed(func, args.repeat)
+    for cached in (False, True):
+        with override_settings(RESPONSE_CACHE_ENABLED=cached):
+            for name, func in views.items():
+                report['views'][f'{name}_cached' if cached else name] = timed(func, args.repeat)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+Latency of the in-memory stock autocomplete index over a synthetic universe.
+
+Seeds N stocks into an in-memory SQLite database, builds the index once, then times
+random 1-4 character symbol prefixes, company-name prefixes and one-typo symbols. Then it
+invalidates the index as a Stock write does and times the searches served while the
+background rebuild runs, and how long the rebuild takes.
+
+    python -m benchmarks.search_bench --stocks 100000 --queries 5000
+"""
+import argparse
+import json
+import random
+import string
+import time
+from .django_setup import setup_django
+from .stats import percentile
+
+setup_django(
+    STOCK_SEARCH_BACKEND='memory', STOCK_SEARCH_VERSION_CHECK_INTERVAL=1.0,
+    # Shared, so the rebuild thread's connection sees the same in-memory database
+    DATABASES={'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': 'file:search_bench?mode=memory&cache=shared'}},
+)
+
+from django.core.management import call_command  # noqa: E402
+from tradez.models import Stock  # noqa: E402
+from tradez import search  # noqa: E402
+
+WORDS = ['Global', 'Capital', 'Energy', 'Systems', 'Holdings', 'Pharma', 'Digital', 'Bank',
+         'Micro', 'Group', 'Motors', 'Foods', 'Networks', 'Realty', 'Mining', 'Therapeutics']
+
+
+def seed(count, rng):
+    symbols = set()
+    while len(symbols) < count:
+        symbols.add(''.join(rng.choices(string.ascii_uppercase, k=rng.randint(1, 5))))
+    stocks = [
+        Stock(symbol=symbol, company_name=' '.join(rng.sample(WORDS, 3)), purchase=1, last_div=0,
+              industry='Tech', market_cap=1)
+        for symbol in symbols
+    ]
+    Stock.objects.bulk_create(stocks, batch_size=5000)
+    return sorted(symbols)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--stocks', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=5000)
+    args = parser.parse_args()
+    rng = random.Random(0)
+    call_command('migrate', verbosity=0)
+    symbols = seed(args.stocks, rng)
+
+    index = search.stock_index
+    started = time.perf_counter()
+    index.search('warm-up')
+    build_seconds = time.perf_counter() - started
+
+    def typo(symbol):
+        i = rng.randrange(len(symbol))
+        return symbol[:i] + rng.choice(string.ascii_uppercase) + symbol[i + 1:]
+
+    makers = {
+        'symbol_prefix': lambda: rng.choice(symbols)[:rng.randint(1, 4)],
+        'name_prefix': lambda: rng.choice(WORDS)[:rng.randint(2, 6)].lower(),
+        'typo': lambda: typo(rng.choice(symbols)),
+    }
+    report = {'stocks': args.stocks, 'build_seconds': round(build_seconds, 3)}
+    for name, make in makers.items():
+        timings = []
+        for _ in range(args.queries):
+            query = make()
+            started = time.perf_counter()
+            index.search(query, limit=10)
+            timings.append((time.perf_counter() - started) * 1000)
+        report[name] = {f'p{p}_ms': round(percentile(timings, p), 3) for p in (50, 95, 99)}
+
+    # After a write: the search that notices starts the rebuild, the ones after it keep
+    # being answered from the current index until the new one is swapped in
+    search.invalidate()
+    invalidated = time.perf_counter()
+    index.search(makers['symbol_prefix'](), limit=10)
+    first_ms = (time.perf_counter() - invalidated) * 1000
+    timings = []
+    while index._lock.locked():
+        query = makers['symbol_prefix']()
+        started = time.perf_counter()
+        index.search(query, limit=10)
+        timings.append((time.perf_counter() - started) * 1000)
+    report['after_write'] = {
+        'first_search_ms': round(first_ms, 3),
+        'rebuild_seconds': round(time.perf_counter() - invalidated, 3),
+        'searches_during_rebuild': len(timings),
+        **{f'p{p}_ms': round(percentile(timings, p), 3) for p in (50, 95, 99) if timings},
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+Seed synthetic users, stocks, portfolios and comments at a configurable scale.
+
+Writes with bulk_create into the database of DJANGO_SETTINGS_MODULE (default
+tradezapi.settings, so DB_ENGINE/DB_NAME/... pick the database). Every user is called
+bench<i> and has the password PASSWORD and a verified email, so load scenarios can log in.
+
+    DB_ENGINE=sqlite DB_NAME=/tmp/bench.sqlite3 python -m benchmarks.seed --migrate --users 100 --stocks 5000
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import string
+import sys
+import time
+from decimal import Decimal
+
+PASSWORD = 'bench-password'
+INDUSTRIES = ['Technology', 'Healthcare', 'Financials', 'Energy', 'Utilities', 'Industrials',
+              'Materials', 'Real Estate', 'Consumer Staples', 'Communication']
+WORDS = ['Global', 'Capital', 'Energy', 'Systems', 'Holdings', 'Pharma', 'Digital', 'Bank',
+         'Micro', 'Group', 'Motors', 'Foods', 'Networks', 'Realty', 'Mining', 'Therapeutics']
+BATCH_SIZE = 5000
+
+
+def add_scale_arguments(parser):
+    """The scale options shared by every benchmark that seeds data."""
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--stocks', type=int, default=5000)
+    parser.add_argument('--holdings', type=int, default=20, help='portfolio rows per user')
+    parser.add_argument('--comments', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=0, help='random seed')
+
+
+def _symbols(count, rng):
+    symbols = set()
+    while len(symbols) < count:
+        symbols.add(''.join(rng.choices(string.ascii_uppercase, k=rng.randint(2, 5))))
+    return sorted(symbols)
+
+
+def seed(users=100, stocks=5000, holdings=20, comments=10000, seed=0):
+    """Insert the rows and return how many of each were written (and how long it took)."""
+    from django.contrib.auth import get_user_model
+    from django.contrib.auth.hashers import make_password
+    from tradez import response_cache, search
+    from tradez.models import Stock, Portfolio, Comment
+
+    User = get_user_model()
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    password = make_password(PASSWORD)  # hashing is deliberately slow: once for everyone
+    user_rows = User.objects.bulk_create([
+        User(username=f'bench{i}', email=f'bench{i}@example.com', password=password, email_verified=True)
+        for i in range(users)
+    ], batch_size=BATCH_SIZE)
+    stock_rows = Stock.objects.bulk_create([
+        Stock(
+            symbol=symbol,
+            company_name=' '.join(rng.sample(WORDS, 3)),
+            purchase=Decimal(rng.randint(100, 50000)) / 100,
+            last_div=Decimal(rng.randint(0, 500)) / 100,
+            industry=rng.choice(INDUSTRIES),
+            market_cap=rng.randint(10**7, 10**12),
+        )
+        for symbol in _symbols(stocks, rng)
+    ], batch_size=BATCH_SIZE)
+    portfolio_rows = Portfolio.objects.bulk_create([
+        Portfolio(user=user, stock=stock)
+        for user in user_rows
+        for stock in rng.sample(stock_rows, min(holdings, len(stock_rows)))
+    ], batch_size=BATCH_SIZE)
+    comment_rows = Comment.objects.bulk_create([
+        Comment(
+            title=f'{rng.choice(WORDS)} outlook',
+            content=' '.join(rng.choices(WORDS, k=rng.randint(10, 60))).lower(),
+            stock=rng.choice(stock_rows) if stock_rows else None,
+            user=rng.choice(user_rows),
+        )
+        for _ in range(comments if user_rows else 0)
+    ], batch_size=BATCH_SIZE)
+    # bulk_create sends no signals: drop what a running server may have cached
+    for model in (Stock, Portfolio, Comment):
+        response_cache.invalidate_model(model)
+    search.invalidate()
+    return {
+        'users': len(user_rows),
+        'stocks': len(stock_rows),
+        'portfolios': len(portfolio_rows),
+        'comments': len(comment_rows),
+        'seconds': round(time.perf_counter() - started, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    add_scale_arguments(parser)
+    parser.add_argument('--migrate', action='store_true', help='run migrations first')
+    args = parser.parse_args()
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tradezapi.settings')
+    import django
+    with contextlib.redirect_stdout(sys.stderr):  # settings print the email backend; stdout is the report
+        django.setup()
+    if args.migrate:
+        from django.core.management import call_command
+        call_command('migrate', verbosity=0)
+    print(json.dumps(seed(args.users, args.stocks, args.holdings, args.comments, args.seed), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+ModelSerializer + JSONRenderer against the values()-based fast path with orjson.
+
+Seeds N stocks, portfolios and comments into an in-memory SQLite database, then times
+serialization + JSON encoding of all N rows of each, both ways, from rows already in
+memory (model instances / values_list() tuples) and end to end, query included. Checks
+that both ways produce the same bytes. The query share is larger on SQLite than on
+PostgreSQL, whose driver returns Decimals and datetimes without Django converting them.
+
+    python -m benchmarks.serializer_bench --rows 100000
+"""
+import argparse
+import json
+import time
+from .django_setup import setup_django
+from .seed import seed
+
+setup_django()
+
+from django.core.management import call_command  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+from tradez.fast_serializers import values_serializer  # noqa: E402
+from tradez.models import Stock, Portfolio, Comment  # noqa: E402
+from tradez.renderers import ORJSONRenderer  # noqa: E402
+from tradez.serializers import StockSerializer, PortfolioSerializer, CommentSerializer  # noqa: E402
+
+
+def best_of(func, repeat):
+    """Fastest of `repeat` runs (seconds) and the last result."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    call_command('migrate', verbosity=0)
+    # 100 holdings per user gives `rows` portfolios
+    scale = seed(users=max(1, args.rows // 100), stocks=args.rows, holdings=100, comments=args.rows)
+
+    cases = {
+        'stock': (Stock.objects.order_by('id'), StockSerializer),
+        'portfolio': (Portfolio.objects.select_related('user', 'stock').order_by('id'), PortfolioSerializer),
+        'comment': (Comment.objects.select_related('user', 'stock').order_by('id'), CommentSerializer),
+    }
+    report = {'scale': scale}
+    for name, (queryset, serializer_class) in cases.items():
+        fast = values_serializer(serializer_class)
+        instances = list(queryset)
+        rows = list(fast.values_list(queryset))
+        model_seconds, expected = best_of(
+            lambda: JSONRenderer().render(serializer_class(instances, many=True).data), args.repeat)
+        fast_seconds, body = best_of(lambda: ORJSONRenderer().render(fast.data(rows)), args.repeat)
+        assert body == expected, f'{name}: fast path output differs'
+        model_total, _ = best_of(
+            lambda: JSONRenderer().render(serializer_class(queryset.all(), many=True).data), args.repeat)
+        fast_total, _ = best_of(
+            lambda: ORJSONRenderer().render(fast.data(fast.values_list(queryset.all()))), args.repeat)
+        report[name] = {
+            'rows': len(rows),
+            'serialize': {
+                'model_serializer_s': round(model_seconds, 3),
+                'fast_path_s': round(fast_seconds, 3),
+                'fast_path_rows_per_s': round(len(rows) / fast_seconds),
+                'speedup': round(model_seconds / fast_seconds, 1),
+            },
+            'with_query': {
+                'model_serializer_s': round(model_total, 3),
+                'fast_path_s': round(fast_total, 3),
+                'fast_path_rows_per_s': round(len(rows) / fast_total),
+                'speedup': round(model_total / fast_total, 1),
+            },
+        }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,28 @@
+import math
+
+# Latency summaries shared by the benchmarks, so every report uses the same fields.
+
+
+def percentile(values, p):
+    """Nearest-rank percentile of `values` (p in 0-100)."""
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, math.ceil(p / 100 * len(values)) - 1))]
+
+
+def summarize(seconds, elapsed=None):
+    """
+    Count, mean, p50/p95/p99 and max in milliseconds of `seconds` (one sample per
+    operation), plus throughput when the wall time `elapsed` they were taken over is given.
+    """
+    if not seconds:
+        return {'count': 0}
+    ms = [s * 1000 for s in seconds]
+    summary = {
+        'count': len(ms),
+        'mean_ms': round(sum(ms) / len(ms), 3),
+        **{f'p{p}_ms': round(percentile(ms, p), 3) for p in (50, 95, 99)},
+        'max_ms': round(max(ms), 3),
+    }
+    if elapsed:
+        summary['throughput_per_s'] = round(len(ms) / elapsed, 1)
+    return summary
@@ -0,0 +1,96 @@
+"""
+Idle-subscriber capacity and fan-out latency of the SSE price stream broker.
+
+Opens N in-process subscribers (the same async generators the /api/quotes/stream/
+view returns, minus the HTTP layer) spread over a few symbols, measures the memory each
+idle one holds, then updates one symbol as the quote refresher would and times how long
+the single shared poll takes to reach every subscriber of it.
+
+    python -m benchmarks.stream_bench --subscribers 10000
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from .django_setup import setup_django
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), 'stream_bench.sqlite3')
+# A file database: the broker reads it from sync_to_async's worker thread
+setup_django(
+    DATABASES={'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': DB_PATH}},
+    PRICE_STREAM_POLL_INTERVAL=0.05, PRICE_STREAM_HEARTBEAT=60, PRICE_STREAM_RETRY_MS=3000,
+)
+
+from asgiref.sync import sync_to_async  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.utils import timezone  # noqa: E402
+from tradez.models import Stock  # noqa: E402
+from tradez.price_stream import PriceBroker  # noqa: E402
+
+SYMBOLS = [f'S{i}' for i in range(20)]
+
+
+async def run(count):
+    broker = PriceBroker()
+    streams = [broker.stream([SYMBOLS[i % len(SYMBOLS)], SYMBOLS[(i + 1) % len(SYMBOLS)]]) for i in range(count)]
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+    for stream in streams:
+        await stream.__anext__()  # snapshot
+    subscribe_seconds = time.perf_counter() - started
+    received = asyncio.Event()
+    remaining = sum(1 for i in range(count) if 0 in (i % len(SYMBOLS), (i + 1) % len(SYMBOLS)))
+    watchers = remaining
+
+    async def listen(stream):
+        nonlocal remaining
+        chunk = await stream.__anext__()
+        if '"symbol":"S0"' in chunk:
+            remaining -= 1
+            if remaining == 0:
+                received.set()
+
+    tasks = [asyncio.create_task(listen(stream)) for stream in streams]
+    await asyncio.sleep(0.5)  # every subscriber parked on its event
+    idle_bytes = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    started = time.perf_counter()
+    await sync_to_async(Stock.objects.filter(symbol='S0').update)(purchase=2, updated_at=timezone.now())
+    await asyncio.wait_for(received.wait(), 30)
+    fanout_seconds = time.perf_counter() - started
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    for stream in streams:
+        await stream.aclose()
+    return {
+        'subscribers': count,
+        'subscribe_seconds': round(subscribe_seconds, 3),
+        'idle_bytes_per_subscriber': idle_bytes // count,
+        'fanout_subscribers': watchers,
+        'fanout_seconds': round(fanout_seconds, 3),
+        'open_after_close': len(broker.subscribers),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--subscribers', type=int, default=10000)
+    args = parser.parse_args()
+    call_command('migrate', verbosity=0)
+    Stock.objects.bulk_create(
+        Stock(symbol=symbol, company_name=symbol, purchase=1, last_div=0, industry='Tech', market_cap=1)
+        for symbol in SYMBOLS
+    )
+    print(json.dumps(asyncio.run(run(args.subscribers)), indent=2))
+    os.remove(DB_PATH)
+
+
+if __name__ == '__main__':
+    main()
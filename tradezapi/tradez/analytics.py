@@ -0,0 +1,267 @@
+import numpy as np
+from django.db import connections, router
+from django.db.models import Aggregate, TextField
+from .models import Portfolio, PriceBar, PriceSeries, Stock
+
+# Vectorized portfolio analytics over PriceBar closes, read from their PriceSeries.
+# A portfolio is the set of stocks a user holds (one Portfolio row per stock); holdings
+# carry no quantity, so the portfolio is treated as equally weighted.
+
+TRADING_DAYS = 252
+
+
+class _Concat(Aggregate):
+    """A group's values as one string joined by `separator` (GROUP_CONCAT / STRING_AGG)."""
+    output_field = TextField()
+    vendors = ('sqlite', 'postgresql')
+
+    def __init__(self, expression, separator):
+        super().__init__(expression)
+        self.separator = separator
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, function='GROUP_CONCAT',
+                           template=f"%(function)s(%(expressions)s, '{self.separator}')", **extra_context)
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        # date::text is YYYY-MM-DD under the default ISO DateStyle; float8::text round-trips
+        return self.as_sql(compiler, connection, function='STRING_AGG',
+                           template=f"%(function)s((%(expressions)s)::text, '{self.separator}')", **extra_context)
+
+
+def load_price_matrix(stock_ids, start=None, end=None):
+    """
+    Load closes of `stock_ids` as a (dates x stocks) float matrix, columns in `stock_ids`
+    order. Gaps are forward-filled, and rows before the first date on which every stock
+    has a price are dropped so all columns share one window.
+    Returns (dates as datetime64[D] array, prices).
+
+    Closes come from each stock's PriceSeries, one row per stock read straight into NumPy.
+    Stocks without one fall back to their PriceBar rows (see _bar_columns()).
+    """
+    stock_ids = list(stock_ids)
+    first = np.datetime64(start, 'D').astype(np.int64) if start else None
+    last = np.datetime64(end, 'D').astype(np.int64) if end else None
+    days, ids, closes = [], [], []
+    found = set()
+    for stock_id, packed_days, packed_closes in (
+            PriceSeries.objects.filter(stock_id__in=stock_ids).values_list('stock_id', 'days', 'closes')):
+        series_days = np.frombuffer(packed_days, dtype=np.int32)
+        window = slice(None if first is None else np.searchsorted(series_days, first),
+                       None if last is None else np.searchsorted(series_days, last, side='right'))
+        days.append(series_days[window].astype(np.int64).astype('datetime64[D]'))
+        closes.append(np.frombuffer(packed_closes, dtype=float)[window])
+        ids.append(np.full(len(days[-1]), stock_id, dtype=np.int64))
+        found.add(stock_id)
+    missing = [stock_id for stock_id in stock_ids if stock_id not in found]
+    if missing:
+        for column, values in zip((days, ids, closes), _bar_columns(missing, start, end)):
+            column.append(values)
+    if not days:
+        return _pivot(np.array([], dtype='datetime64[D]'), np.array([], dtype=np.int64), np.array([]), stock_ids)
+    return _pivot(np.concatenate(days), np.concatenate(ids), np.concatenate(closes), stock_ids)
+
+
+def _bar_columns(stock_ids, start=None, end=None):
+    """
+    (dates, stock ids, closes) arrays of the PriceBar rows of `stock_ids`.
+
+    On SQLite and PostgreSQL one query groups by stock and concatenates each stock's dates
+    and closes into two strings, which NumPy parses in bulk: no Python object is made per
+    bar. Both aggregates read the group's rows in the same order, and the pivot places
+    every close by its date, so the order itself does not matter.
+    """
+    bars = PriceBar.objects.filter(stock_id__in=stock_ids)
+    if start:
+        bars = bars.filter(date__gte=start)
+    if end:
+        bars = bars.filter(date__lte=end)
+    if connections[router.db_for_read(PriceBar)].vendor not in _Concat.vendors:
+        return _row_columns(bars.values_list('date', 'stock_id', 'close'))
+    groups = list(bars.values('stock_id').annotate(dates=_Concat('date', ''), closes=_Concat('close', ','))
+                  .order_by().values_list('stock_id', 'dates', 'closes'))
+    dates = np.frombuffer(''.join(group[1] for group in groups).encode('ascii'), dtype='S10').astype('datetime64[D]')
+    closes = np.fromstring(','.join(group[2] for group in groups), sep=',') if groups else np.array([])
+    ids = np.repeat(np.array([group[0] for group in groups], dtype=np.int64), [len(group[1]) // 10 for group in groups])
+    return dates, ids, closes
+
+
+def pack_price_series(stock_id):
+    """(Re)build the PriceSeries of `stock_id` from its PriceBar rows."""
+    rows = list(PriceBar.objects.filter(stock_id=stock_id).order_by('date').values_list('date', 'close'))
+    PriceSeries.objects.update_or_create(stock_id=stock_id, defaults={
+        'days': np.array([row[0] for row in rows], dtype='datetime64[D]').astype(np.int32).tobytes(),
+        'closes': np.array([row[1] for row in rows], dtype=float).tobytes(),
+    })
+
+
+def _row_columns(rows):
+    rows = list(rows)
+    # Index dates through a dict and convert only the distinct ones to datetime64:
+    # converting every row's date object is by far the slowest step otherwise.
+    date_index = {}
+    row_index = np.fromiter((date_index.setdefault(r[0], len(date_index)) for r in rows), dtype=np.intp, count=len(rows))
+    ids = np.fromiter((r[1] for r in rows), dtype=np.int64, count=len(rows))
+    closes = np.fromiter((r[2] for r in rows), dtype=float, count=len(rows))
+    return np.array(list(date_index), dtype='datetime64[D]')[row_index], ids, closes
+
+
+def build_price_matrix(rows, stock_ids):
+    """Pivot (date, stock_id, close) rows into the aligned matrix described in load_price_matrix()."""
+    return _pivot(*_row_columns(rows), stock_ids)
+
+
+def _pivot(bar_dates, ids, closes, stock_ids):
+    """The matrix of load_price_matrix() from one array per column of the bars."""
+    if not len(bar_dates):
+        return np.array([], dtype='datetime64[D]'), np.empty((0, len(stock_ids)))
+    # Row of each bar: its day's rank among the days that have bars (np.unique without a sort)
+    days = bar_dates.astype(np.int64)
+    first_day = days.min()
+    present = np.zeros(days.max() - first_day + 1, dtype=bool)
+    present[days - first_day] = True
+    row_index = (np.cumsum(present) - 1)[days - first_day]
+    dates = (np.flatnonzero(present) + first_day).astype('datetime64[D]')
+    order = np.argsort(stock_ids)
+    sorted_ids = np.asarray(stock_ids)[order]
+    col_index = order[np.searchsorted(sorted_ids, ids)]
+    prices = np.full((len(dates), len(stock_ids)), np.nan)
+    prices[row_index, col_index] = closes
+
+    # Forward-fill: for each cell take the last row index that had a value
+    filled_rows = np.where(np.isnan(prices), 0, np.arange(len(dates))[:, None])
+    np.maximum.accumulate(filled_rows, axis=0, out=filled_rows)
+    prices = prices[filled_rows, np.arange(len(stock_ids))]
+    complete = np.all(np.isfinite(prices), axis=1)
+    if not complete.any():
+        return dates[:0], prices[:0]
+    first = int(np.argmax(complete))
+    return dates[first:], prices[first:]
+
+
+def max_drawdown(returns):
+    """Largest peak-to-trough loss of the compounded returns, per column (<= 0)."""
+    wealth = np.cumprod(1 + returns, axis=0)
+    peaks = np.maximum.accumulate(wealth, axis=0)
+    return np.min(wealth / peaks - 1, axis=0)
+
+
+def compute_analytics(prices, weights=None, benchmark=None):
+    """
+    Analytics of a (dates x holdings) price matrix; `benchmark` is an optional price
+    vector over the same dates, NaN where it has no close. Needs at least three rows (two
+    returns) of prices; beta is None unless the benchmark covers two returns of them.
+    """
+    returns = prices[1:] / prices[:-1] - 1
+    n = prices.shape[1]
+    weights = np.full(n, 1 / n) if weights is None else np.asarray(weights, dtype=float)
+    portfolio_returns = returns @ weights
+
+    covariance = np.cov(returns, rowvar=False).reshape(n, n) * TRADING_DAYS
+    volatility = np.sqrt(np.diag(covariance))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        correlation = covariance / np.outer(volatility, volatility)
+    portfolio_volatility = float(np.sqrt(weights @ covariance @ weights))
+
+    beta = portfolio_beta = None
+    if benchmark is not None:
+        benchmark_returns = benchmark[1:] / benchmark[:-1] - 1
+        # the benchmark may be NaN where its history does not cover the holdings'
+        overlap = np.isfinite(benchmark_returns)
+        benchmark_returns = benchmark_returns[overlap]
+        variance = np.var(benchmark_returns, ddof=1) if len(benchmark_returns) > 1 else 0
+        if variance > 0:
+            centered = benchmark_returns - benchmark_returns.mean()
+            overlapping = returns[overlap]
+            # cov(asset, benchmark) for every column at once
+            beta = ((overlapping - overlapping.mean(axis=0)).T @ centered) / (len(centered) - 1) / variance
+            portfolio_beta = float(weights @ beta)
+
+    return {
+        'daily_returns': returns,
+        'portfolio_daily_returns': portfolio_returns,
+        'annualized_volatility': volatility,
+        'covariance': covariance,
+        'correlation': correlation,
+        'beta': beta,
+        'max_drawdown': max_drawdown(returns),
+        'portfolio': {
+            'annualized_return': float((1 + portfolio_returns).prod() ** (TRADING_DAYS / len(portfolio_returns)) - 1),
+            'annualized_volatility': portfolio_volatility,
+            'beta': portfolio_beta,
+            'max_drawdown': float(max_drawdown(portfolio_returns)),
+        },
+    }
+
+
+def _clean(values):
+    """NumPy array -> JSON-safe nested lists (NaN/inf become None)."""
+    if values is None:
+        return None
+    values = np.asarray(values, dtype=float)
+    return np.where(np.isfinite(values), np.round(values, 6), None).tolist()
+
+
+def _align(dates, benchmark_dates, benchmark_prices):
+    """Benchmark closes on `dates`, forward-filled within its history and NaN outside it."""
+    aligned = np.full(len(dates), np.nan)
+    if len(benchmark_dates):
+        at = np.searchsorted(benchmark_dates, dates, side='right') - 1
+        inside = (at >= 0) & (dates <= benchmark_dates[-1])
+        aligned[inside] = benchmark_prices[at[inside], 0]
+    return aligned
+
+
+def portfolio_analytics(user, start=None, end=None, benchmark_symbol='SPY', include_covariance=False):
+    """
+    Analytics for all stocks `user` holds, priced from PriceBar. Returns None when fewer
+    than three common trading days are stored for the holdings.
+    """
+    holdings = list(
+        Stock.objects.filter(id__in=Portfolio.objects.filter(user_id=user.pk).values('stock_id'))
+        .order_by('symbol').values_list('id', 'symbol')
+    )
+    if not holdings:
+        return None
+    ids = [stock_id for stock_id, _ in holdings]
+    dates, prices = load_price_matrix(ids, start, end)
+    if len(dates) < 3:
+        return None
+    benchmark_id = Stock.objects.filter(symbol__iexact=benchmark_symbol).values_list('id', flat=True).first()
+    benchmark = None
+    if benchmark_id in ids:
+        benchmark = prices[:, ids.index(benchmark_id)]
+    elif benchmark_id is not None:
+        # loaded on its own so a short (or empty) benchmark history never trims the holdings'
+        benchmark = _align(dates, *load_price_matrix([benchmark_id], start, end))
+        if np.isfinite(benchmark).sum() < 2:
+            benchmark = None
+    stats = compute_analytics(prices, benchmark=benchmark)
+
+    result = {
+        'symbols': [symbol for _, symbol in holdings],
+        'weights': _clean(np.full(len(ids), 1 / len(ids))),
+        'start': str(dates[0]),
+        'end': str(dates[-1]),
+        'observations': len(dates) - 1,
+        'benchmark': benchmark_symbol.upper() if benchmark is not None else None,
+        'portfolio': {key: (round(value, 6) if value is not None else None) for key, value in stats['portfolio'].items()},
+        'holdings': [
+            {
+                'symbol': symbol,
+                'annualized_volatility': vol,
+                'beta': beta,
+                'max_drawdown': drawdown,
+            }
+            for (_, symbol), vol, beta, drawdown in zip(
+                holdings,
+                _clean(stats['annualized_volatility']),
+                _clean(stats['beta']) or [None] * len(ids),
+                _clean(stats['max_drawdown']),
+            )
+        ],
+        'correlation': _clean(stats['correlation']),
+    }
+    if include_covariance:
+        result['covariance'] = _clean(stats['covariance'])
+    return result
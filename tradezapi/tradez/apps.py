@@ -4,3 +4,23 @@ from django.apps import AppConfig
 class TradezConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'tradez'
+
+    def ready(self):
+        # Keep the in-memory stock search index in step with Stock writes
+        from django.db.models.signals import post_delete, post_save
+        from .models import Stock
+        from django.core.signals import request_started
+        from .search import _stock_changed, _warm
+        post_save.connect(_stock_changed, sender=Stock, dispatch_uid='stock_search_invalidate_save')
+        post_delete.connect(_stock_changed, sender=Stock, dispatch_uid='stock_search_invalidate_delete')
+        request_started.connect(_warm, dispatch_uid='stock_search_warm')
+
+        # Invalidate cached responses that show the changed rows
+        from django.contrib.auth import get_user_model
+        from .models import Portfolio, Comment
+        from .response_cache import _row_changed, _user_changed
+        for model in (Stock, Portfolio, Comment):
+            post_save.connect(_row_changed, sender=model, dispatch_uid=f'response_cache_save_{model.__name__}')
+            post_delete.connect(_row_changed, sender=model, dispatch_uid=f'response_cache_delete_{model.__name__}')
+        post_save.connect(_user_changed, sender=get_user_model(), dispatch_uid='response_cache_save_user')
+        post_delete.connect(_user_changed, sender=get_user_model(), dispatch_uid='response_cache_delete_user')
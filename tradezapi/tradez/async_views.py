@@ -0,0 +1,179 @@
+import asyncio
+import contextlib
+from decimal import Decimal
+from functools import wraps
+import aiohttp
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+from rest_framework.exceptions import AuthenticationFailed, Throttled
+from users.authentication import JWTClaimsAuthentication
+from .models import Portfolio
+from .fmp import is_symbol, normalize_symbols
+from .fmp_async import AsyncFMPClient, get_async_client
+from .price_stream import broker
+from .throttling import RouteThrottle, QuoteFetchThrottle
+
+# Native Django async views for the quote-heavy endpoints.
+# DRF's APIView is synchronous, so these views authenticate the JWT themselves and
+# await the async FMP client; under ASGI a slow upstream no longer blocks a worker.
+
+
+def jwt_required(view):
+    """Authenticate the request from its JWT's claims, returning 401 like the DRF views do."""
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        try:
+            result = await sync_to_async(JWTClaimsAuthentication().authenticate)(request)
+        except AuthenticationFailed as e:
+            return JsonResponse({'detail': e.detail}, status=401)
+        if result is None:
+            return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+        request.user, request.auth = result
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+def throttled(*throttle_classes):
+    """Check DRF throttles (after jwt_required), returning 429 with Retry-After like the DRF views do."""
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            def waits():
+                # Like APIView.check_throttles: every throttle is charged, the longest wait wins
+                return [throttle.wait() for throttle in (cls() for cls in throttle_classes)
+                        if not throttle.allow_request(request, None)]
+            durations = await sync_to_async(waits)()
+            if durations:
+                exc = Throttled(max(durations))
+                response = JsonResponse({'detail': exc.detail}, status=exc.status_code)
+                response['Retry-After'] = str(exc.wait)
+                return response
+            return await view(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextlib.asynccontextmanager
+async def fmp_client(request):
+    """
+    The AsyncFMPClient for this request. Under ASGI that is the server loop's shared client.
+    Under WSGI every async view runs on a throwaway event loop, so the request gets its own
+    client (sharing the process cache), closed before the loop goes away.
+    """
+    if isinstance(request, ASGIRequest):
+        yield get_async_client()
+        return
+    client = AsyncFMPClient()
+    try:
+        yield client
+    finally:
+        await client.aclose()
+
+
+# --- QUOTE ENDPOINTS ---
+@require_GET
+@jwt_required
+@throttled(RouteThrottle, QuoteFetchThrottle)
+async def quote_detail(request, symbol):
+    """Live quote for one symbol."""
+    if not is_symbol(symbol):
+        return JsonResponse({'detail': 'Invalid symbol.'}, status=400)
+    try:
+        async with fmp_client(request) as client:
+            quote = await client.get_stock_quote(symbol)
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        return JsonResponse({'detail': 'Failed to fetch quote from FMP.'}, status=502)
+    if not quote:
+        return JsonResponse({'detail': 'Unknown symbol.'}, status=404)
+    return JsonResponse(quote[0])
+
+
+@require_GET
+@jwt_required
+@throttled(RouteThrottle, QuoteFetchThrottle)
+async def quote_list(request):
+    """Live quotes for ?symbols=AAPL,MSFT,... keyed by symbol, with per-symbol errors."""
+    symbols = normalize_symbols(request.GET.get('symbols', '').split(','))
+    if not symbols:
+        return JsonResponse({'detail': 'Missing symbols.'}, status=400)
+    if len(symbols) > settings.QUOTE_MAX_SYMBOLS:
+        return JsonResponse({'detail': f'At most {settings.QUOTE_MAX_SYMBOLS} symbols per request.'}, status=400)
+    invalid = [symbol for symbol in symbols if not is_symbol(symbol)]
+    if invalid:
+        return JsonResponse({'detail': f"Invalid symbols: {', '.join(invalid)}."}, status=400)
+    async with fmp_client(request) as client:
+        quotes = await client.get_stock_quotes(symbols)
+    return JsonResponse(quotes)
+
+
+@require_GET
+@jwt_required
+async def quote_stream(request):
+    """
+    Server-Sent Events for ?symbols=AAPL,MSFT: a `snapshot` event with the current quotes,
+    then a `quote` event with the changed fields each time the refresher updates a symbol.
+    """
+    symbols = sorted({s.strip().upper() for s in request.GET.get('symbols', '').split(',') if s.strip()})
+    if not symbols:
+        return JsonResponse({'detail': 'Missing symbols.'}, status=400)
+    if len(symbols) > settings.PRICE_STREAM_MAX_SYMBOLS:
+        return JsonResponse({'detail': f'At most {settings.PRICE_STREAM_MAX_SYMBOLS} symbols per stream.'}, status=400)
+    if not isinstance(request, ASGIRequest):
+        # A WSGI server drains async iterators to a list first: the endless stream would never be sent
+        return JsonResponse({'detail': 'The price stream needs an ASGI server (e.g. uvicorn).'}, status=501)
+    response = StreamingHttpResponse(broker.stream(symbols), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # nginx: pass events through unbuffered
+    return response
+
+
+# --- PORTFOLIO VALUATION ---
+def _money(value):
+    return str(value.quantize(Decimal('0.01')))
+
+
+@require_GET
+@jwt_required
+@throttled(RouteThrottle, QuoteFetchThrottle)
+async def portfolio_valuation(request):
+    """Value the caller's holdings at live prices against each stock's purchase price."""
+    holdings = [p async for p in Portfolio.objects.filter(user_id=request.user.pk).select_related('stock').order_by('id')]
+    async with fmp_client(request) as client:
+        quotes = await client.get_stock_quotes([p.stock.symbol for p in holdings])
+    total_cost = Decimal('0')
+    market_value = Decimal('0')
+    rows = []
+    for portfolio in holdings:
+        stock = portfolio.stock
+        result = quotes.get(stock.symbol.upper(), {'quote': None, 'error': 'Unknown symbol.'})
+        row = {
+            'id': portfolio.id,
+            'stock': stock.id,
+            'symbol': stock.symbol,
+            'company_name': stock.company_name,
+            'purchase': _money(stock.purchase),
+            'price': None,
+            'change': None,
+            'change_percent': None,
+            'error': result['error'],
+        }
+        price = (result['quote'] or {}).get('price')
+        if price is not None:
+            # Totals only cover holdings that could be priced
+            price = Decimal(str(price))
+            total_cost += stock.purchase
+            market_value += price
+            row['price'] = _money(price)
+            row['change'] = _money(price - stock.purchase)
+            if stock.purchase:
+                row['change_percent'] = _money((price - stock.purchase) / stock.purchase * 100)
+        rows.append(row)
+    return JsonResponse({
+        'holdings': rows,
+        'total_cost': _money(total_cost),
+        'market_value': _money(market_value),
+        'unrealized_gain': _money(market_value - total_cost),
+    })
@@ -0,0 +1,70 @@
+import hashlib
+from django.conf import settings
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+# Conditional GET for the stock, portfolio and comment endpoints.
+#
+# The ETag is weak and built from row versions (id + updated_at), never from the
+# serialized body, so a client that already holds the current representation gets a 304
+# without anything being serialized. Portfolio and comment payloads nest the stock
+# summary and the author's username, so those go into the version too; views must have
+# loaded them with select_related (as they already do), or, for values() rows, selected
+# `stock__updated_at` and `user__username`. Both kinds of row give the same ETag.
+#
+# Detail responses also carry Last-Modified. List pages only get an ETag: a deleted row
+# does not move the newest updated_at, so a date alone cannot tell that the page changed.
+
+
+def _versions(obj):
+    if isinstance(obj, dict):
+        # A values() row (tradez.fast_serializers): the views add stock__updated_at to it
+        parts = [obj['id'], obj['updated_at'].isoformat()]
+        if 'stock__updated_at' in obj:
+            parts.append(obj['stock__updated_at'].isoformat() if obj['stock__updated_at'] is not None else None)
+        if 'user__username' in obj:
+            parts.append(obj['user__username'])
+        return parts
+    parts = [obj.pk, obj.updated_at.isoformat()]
+    model = type(obj)
+    if hasattr(model, 'stock') and model.stock.is_cached(obj):
+        parts.append(obj.stock.updated_at.isoformat() if obj.stock is not None else None)
+    if hasattr(model, 'user') and model.user.is_cached(obj):
+        parts.append(obj.user.username)
+    return parts
+
+
+def make_etag(objs, *extra):
+    """Weak ETag over the versions of `objs` and anything else that shapes the response (`extra`)."""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in [*(_versions(obj) for obj in objs), *extra]:
+        digest.update(repr(part).encode())
+        digest.update(b'\0')
+    return f'W/"{digest.hexdigest()}"'
+
+
+def last_modified(obj):
+    """Unix time of the newest change to `obj` or the stock nested in its payload."""
+    times = [obj.updated_at]
+    if hasattr(type(obj), 'stock') and type(obj).stock.is_cached(obj) and obj.stock is not None:
+        times.append(obj.stock.updated_at)
+    return int(max(times).timestamp())
+
+
+def conditional_get(request, render, etag, modified=None):
+    """
+    Return 304 Not Modified when the request's If-None-Match / If-Modified-Since match
+    `etag` / `modified`, otherwise call `render()` for the full response. Either way the
+    response gets the validators (those not None) and private, revalidating Cache-Control.
+    """
+    response = get_conditional_response(request, etag=etag, last_modified=modified)
+    if response is None:
+        response = render()
+    if etag is not None:
+        response['ETag'] = etag
+    if modified is not None:
+        response['Last-Modified'] = http_date(modified)
+    patch_cache_control(response, private=True, max_age=settings.HTTP_CACHE_MAX_AGE, must_revalidate=True)
+    # Responses differ per user (token) and per renderer (JSON / browsable API)
+    patch_vary_headers(response, ('Accept', 'Authorization'))
+    return response
@@ -0,0 +1,163 @@
+import datetime
+import decimal
+from functools import lru_cache
+from itertools import repeat
+from operator import itemgetter
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.fields import ISO_8601
+from rest_framework.relations import PrimaryKeyRelatedField, RelatedField
+from rest_framework.settings import api_settings
+
+# Read-only serialization straight from QuerySet.values() / values_list() rows.
+#
+# A ModelSerializer builds a model instance per row, then walks its fields, calling
+# get_attribute() and to_representation() on each. For list pages and exports that is
+# most of the CPU. ValuesSerializer is compiled once from a serializer class: it lists
+# the columns the serializer reads (`user.username` -> `user__username`, a nested
+# serializer -> its fields under `stock__`) and one converter per field, and then turns
+# rows of those columns into the same dicts, key order included.
+#
+# Decimal and ISO 8601 datetime fields get precompiled converters. Ints, strings and FK
+# ids are passed through. Any other field falls back to its own to_representation(). The
+# output matches the serializer byte for byte once encoded (tests compare the two).
+
+_PASSTHROUGH = (serializers.IntegerField, serializers.CharField, serializers.ReadOnlyField)
+
+
+def _decimal_converter(field):
+    if (field.decimal_places is None or field.localize or field.normalize_output
+            or not getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)):
+        return field.to_representation
+    places = field.decimal_places
+    exponent = decimal.Decimal('.1') ** places
+    context = decimal.getcontext().copy()
+    if field.max_digits is not None:
+        context.prec = field.max_digits
+    rounding = field.rounding
+
+    def convert(value):
+        if not isinstance(value, decimal.Decimal):
+            return field.to_representation(value)
+        # Database values already have the column's places, and then str() is the answer
+        text = str(value)
+        if places and len(text) > places and text[-places - 1] == '.' and 'E' not in text:
+            return text
+        return f'{value.quantize(exponent, rounding=rounding, context=context):f}'
+    return convert
+
+
+def _datetime_converter(field, tz):
+    if (getattr(field, 'format', api_settings.DATETIME_FORMAT) or '').lower() != ISO_8601:
+        return field.to_representation
+    tz = field.timezone if hasattr(field, 'timezone') else tz
+    if tz is None:
+        return field.to_representation
+    if getattr(tz, 'key', None) in ('UTC', 'Etc/UTC'):
+        tz = datetime.timezone.utc  # same output, and much cheaper offsets than a ZoneInfo
+
+    def convert(value):
+        if value.tzinfo is None:  # naive: let the field make it aware (or fail) as usual
+            return field.to_representation(value)
+        if value.tzinfo is not tz:
+            value = value.astimezone(tz)
+        value = value.isoformat()
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+    return convert
+
+
+def _serialize(plan, rows, columns):
+    """
+    Serialized dicts of `rows` (tuples in `columns` order). Each field is read and converted
+    a whole column at a time, and the dicts are then zipped from the field names and the
+    converted columns, in serializer order. `columns` caches the columns read so far.
+    """
+    names, fields = [], []
+    for name, index, convert, nested in plan:
+        column = columns.get(index)
+        if column is None:
+            column = columns[index] = list(map(itemgetter(index), rows))
+        if nested is not None:
+            # A nested object is None when its FK column is
+            column = [None if key is None else value for key, value in zip(column, _serialize(nested, rows, columns))]
+        elif convert is not None:
+            column = [None if value is None else convert(value) for value in column]
+        names.append(name)
+        fields.append(column)
+    return list(map(dict, map(zip, repeat(names), zip(*fields))))  # no Python frame per row
+
+
+class ValuesSerializer:
+    """Serialize rows of `columns` the way `serializer_class(instances, many=True).data` does."""
+    def __init__(self, serializer_class):
+        self.serializer_class = serializer_class
+        self.columns = []
+        self._fields = self._compile(serializer_class().fields.values(), '')
+        getter = itemgetter(*self.columns)
+        self._getter = getter if len(self.columns) > 1 else lambda row: (getter(row),)
+
+    def _column(self, lookup):
+        if lookup not in self.columns:
+            self.columns.append(lookup)
+        return self.columns.index(lookup)
+
+    def _compile(self, fields, prefix):
+        """[(name, column index, field, nested)] for the readable fields, in serializer order."""
+        compiled = []
+        for field in fields:
+            if field.write_only:
+                continue
+            if (field.source == '*' or isinstance(field, (serializers.ManyRelatedField, serializers.SerializerMethodField))
+                    or isinstance(field, RelatedField) and not isinstance(field, PrimaryKeyRelatedField)):
+                # These need the model instance (or one row per related object)
+                raise TypeError(f'{type(field).__name__} {field.field_name!r} cannot be read from values()')
+            lookup = prefix + field.source.replace('.', '__')
+            if isinstance(field, serializers.BaseSerializer):
+                # A nested object is None when its relation is: the FK column says so
+                compiled.append((field.field_name, self._column(lookup), None,
+                                 self._compile(field.fields.values(), lookup + '__')))
+            else:
+                compiled.append((field.field_name, self._column(lookup), field, None))
+        return compiled
+
+    def _plan(self, fields, tz):
+        # Converters are bound per call: datetimes render in the timezone active now
+        plan = []
+        for name, index, field, nested in fields:
+            if nested is not None:
+                plan.append((name, index, None, self._plan(nested, tz)))
+            elif isinstance(field, PrimaryKeyRelatedField):  # the column holds the FK id
+                plan.append((name, index, field.pk_field.to_representation if field.pk_field else None, None))
+            elif isinstance(field, _PASSTHROUGH):
+                plan.append((name, index, None, None))
+            elif isinstance(field, serializers.DecimalField):
+                plan.append((name, index, _decimal_converter(field), None))
+            elif isinstance(field, serializers.DateTimeField):
+                plan.append((name, index, _datetime_converter(field, tz), None))
+            else:
+                plan.append((name, index, field.to_representation, None))
+        return plan
+
+    def values(self, queryset, *extra):
+        """`queryset` as dict rows of `columns` (plus `extra` lookups), e.g. for a paginator."""
+        return queryset.values(*self.columns, *extra)
+
+    def values_list(self, queryset):
+        return queryset.values_list(*self.columns)
+
+    def data(self, rows):
+        """Serialized dicts of `rows`: tuples from values_list() or dicts from values()."""
+        rows = list(rows)
+        if not rows:
+            return []
+        if isinstance(rows[0], dict):
+            rows = list(map(self._getter, rows))
+        plan = self._plan(self._fields, timezone.get_current_timezone() if settings.USE_TZ else None)
+        return _serialize(plan, rows, {})
+
+
+@lru_cache(maxsize=None)
+def values_serializer(serializer_class):
+    """The (shared) ValuesSerializer of `serializer_class`."""
+    return ValuesSerializer(serializer_class)
@@ -0,0 +1,32 @@
+# Server-side filters for the list endpoints.
+# Each helper takes a queryset plus request.query_params and returns the narrowed queryset.
+
+
+def filter_stocks(queryset, params):
+    """Filter stocks by symbol, company_name (substring) and industry (exact, case-insensitive)."""
+    symbol = params.get('symbol')
+    if symbol:
+        queryset = queryset.filter(symbol__icontains=symbol.strip())
+    company_name = params.get('company_name')
+    if company_name:
+        queryset = queryset.filter(company_name__icontains=company_name.strip())
+    industry = params.get('industry')
+    if industry:
+        queryset = queryset.filter(industry__iexact=industry.strip())
+    return queryset
+
+
+def filter_portfolios(queryset, params):
+    """Filter portfolio rows by the linked stock's symbol."""
+    symbol = params.get('symbol')
+    if symbol:
+        queryset = queryset.filter(stock__symbol__iexact=symbol.strip())
+    return queryset
+
+
+def filter_comments(queryset, params):
+    """Filter comments by the linked stock's symbol."""
+    symbol = params.get('symbol')
+    if symbol:
+        queryset = queryset.filter(stock__symbol__iexact=symbol.strip())
+    return queryset
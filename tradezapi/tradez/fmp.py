@@ -1,11 +1,416 @@
 import os
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import requests
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
+from .profiling import track_http
+from .metrics import FMP_CACHE_LOOKUPS, FMP_UPSTREAM_LATENCY, FMP_UPSTREAM_REQUESTS, cache_kind
 
 load_dotenv()
 
 FMP_API_KEY = os.getenv('FMP_KEY')
-FMP_BASE_URL = 'https://financialmodelingprep.com/api/v3/'
+FMP_BASE_URL = os.getenv('FMP_BASE_URL', 'https://financialmodelingprep.com/api/v3/')  # benchmarks point it at a stub
+
+# Client tuning (all optional, read from the environment like FMP_KEY)
+FMP_CONNECT_TIMEOUT = float(os.getenv('FMP_CONNECT_TIMEOUT', 3.05))
+FMP_READ_TIMEOUT = float(os.getenv('FMP_READ_TIMEOUT', 10))
+FMP_MAX_RETRIES = int(os.getenv('FMP_MAX_RETRIES', 3))
+FMP_BACKOFF_BASE = float(os.getenv('FMP_BACKOFF_BASE', 0.5))
+FMP_BACKOFF_MAX = float(os.getenv('FMP_BACKOFF_MAX', 8))
+FMP_POOL_SIZE = int(os.getenv('FMP_POOL_SIZE', 20))
+FMP_CACHE_BACKEND = os.getenv('FMP_CACHE_BACKEND', 'local')  # 'local' or 'django'
+FMP_CACHE_TTL = float(os.getenv('FMP_CACHE_TTL', 30))
+FMP_CACHE_STALE_TTL = float(os.getenv('FMP_CACHE_STALE_TTL', 300))
+FMP_CACHE_MAXSIZE = int(os.getenv('FMP_CACHE_MAXSIZE', 2048))
+FMP_NEGATIVE_CACHE_TTL = float(os.getenv('FMP_NEGATIVE_CACHE_TTL', 60))  # unknown symbols
+FMP_BATCH_SIZE = int(os.getenv('FMP_BATCH_SIZE', 50))
+FMP_BATCH_WORKERS = int(os.getenv('FMP_BATCH_WORKERS', 4))
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+SYMBOL_PATTERN = re.compile(r'[A-Za-z0-9.\-^]{1,15}')
+
+
+# --- Cache backends ---
+# A backend stores opaque entries under string keys; expiry policy lives in FMPClient.
+
+class LocalLRUCache:
+    """Thread-safe in-process LRU cache."""
+    def __init__(self, maxsize=FMP_CACHE_MAXSIZE):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                self._data.move_to_end(key)
+            return entry
+
+    def set(self, key, entry, timeout):
+        with self._lock:
+            self._data[key] = entry
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class DjangoCache:
+    """
+    Adapter over a Django cache alias, so entries can be shared between workers. It has no
+    clear(): the alias holds other keys too (such as the stock search index version), and
+    entries expire on their own.
+    """
+    def __init__(self, alias='default', prefix='fmp'):
+        self.alias = alias
+        self.prefix = prefix
+
+    @property
+    def _cache(self):
+        from django.core.cache import caches
+        return caches[self.alias]
+
+    def get(self, key):
+        return self._cache.get(f'{self.prefix}:{key}')
+
+    def set(self, key, entry, timeout):
+        self._cache.set(f'{self.prefix}:{key}', entry, timeout)
+
+
+def build_cache(backend=FMP_CACHE_BACKEND):
+    if backend == 'django':
+        return DjangoCache()
+    if backend == 'local':
+        return LocalLRUCache()
+    raise ValueError(f"Unknown FMP cache backend: {backend}")
+
+
+_shared_cache = None
+
+
+def default_cache():
+    """Process-wide cache shared by every client built without an explicit cache."""
+    global _shared_cache
+    if _shared_cache is None:
+        _shared_cache = build_cache()
+    return _shared_cache
+
+
+# --- Single-flight ---
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls for the same key into one: the first thread runs `fn`,
+    the others block until it finishes and share its result (or exception).
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+
+def backoff_delay(attempt, base, cap, retry_after=None):
+    """Seconds to wait before retry `attempt` (0-based): Retry-After if given, else full jitter."""
+    if retry_after:
+        try:
+            return min(float(retry_after), cap)
+        except ValueError:
+            pass
+    # Full jitter: sleep a random amount up to the exponential cap
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+# --- Clients ---
+
+def is_symbol(symbol):
+    """True for a plausible ticker (letters, digits, '.', '-' or '^'), safe to put in an FMP path."""
+    return bool(SYMBOL_PATTERN.fullmatch(symbol))
+
+
+def normalize_symbols(symbols):
+    """Upper-case, strip and de-duplicate symbols, keeping their order."""
+    return list(dict.fromkeys(s.strip().upper() for s in symbols if s and s.strip()))
+
+
+class BaseFMPClient:
+    """
+    Configuration and cache policy shared by the sync and async FMP clients.
+
+    Cache entries are (payload, fresh_until, stale_until). Fresh entries are returned
+    directly; stale ones are returned immediately while a background refresh runs;
+    expired ones are fetched synchronously.
+    """
+    def __init__(self, api_key=None, base_url=FMP_BASE_URL, cache=None,
+                 ttl=FMP_CACHE_TTL, stale_ttl=FMP_CACHE_STALE_TTL,
+                 negative_ttl=FMP_NEGATIVE_CACHE_TTL,
+                 max_retries=FMP_MAX_RETRIES, backoff_base=FMP_BACKOFF_BASE,
+                 backoff_max=FMP_BACKOFF_MAX):
+        self.api_key = api_key if api_key is not None else FMP_API_KEY
+        self.base_url = base_url
+        self.cache = cache if cache is not None else default_cache()
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.negative_ttl = negative_ttl
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+    def _backoff(self, attempt, response=None):
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        return backoff_delay(attempt, self.backoff_base, self.backoff_max, retry_after)
+
+    def _query(self, params):
+        query = dict(params or {})
+        query['apikey'] = self.api_key
+        return query
+
+    def _observe_upstream(self, started, status):
+        FMP_UPSTREAM_LATENCY.observe(time.perf_counter() - started)
+        FMP_UPSTREAM_REQUESTS.labels(str(status)).inc()
+
+    def _lookup(self, key):
+        """Return (entry, 'hit' | 'stale' | 'miss') for a cache key and count the result."""
+        entry = self.cache.get(key)
+        now = time.time()
+        if entry is None or now >= entry[2]:
+            result = 'miss'
+        elif now < entry[1]:
+            result = 'hit'
+        else:
+            result = 'stale'
+        FMP_CACHE_LOOKUPS.labels(cache_kind(key), result).inc()
+        return entry, result
+
+    def _store(self, key, payload):
+        now = time.time()
+        if payload == []:
+            # FMP answers unknown symbols with an empty list; remember that briefly
+            entry = (payload, now + self.negative_ttl, now + self.negative_ttl)
+            self.cache.set(key, entry, self.negative_ttl)
+            return payload
+        entry = (payload, now + self.ttl, now + self.ttl + self.stale_ttl)
+        self.cache.set(key, entry, self.ttl + self.stale_ttl)
+        return payload
+
+    # Batched per-symbol endpoints (quote/, profile/) accept comma-separated symbols.
+    # `kind` is both the endpoint name and the cache key prefix, and also the key the
+    # payload is returned under: {symbol: {kind: {...} or None, 'error': None or str}}.
+
+    def _split_cached(self, kind, wanted, batch_size):
+        """Return (results from fresh cache entries, batches of symbols still to fetch)."""
+        results = {}
+        missing = []
+        for symbol in wanted:
+            entry, result = self._lookup(f"{kind}:{symbol}")
+            if result == 'hit':
+                if entry[0]:
+                    results[symbol] = {kind: entry[0][0], 'error': None}
+                else:
+                    results[symbol] = {kind: None, 'error': 'Unknown symbol.'}
+            else:
+                missing.append(symbol)
+        batches = [missing[i:i + batch_size] for i in range(0, len(missing), batch_size)]
+        return results, batches
+
+    def _merge_batch(self, kind, results, batch, payload, error):
+        found = {}
+        for item in payload or []:
+            if isinstance(item, dict) and item.get('symbol'):
+                found[item['symbol'].upper()] = item
+        for symbol in batch:
+            if symbol in found:
+                # Stored in the same shape as a single-symbol response
+                self._store(f"{kind}:{symbol}", [found[symbol]])
+                results[symbol] = {kind: found[symbol], 'error': None}
+            elif error is None:
+                self._store(f"{kind}:{symbol}", [])
+                results[symbol] = {kind: None, 'error': 'Unknown symbol.'}
+            else:
+                results[symbol] = {kind: None, 'error': error}
+
+
+class FMPClient(BaseFMPClient):
+    """
+    FMP API client with a pooled requests.Session, timeouts, retries with jittered
+    exponential backoff on 429/5xx, and a TTL cache with stale-while-revalidate.
+    """
+    def __init__(self, timeout=(FMP_CONNECT_TIMEOUT, FMP_READ_TIMEOUT),
+                 pool_size=FMP_POOL_SIZE, **kwargs):
+        super().__init__(**kwargs)
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self._flight = SingleFlight()
+        self._refreshing = set()
+        self._refresh_lock = threading.Lock()
+
+    def close(self):
+        self.session.close()
+
+    def _request(self, endpoint, params=None):
+        url = f"{self.base_url}{endpoint}"
+        query = self._query(params)
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            started = time.perf_counter()
+            try:
+                with track_http('fmp'):
+                    response = self.session.get(url, params=query, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                self._observe_upstream(started, 'error')
+                if last_attempt:
+                    raise
+                time.sleep(self._backoff(attempt))
+                continue
+            self._observe_upstream(started, response.status_code)
+            if response.status_code in RETRY_STATUS_CODES and not last_attempt:
+                time.sleep(self._backoff(attempt, response))
+                continue
+            response.raise_for_status()
+            return response.json()
+
+    def _fetch(self, endpoint, params=None):
+        # Concurrent threads asking for the same endpoint share one upstream call
+        key = (endpoint, tuple(sorted((params or {}).items())))
+        return self._flight.do(key, lambda: self._request(endpoint, params))
+
+    def _refresh_in_background(self, key, endpoint, params):
+        with self._refresh_lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                self._store(key, self._fetch(endpoint, params))
+            except requests.RequestException:
+                pass  # keep serving the stale entry until it expires
+            finally:
+                with self._refresh_lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+    def get(self, endpoint, params=None, cache_key=None):
+        """GET an FMP endpoint (relative to base_url) through the cache."""
+        key = cache_key or endpoint
+        entry, result = self._lookup(key)
+        if result == 'hit':
+            return entry[0]
+        if result == 'stale':
+            self._refresh_in_background(key, endpoint, params)
+            return entry[0]
+        return self._store(key, self._fetch(endpoint, params))
+
+    # -- Endpoints --
+
+    def get_stock_quote(self, symbol):
+        symbol = symbol.upper()
+        return self.get(f"quote/{symbol}", cache_key=f"quote:{symbol}")
+
+    def get_historical_prices(self, symbol, start=None, end=None):
+        """
+        Daily OHLCV history for one symbol, optionally bounded by `start`/`end` dates.
+        Returns FMP's payload: {'symbol': ..., 'historical': [{'date', 'open', ...}, ...]}.
+        """
+        symbol = symbol.upper()
+        params = {}
+        if start:
+            params['from'] = str(start)
+        if end:
+            params['to'] = str(end)
+        return self.get(f"historical-price-full/{symbol}", params=params,
+                        cache_key=f"historical:{symbol}:{params.get('from', '')}:{params.get('to', '')}")
+
+    def get_stock_quotes(self, symbols, batch_size=FMP_BATCH_SIZE, max_workers=FMP_BATCH_WORKERS):
+        """
+        Fetch quotes for many symbols using FMP's comma-separated quote endpoint.
+
+        Symbols with a fresh cache entry are served from the cache; the rest are split
+        into batches of `batch_size` and fetched concurrently. Returns a dict keyed by
+        symbol: {'quote': {...} or None, 'error': None or str}. A failed batch or an
+        unknown symbol only marks the affected symbols as failed.
+        """
+        return self._get_batched('quote', symbols, batch_size, max_workers)
+
+    def get_company_profiles(self, symbols, batch_size=FMP_BATCH_SIZE, max_workers=FMP_BATCH_WORKERS):
+        """
+        Batched company profiles (price, lastDiv, mktCap, industry, ...), same contract
+        as get_stock_quotes() but keyed under 'profile'.
+        """
+        return self._get_batched('profile', symbols, batch_size, max_workers)
+
+    def _get_batched(self, kind, symbols, batch_size, max_workers):
+        wanted = normalize_symbols(symbols)
+        results, batches = self._split_cached(kind, wanted, batch_size)
+
+        def fetch(batch):
+            try:
+                return batch, self._fetch(f"{kind}/{','.join(batch)}"), None
+            except requests.RequestException as e:
+                # Never echo the exception text: the request URL carries the API key
+                if e.response is not None:
+                    return batch, None, f"FMP request failed: HTTP {e.response.status_code}"
+                return batch, None, "FMP request failed."
+
+        if batches:
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(batches))) as pool:
+                for batch, payload, error in pool.map(fetch, batches):
+                    self._merge_batch(kind, results, batch, payload, error)
+        return {symbol: results[symbol] for symbol in wanted}
+
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+
+def get_client():
+    """Return the process-wide FMPClient (created lazily)."""
+    global _default_client
+    if _default_client is None:
+        with _default_client_lock:
+            if _default_client is None:
+                _default_client = FMPClient()
+    return _default_client
 
 
 def get_stock_quote(symbol):
@@ -13,7 +418,28 @@ def get_stock_quote(symbol):
     Fetch stock quote from FMP API by symbol.
     Returns JSON response or raises an exception.
     """
-    url = f"{FMP_BASE_URL}quote/{symbol}?apikey={FMP_API_KEY}"
-    response = requests.get(url)
-    response.raise_for_status()
-    return response.json()
+    return get_client().get_stock_quote(symbol)
+
+
+def get_stock_quotes(symbols):
+    """
+    Fetch quotes for several symbols in batched FMP calls.
+    Returns {symbol: {'quote': ..., 'error': ...}}; failures are reported per symbol.
+    """
+    return get_client().get_stock_quotes(symbols)
+
+
+def get_company_profiles(symbols):
+    """
+    Fetch company profiles for several symbols in batched FMP calls.
+    Returns {symbol: {'profile': ..., 'error': ...}}; failures are reported per symbol.
+    """
+    return get_client().get_company_profiles(symbols)
+
+
+def get_historical_prices(symbol, start=None, end=None):
+    """
+    Fetch daily OHLCV history for a symbol from FMP.
+    Returns JSON response or raises an exception.
+    """
+    return get_client().get_historical_prices(symbol, start, end)
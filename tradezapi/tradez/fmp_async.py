@@ -0,0 +1,167 @@
+import asyncio
+import os
+import time
+import weakref
+import aiohttp
+from .fmp import (
+    BaseFMPClient, RETRY_STATUS_CODES, FMP_CONNECT_TIMEOUT, FMP_READ_TIMEOUT,
+    FMP_BATCH_SIZE, FMP_BATCH_WORKERS, normalize_symbols,
+)
+from .profiling import track_http
+
+# asyncio counterpart of FMPClient for views served under ASGI.
+# One event loop can keep hundreds of upstream calls in flight; the connection limits
+# below bound how many sockets that opens. The cache backend (and entry format) is the
+# same as the sync client's, so both paths warm each other.
+
+FMP_ASYNC_MAX_CONNECTIONS = int(os.getenv('FMP_ASYNC_MAX_CONNECTIONS', 200))
+FMP_ASYNC_MAX_PER_HOST = int(os.getenv('FMP_ASYNC_MAX_PER_HOST', 100))
+
+
+class AsyncSingleFlight:
+    """
+    Collapse concurrent awaits for the same key into one: the first caller starts the
+    coroutine as a task, and every caller (the first included) awaits it shielded and
+    shares the result or exception. A caller that is cancelled (its client went away)
+    stops waiting without cancelling the call the others are waiting on.
+    """
+    def __init__(self):
+        self._calls = {}
+
+    async def do(self, key, coro_fn):
+        task = self._calls.get(key)
+        if task is None:
+            task = self._calls[key] = asyncio.ensure_future(coro_fn())
+            task.add_done_callback(lambda done: self._finish(key, done))
+        return await asyncio.shield(task)
+
+    def _finish(self, key, task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception()  # mark retrieved so a failure nobody awaited any more is not logged
+
+
+class AsyncFMPClient(BaseFMPClient):
+    """FMP client on aiohttp with the same retry and cache policy as FMPClient."""
+    def __init__(self, timeout=(FMP_CONNECT_TIMEOUT, FMP_READ_TIMEOUT),
+                 max_connections=FMP_ASYNC_MAX_CONNECTIONS,
+                 max_per_host=FMP_ASYNC_MAX_PER_HOST, **kwargs):
+        super().__init__(**kwargs)
+        connect_timeout, read_timeout = timeout
+        self.timeout = aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout)
+        self.max_connections = max_connections
+        self.max_per_host = max_per_host
+        self._session = None
+        self._flight = AsyncSingleFlight()
+        self._refresh_tasks = {}
+
+    def _get_session(self):
+        # aiohttp sessions must be created inside the event loop that uses them
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_connections, limit_per_host=self.max_per_host)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+        return self._session
+
+    async def aclose(self):
+        """Cancel pending background refreshes and close the HTTP session."""
+        tasks = list(self._refresh_tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self._session is not None:
+            await self._session.close()
+
+    async def _request(self, endpoint, params=None):
+        url = f"{self.base_url}{endpoint}"
+        query = self._query(params)
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            started = time.perf_counter()
+            try:
+                with track_http('fmp'):
+                    async with self._get_session().get(url, params=query) as response:
+                        self._observe_upstream(started, response.status)
+                        if response.status in RETRY_STATUS_CODES and not last_attempt:
+                            delay = self._backoff(attempt, response)
+                        else:
+                            response.raise_for_status()
+                            return await response.json(content_type=None)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                self._observe_upstream(started, 'error')
+                if last_attempt:
+                    raise
+                delay = self._backoff(attempt)
+            await asyncio.sleep(delay)
+
+    async def _fetch(self, endpoint, params=None):
+        # Concurrent tasks asking for the same endpoint share one upstream call
+        key = (endpoint, tuple(sorted((params or {}).items())))
+        return await self._flight.do(key, lambda: self._request(endpoint, params))
+
+    def _refresh_in_background(self, key, endpoint, params):
+        if key in self._refresh_tasks:
+            return
+
+        async def refresh():
+            try:
+                self._store(key, await self._fetch(endpoint, params))
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                pass  # keep serving the stale entry until it expires
+            finally:
+                self._refresh_tasks.pop(key, None)
+
+        self._refresh_tasks[key] = asyncio.ensure_future(refresh())
+
+    async def get(self, endpoint, params=None, cache_key=None):
+        """GET an FMP endpoint (relative to base_url) through the cache."""
+        key = cache_key or endpoint
+        entry, result = self._lookup(key)
+        if result == 'hit':
+            return entry[0]
+        if result == 'stale':
+            self._refresh_in_background(key, endpoint, params)
+            return entry[0]
+        return self._store(key, await self._fetch(endpoint, params))
+
+    # -- Endpoints --
+
+    async def get_stock_quote(self, symbol):
+        symbol = symbol.upper()
+        return await self.get(f"quote/{symbol}", cache_key=f"quote:{symbol}")
+
+    async def get_stock_quotes(self, symbols, batch_size=FMP_BATCH_SIZE, max_workers=FMP_BATCH_WORKERS):
+        """
+        Async variant of FMPClient.get_stock_quotes(); at most `max_workers` batches are in
+        flight at a time, like the sync client's thread pool.
+        """
+        wanted = normalize_symbols(symbols)
+        results, batches = self._split_cached('quote', wanted, batch_size)
+        slots = asyncio.Semaphore(max_workers)
+
+        async def fetch(batch):
+            try:
+                async with slots:
+                    return batch, await self._fetch(f"quote/{','.join(batch)}"), None
+            except aiohttp.ClientResponseError as e:
+                return batch, None, f"FMP request failed: HTTP {e.status}"
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                return batch, None, "FMP request failed."
+
+        for batch, payload, error in await asyncio.gather(*(fetch(b) for b in batches)):
+            self._merge_batch('quote', results, batch, payload, error)
+        return {symbol: results[symbol] for symbol in wanted}
+
+
+# An aiohttp session is bound to the event loop it was created on, so keep one client per
+# loop. Only long-lived loops (an ASGI server's) should use this; see async_views.fmp_client.
+_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_client():
+    """Return the AsyncFMPClient for the running event loop (created lazily)."""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        client = _clients[loop] = AsyncFMPClient()
+    return client
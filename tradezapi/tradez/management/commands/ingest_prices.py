@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+from tradez.models import Stock
+from tradez.prices import ingest_price_history
+
+
+class Command(BaseCommand):
+    help = "Load daily price history from FMP into PriceBar for the given symbols (default: every stock)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('symbols', nargs='*', help='Stock symbols to ingest.')
+        parser.add_argument('--from', dest='start', default=None, help='First date (YYYY-MM-DD).')
+        parser.add_argument('--to', dest='end', default=None, help='Last date (YYYY-MM-DD).')
+
+    def handle(self, *args, **options):
+        stocks = Stock.objects.all()
+        if options['symbols']:
+            symbols = [s.upper() for s in options['symbols']]
+            stocks = stocks.filter(symbol__in=symbols)
+            missing = set(symbols) - set(stocks.values_list('symbol', flat=True))
+            if missing:
+                raise CommandError(f"Unknown symbols: {', '.join(sorted(missing))}")
+        for stock in stocks.order_by('symbol'):
+            written = ingest_price_history(stock, options['start'], options['end'])
+            self.stdout.write(f"{stock.symbol}: {written} bars")
@@ -0,0 +1,38 @@
+import json
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from tradez.profiling import collect_report, reset
+
+
+class Command(BaseCommand):
+    help = "Print the per-route request profile merged from every process's dump in REQUEST_PROFILING_DIR."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--json', action='store_true', help='Print the full report (with histograms) as JSON.')
+        parser.add_argument('--dir', default=None, help='Dump directory (defaults to settings.REQUEST_PROFILING_DIR).')
+        parser.add_argument('--reset', action='store_true', help='Delete the dumps after printing them.')
+
+    def handle(self, *args, **options):
+        directory = options['dir'] or settings.REQUEST_PROFILING_DIR
+        report = collect_report(directory)
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+        elif not report:
+            self.stdout.write(f"No profiles recorded in {directory} (is REQUEST_PROFILING enabled?)")
+        else:
+            header = f"{'route':<48} {'count':>7} {'queries':>8} {'db ms':>8} {'http':>6} {'http ms':>8} {'ser ms':>8} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>9}"
+            self.stdout.write(header)
+            for route, entry in report.items():
+                total = entry['total_ms']
+                self.stdout.write(
+                    f"{route:<48} {entry['count']:>7} {entry['db_queries']['mean']:>8} {entry['db_ms']['mean']:>8} "
+                    f"{entry['http_calls']['mean']:>6} {entry['http_ms']['mean']:>8} {entry['serialization_ms']['mean']:>8} "
+                    f"{_fmt(total['p50']):>8} {_fmt(total['p95']):>8} {total['max']:>9}"
+                )
+        if options['reset']:
+            reset(directory)
+
+
+def _fmt(bound):
+    # Histogram quantiles are bucket upper bounds; None means past the last bucket
+    return bound if bound is not None else '>10000'
@@ -0,0 +1,33 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from tradez.quote_refresher import refresh_quotes, quote_staleness
+
+
+class Command(BaseCommand):
+    help = "Refresh purchase/last_div/market_cap of every stock held in a portfolio from FMP, periodically or once."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Run a single refresh cycle and exit (for cron).')
+        parser.add_argument('--interval', type=int, default=None,
+                            help='Seconds between cycles (defaults to settings.QUOTE_REFRESH_INTERVAL).')
+
+    def handle(self, *args, **options):
+        interval = options['interval'] or settings.QUOTE_REFRESH_INTERVAL
+        while True:
+            started = time.monotonic()
+            try:
+                result = refresh_quotes()
+            except Exception as e:
+                # Keep the worker alive through transient DB/FMP outages
+                if options['once']:
+                    raise
+                self.stderr.write(f"Quote refresh failed: {e}")
+            else:
+                self.stdout.write(
+                    f"Refreshed {result['refreshed']} stocks ({result['changed']} changed), {len(result['failed'])} failed "
+                    f"in {time.monotonic() - started:.2f}s; staleness: {quote_staleness()}"
+                )
+            if options['once']:
+                return
+            time.sleep(max(0, interval - (time.monotonic() - started)))
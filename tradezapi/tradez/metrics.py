@@ -0,0 +1,186 @@
+import os
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import Http404, HttpResponse
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest,
+)
+from prometheus_client import multiprocess
+
+# Prometheus metrics for the API, exposed in text format at /metrics.
+#
+# Under gunicorn (several worker processes) set PROMETHEUS_MULTIPROC_DIR to an empty,
+# writable directory before the workers start: every process then writes its samples
+# there and /metrics aggregates all of them, whichever worker serves the scrape.
+# Call mark_process_dead() from gunicorn's child_exit hook so live gauges drop dead workers.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# --- HTTP ---
+REQUESTS = Counter(
+    'tradez_http_requests_total', 'HTTP requests by route and response status.',
+    ['method', 'route', 'status'])
+REQUEST_LATENCY = Histogram(
+    'tradez_http_request_duration_seconds', 'Wall time of HTTP requests.',
+    ['method', 'route'], buckets=LATENCY_BUCKETS)
+REQUEST_EXCEPTIONS = Counter(
+    'tradez_http_exceptions_total', 'Unhandled exceptions raised by views.',
+    ['method', 'route', 'exception'])
+REQUESTS_IN_PROGRESS = Gauge(
+    'tradez_http_requests_in_progress', 'Requests currently being served.',
+    multiprocess_mode='livesum')
+
+# --- Database ---
+DB_CONNECTIONS_OPENED = Counter(
+    'tradez_db_connections_opened_total', 'New database connections (high values mean no reuse).',
+    ['alias'])
+DB_POOL_SIZE = Gauge(
+    'tradez_db_pool_size', 'Connections held by the pool.', ['alias'], multiprocess_mode='livesum')
+DB_POOL_AVAILABLE = Gauge(
+    'tradez_db_pool_available', 'Idle connections in the pool.', ['alias'], multiprocess_mode='livesum')
+DB_POOL_WAITING = Gauge(
+    'tradez_db_pool_requests_waiting', 'Callers waiting for a pooled connection.', ['alias'],
+    multiprocess_mode='livesum')
+
+# --- FMP ---
+FMP_CACHE_LOOKUPS = Counter(
+    'tradez_fmp_cache_lookups_total', 'FMP cache lookups by result (hit, stale, miss).',
+    ['kind', 'result'])
+FMP_UPSTREAM_REQUESTS = Counter(
+    'tradez_fmp_upstream_requests_total', 'HTTP calls made to FMP, by status code (or "error").',
+    ['status'])
+FMP_UPSTREAM_LATENCY = Histogram(
+    'tradez_fmp_upstream_duration_seconds', 'Latency of HTTP calls to FMP.', buckets=LATENCY_BUCKETS)
+
+# --- Business endpoints ---
+STREAMED_EXPORTS = Counter(
+    'tradez_streamed_exports_total', 'List endpoints served as streamed exports.', ['resource', 'format'])
+RESPONSE_CACHE_LOOKUPS = Counter(
+    'tradez_response_cache_lookups_total',
+    'Server-side response cache lookups by view and result (hit, stale = invalidated entry, miss).',
+    ['view', 'result'])
+THROTTLED_REQUESTS = Counter(
+    'tradez_throttled_requests_total', 'Requests refused (429) by a token-bucket throttle, by budget.', ['scope'])
+ANALYTICS_DURATION = Histogram(
+    'tradez_portfolio_analytics_duration_seconds', 'Time spent computing portfolio analytics.',
+    buckets=LATENCY_BUCKETS)
+
+PRICE_STREAM_SUBSCRIBERS = Gauge(
+    'tradez_price_stream_subscribers', 'Open price stream (SSE) connections.', multiprocess_mode='livesum')
+PRICE_STREAM_EVENTS = Counter(
+    'tradez_price_stream_events_total', 'Quote diffs delivered to price stream subscribers.')
+
+# --- Users ---
+EMAILS_SENT = Counter(
+    'tradez_emails_sent_total', 'Email delivery attempts by kind and result (sent, retry, failed).', ['kind', 'result'])
+EMAIL_QUEUE_DEPTH = Gauge(
+    'tradez_email_queue_depth', 'Pending emails in the outbox, as last seen by the send_emails worker.',
+    multiprocess_mode='livemax')
+PASSWORD_HASH_DURATION = Histogram(
+    'tradez_password_hash_duration_seconds', 'Password hashes through the hashing pool, queueing included.',
+    ['operation'], buckets=LATENCY_BUCKETS)
+PASSWORD_HASH_REJECTIONS = Counter(
+    'tradez_password_hash_rejections_total', 'Password hashes refused (503) because the hashing pool was full.')
+GOOGLE_VERIFICATIONS = Counter(
+    'tradez_google_token_verifications_total', 'Google token verifications by result.', ['result'])
+
+
+def cache_kind(key):
+    """Metric label for a cache key: its prefix ('quote:AAPL' -> 'quote', 'quote/AAPL' -> 'quote')."""
+    return key.split(':', 1)[0].split('/', 1)[0]
+
+
+def _count_connection(sender, connection, **kwargs):
+    DB_CONNECTIONS_OPENED.labels(connection.alias).inc()
+
+
+connection_created.connect(_count_connection)
+
+
+def _observe_db_pools():
+    for alias in connections:
+        # Django >= 5.1 exposes the psycopg pool as connection.pool when OPTIONS['pool'] is set
+        pool = getattr(connections[alias], 'pool', None) if connections[alias].connection is not None else None
+        if pool is None or not hasattr(pool, 'get_stats'):
+            continue
+        stats = pool.get_stats()
+        DB_POOL_SIZE.labels(alias).set(stats.get('pool_size', 0))
+        DB_POOL_AVAILABLE.labels(alias).set(stats.get('pool_available', 0))
+        DB_POOL_WAITING.labels(alias).set(stats.get('requests_waiting', 0))
+
+
+def _route(request):
+    # The URL pattern, not the path, keeps label cardinality bounded
+    match = getattr(request, 'resolver_match', None)
+    return f"/{match.route}" if match is not None else '<unmatched>'
+
+
+class PrometheusMiddleware:
+    """Count and time every request under its URL route."""
+    # Both, so being first in MIDDLEWARE does not force the ASGI stack into sync mode
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PROMETHEUS_METRICS', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        REQUESTS_IN_PROGRESS.inc()
+        try:
+            response = self.get_response(request)
+        finally:
+            REQUESTS_IN_PROGRESS.dec()
+        return self._observe(request, response, started)
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        REQUESTS_IN_PROGRESS.inc()
+        try:
+            response = await self.get_response(request)
+        finally:
+            REQUESTS_IN_PROGRESS.dec()
+        return self._observe(request, response, started)
+
+    def _observe(self, request, response, started):
+        route = _route(request)
+        REQUEST_LATENCY.labels(request.method, route).observe(time.perf_counter() - started)
+        REQUESTS.labels(request.method, route, str(response.status_code)).inc()
+        _observe_db_pools()
+        return response
+
+    def process_exception(self, request, exception):
+        REQUEST_EXCEPTIONS.labels(request.method, _route(request), type(exception).__name__).inc()
+
+
+def render_metrics(multiproc_dir=None):
+    """Current metrics in the Prometheus text format, aggregated over processes when multiprocess."""
+    multiproc_dir = multiproc_dir or os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if multiproc_dir:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry, path=multiproc_dir)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+def metrics_view(request):
+    """GET /metrics for the Prometheus scraper."""
+    if not getattr(settings, 'PROMETHEUS_METRICS', True):
+        raise Http404
+    return HttpResponse(render_metrics(), content_type=CONTENT_TYPE_LATEST)
+
+
+def mark_process_dead(pid):
+    """gunicorn child_exit hook: drop a dead worker's live gauges from the multiprocess directory."""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        multiprocess.mark_process_dead(pid)
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tradez', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='comment',
+            name='created_on',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='stock',
+            name='industry',
+            field=models.CharField(db_index=True, max_length=64),
+        ),
+    ]
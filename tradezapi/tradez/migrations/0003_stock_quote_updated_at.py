@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tradez', '0002_stock_industry_comment_created_on_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stock',
+            name='quote_updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tradez', '0003_stock_quote_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceBar',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('open', models.FloatField()),
+                ('high', models.FloatField()),
+                ('low', models.FloatField()),
+                ('close', models.FloatField()),
+                ('volume', models.BigIntegerField(default=0)),
+                ('stock', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='price_bars', to='tradez.stock')),
+            ],
+            options={
+                'db_table': 'price_bars',
+                'constraints': [models.UniqueConstraint(fields=('stock', 'date'), name='price_bars_stock_date_uniq')],
+            },
+        ),
+    ]
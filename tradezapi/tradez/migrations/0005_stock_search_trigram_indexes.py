@@ -0,0 +1,38 @@
+from django.db import migrations
+
+# pg_trgm GIN indexes for the database-side stock search (tradez.search.search_database):
+# UPPER(...) matches what istartswith/icontains compile to, the plain company_name index
+# serves trigram similarity. PostgreSQL only; a no-op on other backends.
+# Creating the extension needs a role allowed to CREATE EXTENSION.
+
+INDEXES = [
+    ('stocks_symbol_upper_trgm', 'UPPER("symbol") gin_trgm_ops'),
+    ('stocks_company_name_upper_trgm', 'UPPER("company_name") gin_trgm_ops'),
+    ('stocks_company_name_trgm', '"company_name" gin_trgm_ops'),
+]
+
+
+def create_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, expression in INDEXES:
+        schema_editor.execute(f'CREATE INDEX IF NOT EXISTS "{name}" ON "stocks" USING gin ({expression})')
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _ in INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{name}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tradez', '0004_pricebar'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
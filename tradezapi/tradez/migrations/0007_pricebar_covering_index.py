@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tradez', '0006_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pricebar',
+            index=models.Index(fields=['stock', 'date', 'close'], name='price_bars_stock_date_close'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def pack_existing_bars(apps, schema_editor):
+    import numpy as np
+    PriceBar = apps.get_model('tradez', 'PriceBar')
+    PriceSeries = apps.get_model('tradez', 'PriceSeries')
+    bars = PriceBar.objects.using(schema_editor.connection.alias)
+    for stock_id in bars.values_list('stock_id', flat=True).distinct():
+        rows = list(bars.filter(stock_id=stock_id).order_by('date').values_list('date', 'close'))
+        PriceSeries.objects.using(schema_editor.connection.alias).create(
+            stock_id=stock_id,
+            days=np.array([row[0] for row in rows], dtype='datetime64[D]').astype(np.int32).tobytes(),
+            closes=np.array([row[1] for row in rows], dtype=float).tobytes(),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tradez', '0007_pricebar_covering_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceSeries',
+            fields=[
+                ('stock', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='price_series', serialize=False, to='tradez.stock')),
+                ('days', models.BinaryField()),
+                ('closes', models.BinaryField()),
+            ],
+            options={
+                'db_table': 'price_series',
+            },
+        ),
+        migrations.RunPython(pack_existing_bars, migrations.RunPython.noop),
+    ]
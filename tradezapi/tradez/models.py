@@ -7,8 +7,12 @@ class Stock(models.Model):
     company_name = models.CharField(max_length=128)
     purchase = models.DecimalField(max_digits=18, decimal_places=2)
     last_div = models.DecimalField(max_digits=18, decimal_places=2)
-    industry = models.CharField(max_length=64)
+    industry = models.CharField(max_length=64, db_index=True)
     market_cap = models.BigIntegerField()
+    # Last time the quote refresher wrote purchase/last_div/market_cap from FMP
+    quote_updated_at = models.DateTimeField(null=True, blank=True)
+    # Row version for ETag/Last-Modified; bulk writers must include it in their update fields
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         db_table="stocks"
@@ -21,24 +25,70 @@ class Stock(models.Model):
 class Portfolio(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='portfolios', on_delete=models.CASCADE)
     stock = models.ForeignKey('Stock', related_name='portfolios', on_delete=models.CASCADE)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         db_table="portfolios"
 
     def __str__(self):
-        return f"{self.user.username} - {self.stock.symbol}"
+        # Only use related objects that are already loaded; never trigger a query from __str__
+        user = self.user.username if Portfolio.user.is_cached(self) else self.user_id
+        stock = self.stock.symbol if Portfolio.stock.is_cached(self) else self.stock_id
+        return f"{user} - {stock}"
 
 # Comment model: linked to a user and (optionally) a stock
 class Comment(models.Model):
     title = models.CharField(max_length=128)
     content = models.TextField()
-    created_on = models.DateTimeField(auto_now_add=True)
+    created_on = models.DateTimeField(auto_now_add=True, db_index=True)
     stock = models.ForeignKey('Stock', related_name='comments', null=True, blank=True, on_delete=models.SET_NULL)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='comments', on_delete=models.CASCADE)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         db_table="comments"
 
     def __str__(self):
-        return f"Comment by {self.user.username} on {self.created_on.strftime('%Y-%m-%d')}"
+        user = self.user.username if Comment.user.is_cached(self) else self.user_id
+        return f"Comment by {user} on {self.created_on.strftime('%Y-%m-%d')}"
 
+
+# PriceBar model: one daily OHLCV bar of a stock's price history
+class PriceBar(models.Model):
+    stock = models.ForeignKey('Stock', related_name='price_bars', on_delete=models.CASCADE)
+    date = models.DateField()
+    # Floats rather than Decimals: 8 bytes per value and they load straight into NumPy arrays
+    open = models.FloatField()
+    high = models.FloatField()
+    low = models.FloatField()
+    close = models.FloatField()
+    volume = models.BigIntegerField(default=0)
+
+    class Meta:
+        db_table="price_bars"
+        # The unique (stock, date) index doubles as the index for range queries
+        constraints = [
+            models.UniqueConstraint(fields=['stock', 'date'], name='price_bars_stock_date_uniq'),
+        ]
+        # Covers the analytics load (closes of a set of stocks), so it reads no table rows:
+        # daily appends interleave the stocks' bars, and those row lookups dominated it
+        indexes = [
+            models.Index(fields=['stock', 'date', 'close'], name='price_bars_stock_date_close'),
+        ]
+
+    def __str__(self):
+        return f"{self.stock_id} {self.date} close={self.close}"
+
+
+# PriceSeries model: a stock's PriceBar dates and closes packed into two arrays, kept up to
+# date by ingest_price_history so the analytics read one row per stock, not one per bar
+class PriceSeries(models.Model):
+    stock = models.OneToOneField('Stock', primary_key=True, related_name='price_series', on_delete=models.CASCADE)
+    days = models.BinaryField()  # int32 days since 1970-01-01, ascending
+    closes = models.BinaryField()  # float64, one per day
+
+    class Meta:
+        db_table="price_series"
+
+    def __str__(self):
+        return f"{self.stock_id} ({len(self.days) // 4} days)"
@@ -0,0 +1,53 @@
+from rest_framework.pagination import CursorPagination
+
+# Keyset (cursor) pagination for the list endpoints.
+# Pages are addressed by an opaque cursor that encodes the last seen value of an
+# indexed column, so fetching page N never issues an OFFSET scan over N pages.
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Base cursor paginator with a bounded page size and a whitelisted sort column.
+
+    Query params (mirroring the .NET QueryObject):
+      - sort_by: one of `ordering_fields`, defaults to the first entry
+      - is_descending: 'true' / 'false'
+      - page_size: capped at `max_page_size`
+      - cursor: opaque token taken from the `next` / `previous` links
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering_fields = ('id',)
+    default_descending = False
+
+    def get_ordering(self, request, queryset, view):
+        sort_by = request.query_params.get('sort_by')
+        if sort_by not in self.ordering_fields:
+            sort_by = self.ordering_fields[0]
+        is_descending = request.query_params.get('is_descending')
+        if is_descending is None:
+            descending = self.default_descending
+        else:
+            descending = is_descending.lower() in ('1', 'true', 'yes')
+        prefix = '-' if descending else ''
+        # The primary key is appended as a tie-breaker so pages stay stable
+        # when the sort column is not unique (e.g. created_on).
+        ordering = [f'{prefix}{sort_by}']
+        if sort_by != 'id':
+            ordering.append(f'{prefix}id')
+        return tuple(ordering)
+
+
+class StockPagination(KeysetPagination):
+    ordering_fields = ('id', 'symbol')
+
+
+class PortfolioPagination(KeysetPagination):
+    ordering_fields = ('id',)
+
+
+class CommentPagination(KeysetPagination):
+    ordering_fields = ('created_on', 'id')
+    # Newest comments first, as in the .NET CommentQueryObject
+    default_descending = True
@@ -0,0 +1,21 @@
+import json
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+
+class NDJSONParser(BaseParser):
+    """Newline-delimited JSON (one object per line) -> list, for the bulk endpoints."""
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', settings.DEFAULT_CHARSET)
+        items = []
+        for number, line in enumerate(stream.read().decode(encoding).splitlines(), 1):
+            if not line.strip():
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError as e:
+                raise ParseError(f'NDJSON parse error on line {number}: {e}')
+        return items
@@ -0,0 +1,161 @@
+import asyncio
+import json
+import logging
+from datetime import timedelta
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from .metrics import PRICE_STREAM_EVENTS, PRICE_STREAM_SUBSCRIBERS
+from .models import Stock
+from .serializers import StockSerializer
+
+# Server-Sent Events price push (GET /api/quotes/stream/?symbols=AAPL,MSFT, under ASGI).
+#
+# The quote refresher writes prices to the database; each process runs ONE poll loop that
+# reads the stocks changed since its last look, for the union of the symbols its clients
+# follow, and fans the changed fields out to their subscribers. However many clients
+# watch a symbol, it costs one row in one query per PRICE_STREAM_POLL_INTERVAL.
+#
+# A subscriber is a dict of pending diffs plus an asyncio.Event: publishing merges into
+# the dict, so a slow client gets the latest values rather than a growing backlog, and
+# an idle one costs a few hundred bytes while it waits.
+
+logger = logging.getLogger('django')
+
+FIELDS = ('purchase', 'last_div', 'market_cap', 'quote_updated_at')
+QUERY_CHUNK = 500  # symbols per IN (...) query
+# Rows are re-read for this long after their updated_at, so a refresh whose transaction
+# commits after a poll has moved past its timestamp is still seen (diffs drop repeats).
+LOOKBACK = timedelta(seconds=5)
+
+_representation = {name: field.to_representation for name, field in StockSerializer().fields.items() if name in FIELDS}
+
+
+def _quote(row):
+    """API representation of FIELDS of a (symbol, *FIELDS) row, as in GET /api/stocks/<id>/."""
+    return {name: None if value is None else _representation[name](value) for name, value in zip(FIELDS, row[1:])}
+
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+class Subscriber:
+    def __init__(self, symbols):
+        self.symbols = symbols
+        self.pending = {}  # symbol -> changed fields not yet sent
+        self.event = asyncio.Event()
+
+    def publish(self, symbol, diff):
+        self.pending.setdefault(symbol, {}).update(diff)
+        self.event.set()
+
+    def take(self):
+        pending, self.pending = self.pending, {}
+        self.event.clear()
+        return pending
+
+
+class PriceBroker:
+    """Per-process registry of subscribers and the shared poll loop feeding them."""
+    def __init__(self):
+        self.subscribers = {}  # symbol -> set of Subscriber
+        self.latest = {}  # symbol -> last published quote
+        self.since = None  # newest updated_at seen by the poll loop
+        self._task = None
+
+    def subscribe(self, symbols):
+        subscriber = Subscriber(symbols)
+        for symbol in symbols:
+            self.subscribers.setdefault(symbol, set()).add(subscriber)
+        PRICE_STREAM_SUBSCRIBERS.inc()
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        for symbol in subscriber.symbols:
+            watchers = self.subscribers.get(symbol)
+            if watchers is not None:
+                watchers.discard(subscriber)
+                if not watchers:
+                    del self.subscribers[symbol]
+                    self.latest.pop(symbol, None)
+        PRICE_STREAM_SUBSCRIBERS.dec()
+
+    def load(self, symbols, since=None):
+        """(symbol, *FIELDS, updated_at) rows of `symbols`, only those changed since `since` if given."""
+        rows = []
+        symbols = list(symbols)
+        for i in range(0, len(symbols), QUERY_CHUNK):
+            stocks = Stock.objects.filter(symbol__in=symbols[i:i + QUERY_CHUNK])
+            if since is not None:
+                stocks = stocks.filter(updated_at__gte=since - LOOKBACK)
+            rows.extend(stocks.values_list('symbol', *FIELDS, 'updated_at'))
+        return rows
+
+    def apply(self, rows):
+        """Publish the fields of `rows` that differ from what subscribers last got."""
+        for row in rows:
+            symbol, updated_at = row[0], row[-1]
+            if self.since is None or updated_at > self.since:
+                self.since = updated_at
+            quote = _quote(row[:-1])
+            previous = self.latest.get(symbol)
+            diff = {k: v for k, v in quote.items() if previous is None or previous.get(k) != v}
+            self.latest[symbol] = quote
+            if previous is None or not diff.keys() - {'quote_updated_at'}:
+                # First sighting (clients got it in their snapshot), or a re-read row whose
+                # quote did not change, only its quote_updated_at
+                continue
+            for subscriber in self.subscribers.get(symbol, ()):
+                subscriber.publish(symbol, diff)
+            PRICE_STREAM_EVENTS.inc(len(self.subscribers.get(symbol, ())))
+
+    def load_missing(self, symbols):
+        """Seed `latest` with the symbols the poll loop does not track yet."""
+        for row in self.load([symbol for symbol in symbols if symbol not in self.latest]):
+            self.latest.setdefault(row[0], _quote(row[:-1]))
+
+    def snapshot(self, symbols):
+        """Current quote of each symbol (None if unknown)."""
+        return {symbol: self.latest.get(symbol) for symbol in symbols}
+
+    async def poll_once(self):
+        if self.subscribers:
+            self.apply(await sync_to_async(self.load)(list(self.subscribers), self.since))
+
+    async def _run(self):
+        try:
+            while self.subscribers:
+                try:
+                    await self.poll_once()
+                except Exception as e:  # keep streaming through transient DB errors
+                    logger.warning(f"[PriceStream] Poll failed: {e}")
+                await asyncio.sleep(settings.PRICE_STREAM_POLL_INTERVAL)
+        finally:
+            self._task = None
+
+    def ensure_polling(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stream(self, symbols):
+        """SSE chunks for one client: a snapshot, then a `quote` event per changed symbol."""
+        subscriber = self.subscribe(symbols)
+        try:
+            # Symbols other clients already follow are served from memory: `latest` is at
+            # most one poll behind, and the poll then sends the difference.
+            if any(symbol not in self.latest for symbol in symbols):
+                await sync_to_async(self.load_missing)(symbols)
+            self.ensure_polling()
+            yield f"retry: {settings.PRICE_STREAM_RETRY_MS}\n\n" + _sse('snapshot', self.snapshot(symbols))
+            while True:
+                try:
+                    await asyncio.wait_for(subscriber.event.wait(), settings.PRICE_STREAM_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield ': keepalive\n\n'  # stops proxies from closing idle streams
+                    continue
+                yield ''.join(_sse('quote', {'symbol': symbol, **diff}) for symbol, diff in subscriber.take().items())
+        finally:
+            self.unsubscribe(subscriber)
+
+
+broker = PriceBroker()
@@ -0,0 +1,101 @@
+from datetime import date as date_cls
+from django.db import transaction
+from django.db.models import Max, Min, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+from .analytics import pack_price_series
+from .fmp import get_historical_prices
+from .models import PriceBar
+
+# Price history storage: bulk ingestion from FMP and columnar range queries.
+# Range results are dicts of equal-length lists ({'date': [...], 'close': [...], ...})
+# so callers can hand each column to numpy.asarray() without reshaping.
+
+PRICE_COLUMNS = ('date', 'open', 'high', 'low', 'close', 'volume')
+INTERVALS = {
+    'daily': None,
+    'weekly': TruncWeek,
+    'monthly': TruncMonth,
+}
+INGEST_BATCH_SIZE = 1000
+
+
+def ingest_price_history(stock, start=None, end=None, fetch=get_historical_prices):
+    """
+    Load FMP daily bars for `stock` into PriceBar, upserting on (stock, date) so
+    re-running over an overlapping range only rewrites the changed rows, then repack the
+    stock's PriceSeries (anything else that writes bars must call pack_price_series() too).
+    Returns the number of bars written.
+    """
+    payload = fetch(stock.symbol, start, end) or {}
+    bars = []
+    for row in payload.get('historical', []):
+        try:
+            bars.append(PriceBar(
+                stock=stock,
+                date=date_cls.fromisoformat(row['date'][:10]),
+                open=float(row['open']),
+                high=float(row['high']),
+                low=float(row['low']),
+                close=float(row['close']),
+                volume=int(row.get('volume') or 0),
+            ))
+        except (KeyError, TypeError, ValueError):
+            continue  # skip malformed rows rather than failing the whole ingest
+    with transaction.atomic():
+        PriceBar.objects.bulk_create(
+            bars,
+            batch_size=INGEST_BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=['stock', 'date'],
+            update_fields=['open', 'high', 'low', 'close', 'volume'],
+        )
+        pack_price_series(stock.id)
+    return len(bars)
+
+
+def _columns(rows):
+    columns = {name: [] for name in PRICE_COLUMNS}
+    for row in rows:
+        for name, value in zip(PRICE_COLUMNS, row):
+            columns[name].append(value)
+    return columns
+
+
+def price_range(stock_id, start=None, end=None, interval='daily'):
+    """
+    Bars of one stock between `start` and `end` (inclusive) as columns, oldest first.
+
+    'weekly' and 'monthly' downsample in the database: high/low/volume are aggregated per
+    period and open/close are taken from the first/last trading day of the period, so the
+    query returns one row per period regardless of how many daily bars are stored.
+    """
+    if interval not in INTERVALS:
+        raise ValueError(f"Unknown interval: {interval}")
+    bars = PriceBar.objects.filter(stock_id=stock_id)
+    if start:
+        bars = bars.filter(date__gte=start)
+    if end:
+        bars = bars.filter(date__lte=end)
+    trunc = INTERVALS[interval]
+    if trunc is None:
+        return _columns(bars.order_by('date').values_list(*PRICE_COLUMNS))
+
+    periods = list(
+        bars.annotate(period=trunc('date'))
+        .values('period')
+        .annotate(first_date=Min('date'), last_date=Max('date'),
+                  high=Max('high'), low=Min('low'), volume=Sum('volume'))
+        .order_by('period')
+    )
+    # Second query: open of each period's first day and close of its last day
+    boundary_dates = {p['first_date'] for p in periods} | {p['last_date'] for p in periods}
+    open_close = {
+        day: (open_, close)
+        for day, open_, close in bars.filter(date__in=boundary_dates).values_list('date', 'open', 'close')
+    }
+    rows = (
+        (p['period'], open_close[p['first_date']][0], p['high'], p['low'],
+         open_close[p['last_date']][1], p['volume'])
+        for p in periods
+    )
+    return _columns(rows)
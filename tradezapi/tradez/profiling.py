@@ -0,0 +1,261 @@
+import json
+import os
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+# Per-request profiling: SQL queries, outbound HTTP calls (FMP, Google), response
+# rendering (serialization) and wall time, aggregated into per-route histograms.
+#
+# Enabled with settings.REQUEST_PROFILING. When disabled the middleware removes itself
+# (MiddlewareNotUsed) and track_http() only does a ContextVar lookup.
+#
+# Each process keeps its own aggregates and periodically dumps them to
+# REQUEST_PROFILING_DIR/<pid>.json; readers (admin endpoint, profile_report command)
+# merge every dump, so the report covers all workers.
+
+_current = ContextVar('request_profile', default=None)
+
+MS_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+METRICS = {
+    'db_queries': COUNT_BUCKETS,
+    'db_ms': MS_BUCKETS,
+    'http_calls': COUNT_BUCKETS,
+    'http_ms': MS_BUCKETS,
+    'serialization_ms': MS_BUCKETS,
+    'total_ms': MS_BUCKETS,
+}
+
+
+class RequestProfile:
+    __slots__ = ('db_queries', 'db_ms', 'http_calls', 'http_ms', 'http_by_service', 'serialization_ms')
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_ms = 0.0
+        self.http_calls = 0
+        self.http_ms = 0.0
+        self.http_by_service = {}
+        self.serialization_ms = 0.0
+
+    def record_http(self, service, elapsed_ms):
+        self.http_calls += 1
+        self.http_ms += elapsed_ms
+        calls, total = self.http_by_service.get(service, (0, 0.0))
+        self.http_by_service[service] = (calls + 1, total + elapsed_ms)
+
+
+@contextmanager
+def track_http(service):
+    """Time an outbound HTTP call and attribute it to the current request, if profiled."""
+    profile = _current.get()
+    if profile is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.record_http(service, (time.perf_counter() - started) * 1000)
+
+
+# --- Aggregation ---
+
+def _empty_route():
+    return {
+        'count': 0,
+        'metrics': {name: {'sum': 0.0, 'max': 0.0, 'buckets': [0] * (len(bounds) + 1)}
+                    for name, bounds in METRICS.items()},
+        'http_by_service': {},
+    }
+
+
+class ProfileRegistry:
+    """Thread-safe per-route aggregates for this process."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.routes = {}
+        self._last_flush = time.monotonic()
+
+    def record(self, route, values, http_by_service):
+        with self._lock:
+            entry = self.routes.get(route)
+            if entry is None:
+                entry = self.routes[route] = _empty_route()
+            entry['count'] += 1
+            for name, value in values.items():
+                metric = entry['metrics'][name]
+                metric['sum'] += value
+                metric['max'] = max(metric['max'], value)
+                metric['buckets'][_bucket(METRICS[name], value)] += 1
+            for service, (calls, total) in http_by_service.items():
+                calls_before, total_before = entry['http_by_service'].get(service, (0, 0.0))
+                entry['http_by_service'][service] = (calls_before + calls, total_before + total)
+
+    def snapshot(self):
+        with self._lock:
+            return json.loads(json.dumps(self.routes))
+
+    def flush(self, directory, force=False):
+        """Dump this process's aggregates to `directory`, at most once per flush interval."""
+        now = time.monotonic()
+        if not force and now - self._last_flush < settings.REQUEST_PROFILING_FLUSH_INTERVAL:
+            return
+        self._last_flush = now
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'{os.getpid()}.json')
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp_path, path)
+
+
+def _bucket(bounds, value):
+    for i, bound in enumerate(bounds):
+        if value <= bound:
+            return i
+    return len(bounds)
+
+
+registry = ProfileRegistry()
+
+
+def merge(snapshots):
+    merged = {}
+    for routes in snapshots:
+        for route, entry in routes.items():
+            target = merged.setdefault(route, _empty_route())
+            target['count'] += entry['count']
+            for name, metric in entry['metrics'].items():
+                into = target['metrics'][name]
+                into['sum'] += metric['sum']
+                into['max'] = max(into['max'], metric['max'])
+                into['buckets'] = [a + b for a, b in zip(into['buckets'], metric['buckets'])]
+            for service, (calls, total) in entry['http_by_service'].items():
+                calls_before, total_before = target['http_by_service'].get(service, (0, 0.0))
+                target['http_by_service'][service] = (calls_before + calls, total_before + total)
+    return merged
+
+
+def _quantile(bounds, buckets, q):
+    """Upper bound of the histogram bucket holding the q-quantile (None if past the last bound)."""
+    total = sum(buckets)
+    if not total:
+        return None
+    running = 0
+    for i, count in enumerate(buckets):
+        running += count
+        if running >= q * total:
+            return bounds[i] if i < len(bounds) else None
+    return None
+
+
+def collect_report(directory=None):
+    """Merged per-route report over every process dump in `directory` (plus this process)."""
+    directory = directory or settings.REQUEST_PROFILING_DIR
+    snapshots = {os.getpid(): registry.snapshot()}
+    if os.path.isdir(directory):
+        for name in os.listdir(directory):
+            if not name.endswith('.json'):
+                continue
+            pid = int(name[:-5]) if name[:-5].isdigit() else name
+            if pid in snapshots:
+                continue  # this process's live data supersedes its last dump
+            try:
+                with open(os.path.join(directory, name)) as f:
+                    snapshots[pid] = json.load(f)
+            except (OSError, ValueError):
+                continue
+    report = {}
+    for route, entry in sorted(merge(snapshots.values()).items()):
+        count = entry['count']
+        report[route] = {
+            'count': count,
+            'http_by_service': {
+                service: {'calls': calls, 'total_ms': round(total, 2)}
+                for service, (calls, total) in entry['http_by_service'].items()
+            },
+        }
+        for name, metric in entry['metrics'].items():
+            bounds = METRICS[name]
+            report[route][name] = {
+                'mean': round(metric['sum'] / count, 2) if count else None,
+                'max': round(metric['max'], 2),
+                'p50': _quantile(bounds, metric['buckets'], 0.50),
+                'p95': _quantile(bounds, metric['buckets'], 0.95),
+                'p99': _quantile(bounds, metric['buckets'], 0.99),
+                'buckets': dict(zip([f'le_{b}' for b in bounds] + ['le_inf'], metric['buckets'])),
+            }
+    return report
+
+
+def reset(directory=None):
+    directory = directory or settings.REQUEST_PROFILING_DIR
+    with registry._lock:
+        registry.routes.clear()
+    if os.path.isdir(directory):
+        for name in os.listdir(directory):
+            if name.endswith('.json'):
+                os.remove(os.path.join(directory, name))
+
+
+# --- Middleware ---
+
+class RequestProfilingMiddleware:
+    """Collect a RequestProfile for every request and record it under its URL route."""
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_PROFILING', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        profile = RequestProfile()
+        token = _current.set(profile)
+        started = time.perf_counter()
+
+        def count_query(execute, sql, params, many, context):
+            query_started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                profile.db_queries += 1
+                profile.db_ms += (time.perf_counter() - query_started) * 1000
+
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(count_query))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        total_ms = (time.perf_counter() - started) * 1000
+
+        match = getattr(request, 'resolver_match', None)
+        route = f"{request.method} /{match.route}" if match is not None else f"{request.method} <unresolved>"
+        registry.record(route, {
+            'db_queries': profile.db_queries,
+            'db_ms': profile.db_ms,
+            'http_calls': profile.http_calls,
+            'http_ms': profile.http_ms,
+            'serialization_ms': profile.serialization_ms,
+            'total_ms': total_ms,
+        }, profile.http_by_service)
+        registry.flush(settings.REQUEST_PROFILING_DIR)
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered (serialized to bytes) right after this hook
+        profile = _current.get()
+        if profile is not None:
+            render_started = time.perf_counter()
+
+            def rendered(response):
+                profile.serialization_ms += (time.perf_counter() - render_started) * 1000
+
+            response.add_post_render_callback(rendered)
+        return response
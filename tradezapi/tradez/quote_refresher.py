@@ -0,0 +1,105 @@
+import logging
+from decimal import Decimal, InvalidOperation
+from django.db import transaction
+from django.utils import timezone
+from .fmp import get_company_profiles
+from .models import Stock, Portfolio
+from . import response_cache
+
+# Keeps Stock.purchase / last_div / market_cap warm from FMP so request handlers only
+# read the database. Driven by `python manage.py refresh_quotes`.
+
+logger = logging.getLogger('django')
+
+# bulk_update() skips auto_now, so updated_at (the row version behind ETags, the response
+# cache and the price stream poll) is set by hand, and only when a quote value changed.
+# Unchanged stocks just get a new quote_updated_at, which leaves updated_at alone.
+QUOTE_FIELDS = ['purchase', 'last_div', 'market_cap']
+REFRESH_FIELDS = QUOTE_FIELDS + ['quote_updated_at', 'updated_at']
+BATCH_SIZE = 500
+
+
+def tracked_stocks():
+    """Stocks referenced by at least one Portfolio row."""
+    return Stock.objects.filter(id__in=Portfolio.objects.values('stock_id'))
+
+
+def _decimal(value):
+    try:
+        return Decimal(str(value)).quantize(Decimal('0.01'))
+    except (InvalidOperation, TypeError, ValueError):
+        return None
+
+
+def _int(value):
+    try:
+        return int(Decimal(str(value)))
+    except (InvalidOperation, TypeError, ValueError, OverflowError):
+        return None
+
+
+def refresh_quotes(fetch=get_company_profiles):
+    """
+    Refresh every tracked stock with one batched FMP profile lookup (the .NET
+    ToStockFromFMP mapping: price -> purchase, lastDiv -> last_div, mktCap -> market_cap)
+    and write the stocks whose quote changed with a single bulk_update.
+    Returns {'refreshed': n, 'changed': n, 'failed': {symbol: error}}.
+    """
+    stocks = list(tracked_stocks().only('id', 'symbol', *REFRESH_FIELDS))
+    profiles = fetch([stock.symbol for stock in stocks])
+    now = timezone.now()
+    updated = []
+    unchanged = []
+    failed = {}
+    for stock in stocks:
+        result = profiles.get(stock.symbol.upper())
+        profile = result and result['profile']
+        if not profile:
+            failed[stock.symbol] = result['error'] if result else 'Unknown symbol.'
+            continue
+        market_cap = stock.market_cap
+        if profile.get('mktCap') is not None:
+            market_cap = _int(profile['mktCap'])
+            if market_cap is None:
+                failed[stock.symbol] = f"Invalid mktCap: {profile['mktCap']!r}"
+                continue
+        price = _decimal(profile.get('price'))
+        last_div = _decimal(profile.get('lastDiv'))
+        quote = {
+            'purchase': stock.purchase if price is None else price,
+            'last_div': stock.last_div if last_div is None else last_div,
+            'market_cap': market_cap,
+        }
+        if all(getattr(stock, name) == value for name, value in quote.items()):
+            unchanged.append(stock.id)
+            continue
+        for name, value in quote.items():
+            setattr(stock, name, value)
+        stock.quote_updated_at = now
+        stock.updated_at = now
+        updated.append(stock)
+    with transaction.atomic():
+        Stock.objects.bulk_update(updated, REFRESH_FIELDS, batch_size=BATCH_SIZE)
+        for i in range(0, len(unchanged), BATCH_SIZE):
+            Stock.objects.filter(id__in=unchanged[i:i + BATCH_SIZE]).update(quote_updated_at=now)
+    if updated:
+        response_cache.invalidate_model(Stock)
+    if failed:
+        logger.warning(f"[QuoteRefresher] Failed to refresh {len(failed)} symbols: {failed}")
+    return {'refreshed': len(updated) + len(unchanged), 'changed': len(updated), 'failed': failed}
+
+
+def quote_staleness():
+    """
+    Staleness of the tracked stocks' quotes: count, how many were never refreshed, and
+    the oldest / mean age in seconds of the rest.
+    """
+    now = timezone.now()
+    timestamps = list(tracked_stocks().values_list('quote_updated_at', flat=True))
+    ages = [(now - updated_at).total_seconds() for updated_at in timestamps if updated_at is not None]
+    return {
+        'tracked': len(timestamps),
+        'never_refreshed': len(timestamps) - len(ages),
+        'max_age_seconds': round(max(ages), 1) if ages else None,
+        'mean_age_seconds': round(sum(ages) / len(ages), 1) if ages else None,
+    }
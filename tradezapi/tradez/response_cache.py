@@ -0,0 +1,186 @@
+import hashlib
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.db import transaction
+from rest_framework.response import Response
+from tradezapi.database import reading_from_replica
+from .conditional import conditional_get
+from .metrics import RESPONSE_CACHE_LOOKUPS
+
+# Server-side cache of the serialized payloads of the stock, portfolio and comment
+# read endpoints, in the 'responses' cache alias (LRU + TTL eviction come from it).
+#
+# Entries are invalidated through tags rather than by deleting keys: every tag has a
+# version counter in the cache, and an entry records the versions of its tags when it
+# was built. It is served only while all of them are unchanged.
+#   "<model>"        the collection: any row created, changed or deleted (list views)
+#   "<model>:<pk>"   one row (detail views, and rows nested into other payloads)
+#   "<model>:*"      every row at once, bumped by bulk writes that send no signals
+# post_save / post_delete bump the collection and row tags at once and again on commit.
+#
+# Versions of the tags known from the URL are read before the database is queried, so a
+# concurrent write always invalidates what is being built. Tags of nested rows are only
+# known after the query; for those RESPONSE_CACHE_TIMEOUT bounds that (narrow) race.
+
+TAG_PREFIX = 'tag:'
+ROW_TAGS_PER_COMMIT = 100  # past this many rows of one model, the commit bumps "<model>:*" instead
+
+_deferred = ContextVar('response_cache_deferred', default=None)
+
+
+def _cache():
+    return caches['responses']
+
+
+def collection_tag(model):
+    return model._meta.label_lower
+
+
+def row_tags(model, pk):
+    label = model._meta.label_lower
+    return [f'{label}:*', f'{label}:{pk}']
+
+
+@dataclass
+class Payload:
+    """What a cached view builds on a miss: serialized data, validators and nested-row tags."""
+    data: object
+    etag: str = None
+    modified: int = None
+    tags: list = field(default_factory=list)
+
+
+def _versions(tags):
+    """Current version of each tag; missing tags are given one so entries never record None."""
+    if not tags:
+        return {}
+    cache = _cache()
+    keys = [TAG_PREFIX + tag for tag in tags]
+    found = cache.get_many(keys)
+    missing = [key for key in keys if key not in found]
+    if missing:
+        for key in missing:
+            cache.add(key, time.time_ns(), None)
+        found.update(cache.get_many(missing))
+    return {key[len(TAG_PREFIX):]: found.get(key) for key in keys}
+
+
+def bump(tags):
+    """Invalidate every entry that depends on one of `tags`."""
+    cache = _cache()
+    for tag in set(tags):
+        try:
+            cache.incr(TAG_PREFIX + tag)
+        except ValueError:  # never read, or evicted: any fresh value differs from what entries recorded
+            cache.set(TAG_PREFIX + tag, time.time_ns(), None)
+
+
+def invalidate_model(model):
+    """After writes that send no signals (bulk_create, bulk_update, update()): drop all of `model`."""
+    bump([collection_tag(model), f'{model._meta.label_lower}:*'])
+
+
+@contextmanager
+def bulk_invalidation(*models):
+    """
+    For bulk writes: skip per-row invalidation inside the block, then invalidate `models`
+    and every model that sent a signal (e.g. cascaded deletes) once, on exit.
+    """
+    changed = set(models)
+    token = _deferred.set(changed)
+    try:
+        yield
+    finally:
+        _deferred.reset(token)
+        for model in changed:
+            invalidate_model(model)
+
+
+def _key(request, view_name, per_user):
+    params = sorted((name, value) for name in request.query_params for value in request.query_params.getlist(name))
+    user = request.user.pk if per_user else None
+    # Entries hold data, not rendered bytes, so JSON and the browsable API share them. The
+    # host is part of the key because pagination links are absolute URLs.
+    digest = hashlib.blake2b(repr((request.get_host(), request.path, params, user)).encode(),
+                             digest_size=16).hexdigest()
+    return f'view:{view_name}:{digest}'
+
+
+def cached_get(request, view_name, tags, build, per_user=False):
+    """
+    Serve a GET from the response cache. `tags` are the tags known from the request
+    (e.g. the row tags of the URL's pk); `build()` runs the view on a miss and returns a
+    Payload. Either way the client still gets its 304 when its ETag matches.
+    """
+    if not settings.RESPONSE_CACHE_ENABLED:
+        payload = build()
+        return conditional_get(request, lambda: Response(payload.data), payload.etag, payload.modified)
+    cache = _cache()
+    key = _key(request, view_name, per_user)
+    entry = cache.get(key)
+    if entry is not None and _versions(list(entry['versions'])) == entry['versions']:
+        RESPONSE_CACHE_LOOKUPS.labels(view_name, 'hit').inc()
+        return conditional_get(request, lambda: Response(entry['data']), entry['etag'], entry['modified'])
+    RESPONSE_CACHE_LOOKUPS.labels(view_name, 'miss' if entry is None else 'stale').inc()
+    versions = _versions(tags)
+    payload = build()
+    versions.update(_versions([tag for tag in payload.tags if tag not in versions]))
+    # A lagging replica can return rows older than the versions just read: keep those briefly
+    timeout = settings.DB_REPLICA_CACHE_TIMEOUT if reading_from_replica() else DEFAULT_TIMEOUT
+    cache.set(key, {'versions': versions, 'data': payload.data, 'etag': payload.etag, 'modified': payload.modified},
+              timeout)
+    return conditional_get(request, lambda: Response(payload.data), payload.etag, payload.modified)
+
+
+class _CommitBump:
+    """on_commit callback bumping, once, every tag changed in the transaction."""
+    def __init__(self):
+        self.tags = set()
+        self.rows = {}  # model label -> row tags added
+
+    def add(self, model, pk):
+        label = model._meta.label_lower
+        self.tags.add(collection_tag(model))
+        if self.rows.get(label, 0) >= ROW_TAGS_PER_COMMIT:
+            self.tags.add(f'{label}:*')
+        else:
+            self.rows[label] = self.rows.get(label, 0) + 1
+            self.tags.add(f'{label}:{pk}')
+
+    def __call__(self):
+        bump(self.tags)
+
+
+def _changed(model, pk):
+    deferred = _deferred.get()
+    if deferred is not None:
+        deferred.add(model)
+        return
+    # Bump now, so later reads on this connection (and tests, which never commit) see the
+    # change, and again after commit, for readers that cached the old rows in between.
+    bump([collection_tag(model), row_tags(model, pk)[1]])
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        return
+    pending = next((func for _, func, _ in connection.run_on_commit if isinstance(func, _CommitBump)), None)
+    if pending is None:
+        pending = _CommitBump()
+        transaction.on_commit(pending)
+    pending.add(model, pk)
+
+
+def _row_changed(sender, instance, **kwargs):
+    # post_save / post_delete of Stock, Portfolio, Comment
+    _changed(sender, instance.pk)
+
+
+def _user_changed(sender, instance, created=False, update_fields=None, **kwargs):
+    # Payloads only show usernames: new users and saves of other fields (last_login on every login) change nothing
+    if created or (update_fields is not None and 'username' not in update_fields):
+        return
+    _changed(sender, instance.pk)
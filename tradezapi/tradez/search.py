@@ -0,0 +1,205 @@
+import threading
+import time
+from bisect import bisect_left
+from django.conf import settings
+from django.core.cache import cache
+from django.core.signals import request_started
+from django.db import connection, transaction
+from django.db.models import Case, IntegerField, Q, Value, When
+from .models import Stock
+
+# Ticker / company-name autocomplete.
+#
+# StockSearchIndex keeps sorted key lists in memory (symbols, full company names and
+# the individual words of company names), so a prefix lookup is a bisect plus reading
+# `limit` neighbours: O(log n) whatever the table size. Results are ranked in tiers:
+#   exact symbol > symbol prefix > name prefix > word prefix > fuzzy symbol (one edit)
+# and alphabetically within a tier.
+#
+# The index is built from Stock by each process's first request (warm(), connected in
+# TradezConfig.ready()). Saves and deletes (signals, plus explicit invalidate() calls after
+# bulk writes) bump a version in the Django cache; once a process sees a new version it
+# rebuilds in a background thread and keeps serving the current index until the new one
+# is swapped in. With several workers, point CACHES at a shared backend (Redis/Memcached)
+# so all of them notice.
+#
+# search_database() is the database-side fallback (STOCK_SEARCH_BACKEND='database'):
+# on PostgreSQL it is served by the pg_trgm GIN indexes from migration 0005.
+
+VERSION_KEY = 'stock_search:version'
+SYMBOL_ALPHABET = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789.-'
+MAX_LIMIT = 50
+
+
+def _prefix_range(keys, prefix):
+    """Index range of `keys` (sorted (key, id) tuples) whose key starts with `prefix`."""
+    start = bisect_left(keys, (prefix,))
+    # U+FFFF sorts after any character that can follow the prefix
+    return start, bisect_left(keys, (prefix + '\uffff',), start)
+
+
+def _one_edit_variants(word):
+    """Every string one insertion, deletion, substitution or transposition away from `word`."""
+    splits = [(word[:i], word[i:]) for i in range(len(word) + 1)]
+    variants = {left + right[1:] for left, right in splits if right}
+    variants |= {left + right[1] + right[0] + right[2:] for left, right in splits if len(right) > 1}
+    variants |= {left + c + right[1:] for left, right in splits if right for c in SYMBOL_ALPHABET}
+    variants |= {left + c + right for left, right in splits for c in SYMBOL_ALPHABET}
+    variants.discard(word)
+    return variants
+
+
+class StockSearchIndex:
+    """In-memory prefix index over Stock.symbol and Stock.company_name."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = None  # (version, stocks, by_symbol, symbols, names, words), swapped atomically
+        self._checked_at = 0.0
+
+    def build(self, version=None):
+        stocks = {}
+        by_symbol = {}
+        symbols, names, words = [], [], []
+        for stock_id, symbol, company_name in Stock.objects.values_list('id', 'symbol', 'company_name').iterator(chunk_size=5000):
+            stocks[stock_id] = (symbol, company_name)
+            key = symbol.upper()
+            by_symbol.setdefault(key, []).append(stock_id)
+            symbols.append((key, stock_id))
+            name = company_name.lower()
+            names.append((name, stock_id))
+            for word in set(name.split()[1:]):  # the first word is covered by `names`
+                words.append((word, stock_id))
+        symbols.sort()
+        names.sort()
+        words.sort()
+        self._data = (version, stocks, by_symbol, symbols, names, words)
+
+    def _current(self):
+        now = time.monotonic()
+        data = self._data
+        if data is not None and now - self._checked_at < settings.STOCK_SEARCH_VERSION_CHECK_INTERVAL:
+            return data
+        version = cache.get(VERSION_KEY, 0)
+        if data is None:
+            # Nothing to serve yet: searches wait for the first build
+            with self._lock:
+                if self._data is None:
+                    self.build(version)
+                data = self._data
+        elif data[0] != version and self._lock.acquire(blocking=False):
+            # Only one rebuild at a time; it releases the lock when the new index is in place
+            threading.Thread(target=self._rebuild, args=(version,), name='stock-search-rebuild', daemon=True).start()
+        self._checked_at = now
+        return data
+
+    def _rebuild(self, version):
+        try:
+            self.build(version)
+        finally:
+            self._lock.release()
+            connection.close()  # this thread's own connection
+
+    def warm(self):
+        """Build the index now unless it already exists."""
+        self._current()
+
+    def search(self, query, limit=10):
+        """Ranked matches for `query`: [{'id', 'symbol', 'company_name', 'match'}]."""
+        query = ' '.join(query.split())
+        if not query:
+            return []
+        _, stocks, by_symbol, symbols, names, words = self._current()
+        found = {}
+
+        def add(ids, tier):
+            for stock_id in ids:
+                if len(found) >= limit:
+                    return
+                found.setdefault(stock_id, tier)
+
+        def add_prefix(keys, prefix, tier):
+            start, end = _prefix_range(keys, prefix)
+            # Skip what earlier tiers already returned, but never read more than needed
+            for i in range(start, end):
+                if len(found) >= limit:
+                    return
+                found.setdefault(keys[i][1], tier)
+
+        upper = query.upper()
+        lower = query.lower()
+        add(by_symbol.get(upper, ()), 'symbol')
+        add_prefix(symbols, upper, 'symbol_prefix')
+        add_prefix(names, lower, 'name_prefix')
+        add_prefix(words, lower, 'word_prefix')
+        if len(found) < limit and len(upper) >= 2 and ' ' not in upper:
+            close = {stock_id for variant in _one_edit_variants(upper) for stock_id in by_symbol.get(variant, ())}
+            add(sorted(close, key=lambda stock_id: stocks[stock_id][0]), 'fuzzy')
+        return [
+            {'id': stock_id, 'symbol': stocks[stock_id][0], 'company_name': stocks[stock_id][1], 'match': tier}
+            for stock_id, tier in found.items()
+        ]
+
+
+stock_index = StockSearchIndex()
+
+
+def invalidate():
+    """Make every process rebuild its index on its next search."""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:  # key missing (first write, or evicted)
+        cache.set(VERSION_KEY, time.time_ns(), None)
+    stock_index._checked_at = 0.0  # this process notices immediately
+
+
+def search_database(query, limit=10):
+    """
+    Same contract as StockSearchIndex.search() without the in-memory index. On PostgreSQL
+    names also match by trigram similarity (typos) and are ranked by it.
+    """
+    query = ' '.join(query.split())
+    if not query:
+        return []
+    tier = Case(
+        When(symbol__iexact=query, then=Value(0)),
+        When(symbol__istartswith=query, then=Value(1)),
+        When(company_name__istartswith=query, then=Value(2)),
+        default=Value(3),
+        output_field=IntegerField(),
+    )
+    matches = Q(symbol__istartswith=query) | Q(company_name__icontains=query)
+    stocks = Stock.objects.all()
+    ordering = ['tier', 'symbol']
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.search import TrigramSimilarity
+        matches |= Q(company_name__trigram_similar=query)
+        stocks = stocks.annotate(similarity=TrigramSimilarity('company_name', query))
+        ordering = ['tier', '-similarity', 'symbol']
+    rows = stocks.filter(matches).annotate(tier=tier).order_by(*ordering).values_list(
+        'id', 'symbol', 'company_name', 'tier')[:limit]
+    tiers = ('symbol', 'symbol_prefix', 'name_prefix', 'name_match')
+    return [
+        {'id': stock_id, 'symbol': symbol, 'company_name': company_name, 'match': tiers[tier]}
+        for stock_id, symbol, company_name, tier in rows
+    ]
+
+
+def search_stocks(query, limit=10):
+    """Autocomplete through the configured backend (settings.STOCK_SEARCH_BACKEND)."""
+    limit = max(1, min(limit, MAX_LIMIT))
+    if settings.STOCK_SEARCH_BACKEND == 'database':
+        return search_database(query, limit)
+    return stock_index.search(query, limit)
+
+
+def _warm(sender, **kwargs):
+    # request_started: the first request of each process builds the index, so no search has to
+    request_started.disconnect(dispatch_uid='stock_search_warm')
+    if settings.STOCK_SEARCH_BACKEND == 'memory':
+        stock_index.warm()
+
+
+def _stock_changed(sender, **kwargs):
+    # post_save/post_delete: one invalidation per transaction, however many rows changed
+    if not any(func is invalidate for _, func, _ in connection.run_on_commit):
+        transaction.on_commit(invalidate)
@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from django.contrib.auth import get_user_model
 from .models import Stock, Portfolio, Comment
 
 class StockSerializer(serializers.ModelSerializer):
@@ -6,12 +7,151 @@ class StockSerializer(serializers.ModelSerializer):
         model = Stock
         fields = '__all__'
 
+class StockSummarySerializer(serializers.ModelSerializer):
+    """Read-only stock reference nested into portfolio and comment payloads."""
+    class Meta:
+        model = Stock
+        fields = ['id', 'symbol', 'company_name']
+        read_only_fields = fields
+
+# Portfolio and Comment keep their writable `user`/`stock` id fields and add read-only
+# nested data, so clients need no follow-up requests. Views must load these with
+# select_related('user', 'stock') to keep it to one query per page.
 class PortfolioSerializer(serializers.ModelSerializer):
+    username = serializers.CharField(source='user.username', read_only=True)
+    stock_summary = StockSummarySerializer(source='stock', read_only=True)
+
     class Meta:
         model = Portfolio
         fields = '__all__'
 
 class CommentSerializer(serializers.ModelSerializer):
+    username = serializers.CharField(source='user.username', read_only=True)
+    stock_summary = StockSummarySerializer(source='stock', read_only=True)
+
     class Meta:
         model = Comment
         fields = '__all__'
+
+# --- Bulk endpoints ---
+class BulkListSerializer(serializers.ListSerializer):
+    """
+    ListSerializer for the bulk endpoints. An invalid item does not reject the whole list:
+    its errors are collected in `item_errors` ({index: errors}) and the remaining items
+    become validated_data, with their input positions in `valid_indexes`.
+
+    Checks that a plain ModelSerializer makes with one query per item (unique fields,
+    foreign keys, and for updates the row itself) run once per batch instead.
+    With partial=True every item must carry the `id` of the row it updates.
+    """
+    # field name -> (attribute, model) whose ids must exist
+    foreign_keys = {}
+
+    def to_internal_value(self, data):
+        if not isinstance(data, list):
+            raise serializers.ValidationError({'non_field_errors': ['Expected a list of items.']})
+        if self.max_length is not None and len(data) > self.max_length:
+            raise serializers.ValidationError({'non_field_errors': [f'At most {self.max_length} items per request.']})
+        self.item_errors = {}
+        validated = {}
+        for index, item in enumerate(data):
+            pk = item.get('id') if self.partial and isinstance(item, dict) else None
+            if self.partial and (not isinstance(pk, int) or isinstance(pk, bool)):
+                self.item_errors[index] = {'id': ['An integer id is required for updates.']}
+                continue
+            try:
+                attrs = self.child.run_validation(item)
+            except serializers.ValidationError as e:
+                self.item_errors[index] = e.detail
+                continue
+            if self.partial:
+                attrs['id'] = pk
+            validated[index] = attrs
+        for index, errors in self.validate_batch(validated).items():
+            self.item_errors.setdefault(index, {}).update(errors)
+            validated.pop(index, None)
+        self.valid_indexes = list(validated)
+        return list(validated.values())
+
+    def validate_batch(self, validated):
+        """Batch-level checks over {index: attrs}; returns {index: {field: [errors]}}."""
+        errors = {}
+        if self.partial:
+            model = self.child.Meta.model
+            existing = set(model.objects.filter(pk__in=[a['id'] for a in validated.values()]).values_list('pk', flat=True))
+            seen = set()
+            for index, attrs in validated.items():
+                if attrs['id'] not in existing:
+                    errors.setdefault(index, {})['id'] = ['Not found.']
+                elif attrs['id'] in seen:
+                    errors.setdefault(index, {})['id'] = ['Duplicate id in this request.']
+                seen.add(attrs['id'])
+        for field_name, (attribute, model) in self.foreign_keys.items():
+            wanted = {a[attribute] for a in validated.values() if a.get(attribute) is not None}
+            found = set(model.objects.filter(pk__in=wanted).values_list('pk', flat=True))
+            for index, attrs in validated.items():
+                value = attrs.get(attribute)
+                if value is not None and value not in found:
+                    errors.setdefault(index, {})[field_name] = [f'Invalid pk "{value}" - object does not exist.']
+        return errors
+
+
+class StockBulkListSerializer(BulkListSerializer):
+    """Checks symbol uniqueness within the batch and, unless upserting, against the table."""
+    upsert_unique_fields = ['symbol']
+    upsert_update_fields = ['company_name', 'purchase', 'last_div', 'industry', 'market_cap']
+
+    def validate_batch(self, validated):
+        errors = super().validate_batch(validated)
+        symbols = {}
+        for index, attrs in validated.items():
+            if 'symbol' not in attrs:
+                continue
+            if attrs['symbol'] in symbols:
+                errors.setdefault(index, {})['symbol'] = ['Duplicate symbol in this request.']
+            symbols.setdefault(attrs['symbol'], index)
+        if self.context.get('upsert'):
+            return errors
+        taken = dict(Stock.objects.filter(symbol__in=symbols).values_list('symbol', 'id'))
+        for index, attrs in validated.items():
+            owner = taken.get(attrs.get('symbol'))
+            if owner is not None and owner != attrs.get('id'):
+                errors.setdefault(index, {})['symbol'] = ['stock with this symbol already exists.']
+        return errors
+
+
+class StockBulkSerializer(StockSerializer):
+    # Plain field: uniqueness is checked once per batch by StockBulkListSerializer
+    symbol = serializers.CharField(max_length=16)
+
+    class Meta(StockSerializer.Meta):
+        list_serializer_class = StockBulkListSerializer
+
+
+class PortfolioBulkListSerializer(BulkListSerializer):
+    foreign_keys = {'user': ('user_id', get_user_model()), 'stock': ('stock_id', Stock)}
+
+
+class PortfolioBulkSerializer(serializers.ModelSerializer):
+    # Raw ids; their existence is checked once per batch
+    user = serializers.IntegerField(source='user_id')
+    stock = serializers.IntegerField(source='stock_id')
+
+    class Meta:
+        model = Portfolio
+        fields = ['id', 'user', 'stock']
+        list_serializer_class = PortfolioBulkListSerializer
+
+
+class CommentBulkListSerializer(BulkListSerializer):
+    foreign_keys = {'user': ('user_id', get_user_model()), 'stock': ('stock_id', Stock)}
+
+
+class CommentBulkSerializer(serializers.ModelSerializer):
+    user = serializers.IntegerField(source='user_id')
+    stock = serializers.IntegerField(source='stock_id', allow_null=True, required=False)
+
+    class Meta:
+        model = Comment
+        fields = ['id', 'title', 'content', 'created_on', 'stock', 'user']
+        list_serializer_class = CommentBulkListSerializer
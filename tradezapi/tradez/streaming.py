@@ -0,0 +1,72 @@
+from itertools import islice
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.db import router
+from django.http import StreamingHttpResponse
+from rest_framework.exceptions import ValidationError
+from .fast_serializers import values_serializer
+from .renderers import orjson_dumps
+
+# Opt-in streaming export for the list endpoints (?stream=ndjson or ?stream=json).
+# Rows are read with QuerySet.iterator() and serialized chunk by chunk, so memory stays
+# flat no matter how large the table is and the first bytes go out immediately.
+# Rows come from values_list() through the serializer's ValuesSerializer and are encoded
+# with orjson: the same bytes as the serializer plus json.dumps, at a fraction of the CPU.
+#
+# Under ASGI, Django reads a plain generator to the end before it sends a byte, so there the
+# body is an async iterator that produces each chunk with sync_to_async. The chunks come
+# from one thread-sensitive thread, which keeps the server-side cursor on one connection.
+
+STREAM_CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'json': 'application/json',
+}
+DEFAULT_CHUNK_SIZE = 2000
+
+
+def _serialized_chunks(queryset, serializer_class, chunk_size):
+    fast = values_serializer(serializer_class)
+    rows = fast.values_list(queryset).iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield fast.data(chunk)
+
+
+def _ndjson(chunks):
+    for chunk in chunks:
+        yield b''.join(orjson_dumps(row) + b'\n' for row in chunk)
+
+
+def _json_array(chunks):
+    yield b'['
+    separator = b''
+    for chunk in chunks:
+        yield separator + orjson_dumps(chunk)[1:-1]  # the rows, without the list's brackets
+        separator = b','
+    yield b']'
+
+
+async def _async_chunks(body):
+    next_chunk = sync_to_async(next)
+    done = object()
+    while (chunk := await next_chunk(body, done)) is not done:
+        yield chunk
+
+
+def streaming_response(request, queryset, serializer_class, stream_format, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Build a StreamingHttpResponse that serializes `queryset` incrementally, with an async
+    body when `request` is served over ASGI.
+    Raises ValidationError (400) for an unknown stream format.
+    """
+    if stream_format not in STREAM_CONTENT_TYPES:
+        raise ValidationError({'stream': f"Unsupported stream format. Use one of: {', '.join(STREAM_CONTENT_TYPES)}."})
+    # Resolved now: the body is read after ReadReplicaMiddleware has stopped routing reads
+    queryset = queryset.using(router.db_for_read(queryset.model))
+    chunks = _serialized_chunks(queryset, serializer_class, chunk_size)
+    body = _ndjson(chunks) if stream_format == 'ndjson' else _json_array(chunks)
+    if isinstance(getattr(request, '_request', request), ASGIRequest):
+        body = _async_chunks(body)
+    return StreamingHttpResponse(body, content_type=STREAM_CONTENT_TYPES[stream_format])
@@ -3,13 +3,28 @@ from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
 from django.contrib.auth import get_user_model
-from .models import Stock, Portfolio, Comment
+from .models import Stock, Portfolio, Comment, PriceBar, PriceSeries
+import json
 import os
+import time
 import requests
 import requests_mock
 
 User = get_user_model()
 
+@pytest.fixture(autouse=True)
+def clear_response_cache():
+    # The cache outlives each test's database transaction
+    from django.core.cache import caches
+    caches['responses'].clear()
+
+@pytest.fixture(autouse=True)
+def reset_throttles(settings):
+    # Fresh buckets per test: auth_client logs in (a password hash) every time
+    from .throttling import local_store
+    settings.THROTTLE_STORE = 'local'
+    local_store.reset()
+
 @pytest.fixture
 def api_client():
     return APIClient()
@@ -27,6 +42,20 @@ def auth_client(api_client, user):
     api_client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
     return api_client
 
+def assert_endpoint_queries(client, url, expected, params=None):
+    """
+    GET `url` and assert it ran exactly `expected` SQL queries (token user state lookup included),
+    listing the captured SQL on failure so N+1 regressions are easy to spot.
+    """
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    with CaptureQueriesContext(connection) as ctx:
+        resp = client.get(url, params or {})
+    assert resp.status_code == status.HTTP_200_OK
+    executed = [q['sql'] for q in ctx.captured_queries]
+    assert len(executed) == expected, f"{url}: expected {expected} queries, got {len(executed)}:\n" + "\n".join(executed)
+    return resp
+
 @pytest.mark.django_db
 def test_stock_crud(auth_client):
     # Create
@@ -93,6 +122,672 @@ def test_permissions(api_client):
     resp = api_client.get('/api/stocks/')
     assert resp.status_code == status.HTTP_401_UNAUTHORIZED
 
+@pytest.mark.django_db
+def test_stock_list_cursor_pagination_and_filters(auth_client):
+    for i in range(5):
+        Stock.objects.create(symbol=f'SYM{i}', company_name=f'Company {i}', purchase=10, last_div=0, industry='Tech' if i % 2 == 0 else 'Energy', market_cap=1000)
+    # First page is bounded by page_size and links to the next one via an opaque cursor
+    resp = auth_client.get('/api/stocks/', {'page_size': 2, 'sort_by': 'symbol'})
+    assert resp.status_code == status.HTTP_200_OK
+    assert [s['symbol'] for s in resp.data['results']] == ['SYM0', 'SYM1']
+    assert resp.data['previous'] is None
+    resp = auth_client.get(resp.data['next'])
+    assert [s['symbol'] for s in resp.data['results']] == ['SYM2', 'SYM3']
+    # Server-side filters
+    resp = auth_client.get('/api/stocks/', {'industry': 'energy'})
+    assert {s['symbol'] for s in resp.data['results']} == {'SYM1', 'SYM3'}
+    resp = auth_client.get('/api/stocks/', {'company_name': 'company 4'})
+    assert [s['symbol'] for s in resp.data['results']] == ['SYM4']
+    # page_size is capped
+    resp = auth_client.get('/api/stocks/', {'page_size': 10000})
+    assert len(resp.data['results']) == 5
+
+@pytest.mark.django_db
+def test_comment_list_newest_first_and_symbol_filter(auth_client, user):
+    msft = Stock.objects.create(symbol='MSFT', company_name='Microsoft', purchase=300, last_div=0.2, industry='Tech', market_cap=3000000000)
+    aapl = Stock.objects.create(symbol='AAPL', company_name='Apple', purchase=100, last_div=0.5, industry='Tech', market_cap=1000000000)
+    first = Comment.objects.create(title='first', content='a', stock=msft, user=user)
+    second = Comment.objects.create(title='second', content='b', stock=msft, user=user)
+    Comment.objects.create(title='other', content='c', stock=aapl, user=user)
+    resp = auth_client.get('/api/comments/', {'symbol': 'msft'})
+    assert resp.status_code == status.HTTP_200_OK
+    assert [c['id'] for c in resp.data['results']] == [second.id, first.id]
+
+@pytest.mark.django_db
+def test_comment_list_streaming_export(auth_client, user):
+    import json
+    stock = Stock.objects.create(symbol='MSFT', company_name='Microsoft', purchase=300, last_div=0.2, industry='Tech', market_cap=3000000000)
+    for i in range(3):
+        Comment.objects.create(title=f'c{i}', content='x', stock=stock, user=user)
+    resp = auth_client.get('/api/comments/', {'stream': 'ndjson'})
+    assert resp.status_code == status.HTTP_200_OK
+    assert resp['Content-Type'] == 'application/x-ndjson'
+    lines = b''.join(resp.streaming_content).decode().splitlines()
+    assert [json.loads(line)['title'] for line in lines] == ['c0', 'c1', 'c2']
+    resp = auth_client.get('/api/comments/', {'stream': 'json'})
+    rows = json.loads(b''.join(resp.streaming_content))
+    assert len(rows) == 3 and rows[0]['stock'] == stock.id
+    resp = auth_client.get('/api/comments/', {'stream': 'xml'})
+    assert resp.status_code == status.HTTP_400_BAD_REQUEST
+
+@pytest.mark.django_db
+def test_streaming_export_is_not_buffered_under_asgi(auth_client, user):
+    from asgiref.sync import async_to_sync
+    from django.test import AsyncClient, AsyncRequestFactory
+    from .serializers import CommentSerializer
+    from .streaming import streaming_response
+    stock = Stock.objects.create(symbol='MSFT', company_name='Microsoft', purchase=300, last_div=0.2, industry='Tech', market_cap=3000000000)
+    for i in range(5):
+        Comment.objects.create(title=f'c{i}', content='x', stock=stock, user=user)
+    expected = b''.join(auth_client.get('/api/comments/', {'stream': 'ndjson'}).streaming_content)
+    # Django's ASGI handler buffers sync iterators whole; an async one is sent as it is produced
+    resp = streaming_response(AsyncRequestFactory().get('/api/comments/'), Comment.objects.order_by('id'),
+                              CommentSerializer, 'ndjson', chunk_size=2)
+    assert resp.is_async
+
+    async def consume():
+        return [chunk async for chunk in resp.streaming_content]
+    chunks = async_to_sync(consume)()
+    assert len(chunks) == 3 and b''.join(chunks) == expected
+    token = auth_client._credentials['HTTP_AUTHORIZATION']
+    resp = async_to_sync(AsyncClient().get)('/api/comments/', {'stream': 'json'}, headers={'Authorization': token})
+    assert resp.status_code == status.HTTP_200_OK and resp.is_async
+    assert not auth_client.get('/api/comments/', {'stream': 'json'}).is_async
+
+@pytest.mark.django_db
+def test_fast_serializers_match_model_serializers(auth_client, user):
+    from decimal import Decimal
+    from django.utils import timezone
+    from rest_framework.renderers import JSONRenderer
+    from rest_framework.utils.encoders import JSONEncoder
+    from .fast_serializers import values_serializer
+    from .renderers import ORJSONRenderer
+    from .serializers import StockSerializer, PortfolioSerializer, CommentSerializer
+    stock = Stock.objects.create(symbol='GLE', company_name='Société Générale \x01"\u2028', purchase=Decimal('12.5'),
+                                 last_div=0, industry='Banks', market_cap=2**40, quote_updated_at=timezone.now())
+    Stock.objects.create(symbol='MSFT', company_name='Microsoft', purchase=300, last_div=Decimal('0.75'), industry='Tech', market_cap=1)
+    Portfolio.objects.create(user=user, stock=stock)
+    Comment.objects.create(title='ünïcode', content='line\nbreak\ttab', stock=stock, user=user)
+    Comment.objects.create(title='no stock', content='x', stock=None, user=user)
+
+    for queryset, serializer_class in [
+        (Stock.objects.order_by('id'), StockSerializer),
+        (Portfolio.objects.select_related('user', 'stock').order_by('id'), PortfolioSerializer),
+        (Comment.objects.select_related('user', 'stock').order_by('id'), CommentSerializer),
+    ]:
+        expected = serializer_class(queryset, many=True).data
+        fast = values_serializer(serializer_class)
+        assert fast.data(fast.values_list(queryset)) == expected
+        assert ORJSONRenderer().render(fast.data(fast.values(queryset))) == JSONRenderer().render(expected)
+
+    # Paginated lists and streamed exports give the bytes they gave with the ModelSerializers
+    resp = auth_client.get('/api/comments/')
+    page = {'next': None, 'previous': None,
+            'results': CommentSerializer(Comment.objects.select_related('user', 'stock').order_by('-created_on', '-id'), many=True).data}
+    assert resp.content == JSONRenderer().render(page)
+    resp = auth_client.get('/api/stocks/', {'stream': 'ndjson'})
+    assert b''.join(resp.streaming_content) == ''.join(
+        json.dumps(row, cls=JSONEncoder, ensure_ascii=False, separators=(',', ':')) + '\n'
+        for row in StockSerializer(Stock.objects.order_by('id'), many=True).data
+    ).encode()
+    resp = auth_client.get('/api/portfolios/', {'stream': 'json'})
+    assert b''.join(resp.streaming_content) == json.dumps(
+        PortfolioSerializer(Portfolio.objects.order_by('id'), many=True).data,
+        cls=JSONEncoder, ensure_ascii=False, separators=(',', ':')).encode()
+
+@pytest.mark.django_db
+def test_refresh_quotes_updates_held_stocks(auth_client, user):
+    from .quote_refresher import refresh_quotes
+    held = Stock.objects.create(symbol='AAPL', company_name='Apple', purchase=100, last_div=0.5, industry='Tech', market_cap=1)
+    delisted = Stock.objects.create(symbol='GONE', company_name='Gone', purchase=5, last_div=0, industry='Tech', market_cap=1)
+    unheld = Stock.objects.create(symbol='MSFT', company_name='Microsoft', purchase=300, last_div=0.2, industry='Tech', market_cap=1)
+    Portfolio.objects.create(user=user, stock=held)
+    Portfolio.objects.create(user=user, stock=delisted)
+    resp = auth_client.get('/api/stocks/staleness/')
+    assert resp.data['tracked'] == 2 and resp.data['never_refreshed'] == 2
+    requested = []
+    def fake_profiles(symbols):
+        requested.extend(symbols)
+        return {
+            'AAPL': {'profile': {'symbol': 'AAPL', 'price': 187.456, 'lastDiv': 0.96, 'mktCap': 2900000000000}, 'error': None},
+            'GONE': {'profile': None, 'error': 'Unknown symbol.'},
+        }
+    result = refresh_quotes(fetch=fake_profiles)
+    assert sorted(requested) == ['AAPL', 'GONE']
+    assert result == {'refreshed': 1, 'changed': 1, 'failed': {'GONE': 'Unknown symbol.'}}
+    held.refresh_from_db()
+    assert str(held.purchase) == '187.46' and str(held.last_div) == '0.96'
+    assert held.market_cap == 2900000000000 and held.quote_updated_at is not None
+    unheld.refresh_from_db()
+    assert unheld.quote_updated_at is None
+    resp = auth_client.get('/api/stocks/staleness/')
+    assert resp.data['tracked'] == 2 and resp.data['never_refreshed'] == 1
+    assert resp.data['max_age_seconds'] is not None
+
+
+@pytest.mark.django_db
+def test_refresh_quotes_only_rewrites_changed_stocks(user):
+    from .quote_refresher import refresh_quotes
+    same = Stock.objects.create(symbol='AAPL', company_name='Apple', purchase='187.46', last_div='0.96', industry='Tech', market_cap=5)
+    moved = Stock.objects.create(symbol='MSFT', company_name='Microsoft', purchase=300, last_div=0.2, industry='Tech', market_cap=5)
+    bad = Stock.objects.create(symbol='BAD', company_name='Bad', purchase=1, last_div=0, industry='Tech', market_cap=5)
+    for stock in (same, moved, bad):
+        Portfolio.objects.create(user=user, stock=stock)
+    versions = dict(Stock.objects.values_list('symbol', 'updated_at'))
+    profiles = {
+        'AAPL': {'profile': {'price': 187.456, 'lastDiv': 0.96, 'mktCap': 5}, 'error': None},
+        'MSFT': {'profile': {'price': 301, 'lastDiv': None, 'mktCap': 5}, 'error': None},
+        'BAD': {'profile': {'price': 2, 'lastDiv': 0, 'mktCap': 'n/a'}, 'error': None},
+    }
+    result = refresh_quotes(fetch=lambda symbols: profiles)
+    assert result == {'refreshed': 2, 'changed': 1, 'failed': {'BAD': "Invalid mktCap: 'n/a'"}}
+    rows = {row[0]: row[1:] for row in Stock.objects.values_list('symbol', 'updated_at', 'quote_updated_at', 'purchase')}
+    # The unchanged stock keeps its row version, so ETags and cached responses stay valid
+    assert rows['AAPL'][0] == versions['AAPL'] and rows['AAPL'][1] is not None
+    assert rows['MSFT'][0] > versions['MSFT'] and rows['MSFT'][1] is not None and str(rows['MSFT'][2]) == '301.00'
+    assert rows['BAD'][:2] == (versions['BAD'], None) and str(rows['BAD'][2]) == '1.00'
+
+@pytest.mark.django_db
+def test_price_history_ingest_and_downsampled_range(auth_client):
+    from .prices import ingest_price_history
+    stock = Stock.objects.create(symbol='AAPL', company_name='Apple', purchase=100, last_div=0.5, industry='Tech', market_cap=1)
+    # Mon 2024-01-01 .. Fri 2024-01-12: two trading weeks
+    days = ['2024-01-01', '2024-01-02', '2024-01-03', '2024-01-04', '2024-01-05',
+            '2024-01-08', '2024-01-09', '2024-01-10', '2024-01-11', '2024-01-12']
+    historical = [{'date': d, 'open': 10.0 + i, 'high': 20.0 + i, 'low': 5.0 + i, 'close': 11.0 + i, 'volume': 100}
+                  for i, d in enumerate(days)]
+    fake_fetch = lambda symbol, start, end: {'symbol': symbol, 'historical': list(reversed(historical))}
+    assert ingest_price_history(stock, fetch=fake_fetch) == 10
+    # Re-ingesting the same range upserts instead of duplicating
+    assert ingest_price_history(stock, fetch=fake_fetch) == 10
+    assert PriceBar.objects.filter(stock=stock).count() == 10
+    series = PriceSeries.objects.get(stock=stock)
+    assert len(series.days) == 10 * 4 and len(series.closes) == 10 * 8
+    resp = auth_client.get(f'/api/stocks/{stock.id}/prices/', {'from': '2024-01-03', 'to': '2024-01-04'})
+    assert resp.status_code == status.HTTP_200_OK
+    assert resp.data['close'] == [13.0, 14.0]
+    resp = auth_client.get(f'/api/stocks/{stock.id}/prices/', {'interval': 'weekly'})
+    assert [str(d) for d in resp.data['date']] == ['2024-01-01', '2024-01-08']
+    assert resp.data['open'] == [10.0, 15.0]
+    assert resp.data['close'] == [15.0, 20.0]
+    assert resp.data['high'] == [24.0, 29.0]
+    assert resp.data['low'] == [5.0, 10.0]
+    assert resp.data['volume'] == [500, 500]
+    assert auth_client.get(f'/api/stocks/{stock.id}/prices/', {'interval': 'hourly'}).status_code == status.HTTP_400_BAD_REQUEST
+    assert auth_client.get(f'/api/stocks/{stock.id}/prices/', {'from': 'yesterday'}).status_code == status.HTTP_400_BAD_REQUEST
+
+@pytest.mark.django_db
+def test_portfolio_analytics(auth_client, user):
+    import datetime
+    import numpy as np
+    from .analytics import compute_analytics
+    days = [datetime.date(2024, 1, 1) + datetime.timedelta(days=i) for i in range(6)]
+    closes = {
+        'AAA': [100, 110, 99, 108.9, 119.79, 107.811],  # +10%, -10%, +10%, +10%, -10%
+        'BBB': [50, 55, 49.5, 54.45, 59.895, 53.9055],  # same returns as AAA
+        'SPY': [200, 210, 199.5, 209.475, 219.94875, 208.9513125],  # half of AAA's moves
+    }
+    for symbol, series in closes.items():
+        stock = Stock.objects.create(symbol=symbol, company_name=symbol, purchase=1, last_div=0, industry='Tech', market_cap=1)
+        PriceBar.objects.bulk_create([PriceBar(stock=stock, date=d, open=c, high=c, low=c, close=c) for d, c in zip(days, series)])
+        if symbol != 'SPY':
+            Portfolio.objects.create(user=user, stock=stock)
+    resp = auth_client.get('/api/portfolios/me/analytics/')
+    assert resp.status_code == status.HTTP_200_OK
+    body = resp.data
+    assert body['symbols'] == ['AAA', 'BBB'] and body['observations'] == 5
+    assert body['correlation'] == [[1.0, 1.0], [1.0, 1.0]]
+    assert body['holdings'][0]['beta'] == pytest.approx(2.0)
+    assert body['portfolio']['beta'] == pytest.approx(2.0)
+    assert body['portfolio']['max_drawdown'] == pytest.approx(-0.1)
+    returns = np.array([0.1, -0.1, 0.1, 0.1, -0.1])
+    assert body['portfolio']['annualized_volatility'] == pytest.approx(returns.std(ddof=1) * np.sqrt(252), rel=1e-5)
+    # Each user gets the analytics of their own holdings only
+    other = User.objects.create_user(username='other', password='pass12345', email='o@example.com')
+    Portfolio.objects.create(user=other, stock=Stock.objects.get(symbol='AAA'))
+    other_client = APIClient()
+    other_client.force_authenticate(user=other)
+    assert other_client.get('/api/portfolios/me/analytics/').data['symbols'] == ['AAA']
+    assert APIClient().get('/api/portfolios/me/analytics/').status_code == status.HTTP_401_UNAUTHORIZED
+    # Packed series, and the aggregated bar query of stocks without one, pivot like the rows do
+    from .analytics import build_price_matrix, load_price_matrix, pack_price_series
+    PriceBar.objects.filter(stock__symbol='BBB', date=days[2]).delete()
+    ids = list(Stock.objects.order_by('symbol').values_list('id', flat=True))
+    rows = build_price_matrix(PriceBar.objects.filter(date__gte=days[1]).values_list('date', 'stock_id', 'close'), ids)
+    assert rows[1].shape == (5, 3) and rows[1][1, 1] == 55  # BBB's missing day is forward-filled
+    for packed in ([], ids[:1], ids):
+        for stock_id in packed:
+            pack_price_series(stock_id)
+        loaded = load_price_matrix(ids, start=days[1], end=days[-1])
+        assert (loaded[0] == rows[0]).all() and np.array_equal(loaded[1], rows[1])
+    # The numeric core also works on raw matrices
+    stats = compute_analytics(np.array([[1.0, 2.0], [1.1, 2.2], [0.99, 1.98]]))
+    assert np.allclose(stats['daily_returns'], [[0.1, 0.1], [-0.1, -0.1]])
+
+@pytest.mark.django_db
+def test_portfolio_analytics_benchmark_without_full_history(auth_client, user):
+    import datetime
+    days = [datetime.date(2024, 1, 1) + datetime.timedelta(days=i) for i in range(6)]
+    aaa = Stock.objects.create(symbol='AAA', company_name='AAA', purchase=1, last_div=0, industry='Tech', market_cap=1)
+    spy = Stock.objects.create(symbol='SPY', company_name='SPY', purchase=1, last_div=0, industry='Tech', market_cap=1)
+    Portfolio.objects.create(user=user, stock=aaa)
+    closes = [100, 110, 99, 108.9, 119.79, 107.811]
+    PriceBar.objects.bulk_create([PriceBar(stock=aaa, date=d, open=c, high=c, low=c, close=c) for d, c in zip(days, closes)])
+    # A benchmark with no bars still leaves the holdings' analytics, without beta
+    body = auth_client.get('/api/portfolios/me/analytics/').data
+    assert body['observations'] == 5 and body['benchmark'] is None
+    assert body['portfolio']['beta'] is None and body['holdings'][0]['beta'] is None
+    # One starting late is used where it overlaps and does not shorten the window
+    PriceBar.objects.bulk_create([
+        PriceBar(stock=spy, date=d, open=c, high=c, low=c, close=c)
+        for d, c in zip(days[2:], [199.5, 209.475, 219.94875, 208.9513125])
+    ])
+    body = auth_client.get('/api/portfolios/me/analytics/').data
+    assert body['observations'] == 5 and str(body['start']) == '2024-01-01' and body['benchmark'] == 'SPY'
+    assert body['holdings'][0]['beta'] == pytest.approx(2.0)
+
+@pytest.mark.django_db
+def test_portfolio_summary_constant_queries(auth_client, user, django_assert_num_queries):
+    other = User.objects.create_user(username='other', password='pass12345', email='o@example.com')
+    rows = [('AAPL', 'Tech', 100, 1), ('MSFT', 'Tech', 300, 3), ('XOM', 'Energy', 100, 4)]
+    for symbol, industry, price, div in rows:
+        stock = Stock.objects.create(symbol=symbol, company_name=symbol, purchase=price, last_div=div, industry=industry, market_cap=1)
+        Portfolio.objects.create(user=user, stock=stock)
+    Portfolio.objects.create(user=other, stock=Stock.objects.get(symbol='XOM'))
+    # Token user state + holdings + totals + industries
+    with django_assert_num_queries(4):
+        resp = auth_client.get('/api/portfolios/me/summary/')
+    assert resp.status_code == status.HTTP_200_OK
+    assert [h['stock']['symbol'] for h in resp.data['holdings']] == ['AAPL', 'MSFT', 'XOM']
+    assert resp.data['totals'] == {'holdings': 3, 'market_value': '500.00', 'annual_dividends': '8.00', 'dividend_yield': '1.60'}
+    assert resp.data['industry_allocation'] == [
+        {'industry': 'Tech', 'holdings': 2, 'market_value': '400.00', 'weight': '80.00'},
+        {'industry': 'Energy', 'holdings': 1, 'market_value': '100.00', 'weight': '20.00'},
+    ]
+    for i in range(20):
+        stock = Stock.objects.create(symbol=f'S{i}', company_name='x', purchase=1, last_div=0, industry='Misc', market_cap=1)
+        Portfolio.objects.create(user=user, stock=stock)
+    with django_assert_num_queries(3):  # the token user's state is cached now
+        resp = auth_client.get('/api/portfolios/me/summary/')
+    assert resp.data['totals']['holdings'] == 23
+
+@pytest.mark.django_db
+def test_list_and_detail_endpoints_have_fixed_query_counts(auth_client, user):
+    def seed(count, offset):
+        for i in range(offset, offset + count):
+            stock = Stock.objects.create(symbol=f'Q{i}', company_name=f'Company {i}', purchase=1, last_div=0, industry='Tech', market_cap=1)
+            Portfolio.objects.create(user=user, stock=stock)
+            Comment.objects.create(title='t', content='c', stock=stock, user=user)
+    seed(3, 0)
+    # One query for the page (stock and author joined in), plus the token user's state on the first request
+    for url, expected in (('/api/stocks/', 2), ('/api/portfolios/', 1), ('/api/comments/', 1)):
+        assert_endpoint_queries(auth_client, url, expected)
+    seed(30, 3)
+    for url in ('/api/stocks/', '/api/portfolios/', '/api/comments/'):
+        assert_endpoint_queries(auth_client, url, 1)
+    comment = Comment.objects.first()
+    resp = assert_endpoint_queries(auth_client, f'/api/comments/{comment.id}/', 1)
+    assert resp.data['username'] == 'testuser'
+    assert resp.data['stock_summary'] == {'id': comment.stock_id, 'symbol': comment.stock.symbol, 'company_name': comment.stock.company_name}
+    portfolio = Portfolio.objects.first()
+    resp = assert_endpoint_queries(auth_client, f'/api/portfolios/{portfolio.id}/', 1)
+    assert resp.data['stock'] == portfolio.stock_id and resp.data['stock_summary']['symbol'] == portfolio.stock.symbol
+
+@pytest.mark.django_db
+def test_request_profiling_report(settings, tmp_path, user):
+    from django.core.management import call_command
+    from io import StringIO
+    from . import profiling
+    settings.REQUEST_PROFILING = True
+    settings.REQUEST_PROFILING_DIR = str(tmp_path)
+    settings.REQUEST_PROFILING_FLUSH_INTERVAL = 0
+    settings.RESPONSE_CACHE_ENABLED = False  # profile the view itself on every request
+    profiling.reset()
+    admin = User.objects.create_user(username='admin', password='adminpass123', is_staff=True)
+    client = APIClient()  # fresh handler so the middleware is loaded with profiling on
+    client.force_authenticate(user=admin)
+    Stock.objects.create(symbol='PRF', company_name='Profiled', purchase=1, last_div=0, industry='Tech', market_cap=1)
+    for _ in range(3):
+        assert client.get('/api/stocks/').status_code == status.HTTP_200_OK
+    resp = client.get('/api/profiling/')
+    assert resp.status_code == status.HTTP_200_OK and resp.data['enabled'] is True
+    stocks = resp.data['routes']['GET /api/stocks/']
+    assert stocks['count'] == 3
+    assert stocks['db_queries']['mean'] == 1 and stocks['db_queries']['max'] == 1
+    assert stocks['total_ms']['p50'] is not None and stocks['serialization_ms']['mean'] > 0
+    assert os.listdir(tmp_path) == [f'{os.getpid()}.json']
+    # Outbound calls are attributed to the request that is being profiled
+    profile = profiling.RequestProfile()
+    token = profiling._current.set(profile)
+    with profiling.track_http('fmp'):
+        pass
+    profiling._current.reset(token)
+    assert profile.http_calls == 1 and 'fmp' in profile.http_by_service
+    out = StringIO()
+    call_command('profile_report', '--dir', str(tmp_path), stdout=out)
+    assert 'GET /api/stocks/' in out.getvalue()
+    other = APIClient()
+    other.force_authenticate(user=user)
+    assert other.get('/api/profiling/').status_code == status.HTTP_403_FORBIDDEN
+    profiling.reset()
+
+@pytest.mark.django_db
+def test_prometheus_metrics_endpoint(auth_client):
+    from prometheus_client.parser import text_string_to_metric_families
+
+    def samples():
+        resp = auth_client.get('/metrics')
+        assert resp.status_code == status.HTTP_200_OK and resp['Content-Type'].startswith('text/plain')
+        return {
+            (sample.name, tuple(sorted(sample.labels.items()))): sample.value
+            for family in text_string_to_metric_families(resp.content.decode())
+            for sample in family.samples
+        }
+
+    key = ('tradez_http_requests_total', (('method', 'GET'), ('route', '/api/stocks/'), ('status', '200')))
+    before = samples().get(key, 0)
+    auth_client.get('/api/stocks/')
+    auth_client.get('/api/stocks/')
+    after = samples()
+    assert after[key] == before + 2
+    assert after[('tradez_http_request_duration_seconds_count', (('method', 'GET'), ('route', '/api/stocks/')))] >= 2
+    assert any(name == 'tradez_http_requests_in_progress' for name, _ in after)
+
+def test_prometheus_middleware_runs_async_under_asgi():
+    from asgiref.sync import async_to_sync, iscoroutinefunction
+    from django.http import HttpResponse
+    from django.test import AsyncRequestFactory, RequestFactory
+    from prometheus_client import REGISTRY
+    from .metrics import PrometheusMiddleware
+
+    async def async_view(request):
+        return HttpResponse(status=201)
+
+    labels = {'method': 'GET', 'route': '<unmatched>', 'status': '201'}
+    before = REGISTRY.get_sample_value('tradez_http_requests_total', labels) or 0
+    middleware = PrometheusMiddleware(async_view)
+    assert iscoroutinefunction(middleware)
+    assert async_to_sync(middleware)(AsyncRequestFactory().get('/x')).status_code == 201
+    sync_middleware = PrometheusMiddleware(lambda request: HttpResponse(status=201))
+    assert not iscoroutinefunction(sync_middleware)
+    assert sync_middleware(RequestFactory().get('/x')).status_code == 201
+    assert REGISTRY.get_sample_value('tradez_http_requests_total', labels) == before + 2
+
+def test_prometheus_metrics_aggregate_across_processes(tmp_path):
+    import subprocess
+    import sys
+    from .metrics import render_metrics
+    # Each "worker" is a separate interpreter writing into the shared multiprocess directory
+    script = (
+        "import django; from django.conf import settings; settings.configure(); "
+        "from tradez.metrics import FMP_CACHE_LOOKUPS; FMP_CACHE_LOOKUPS.labels('quote', 'hit').inc(3)"
+    )
+    env = {**os.environ, 'PROMETHEUS_MULTIPROC_DIR': str(tmp_path)}
+    cwd = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    for _ in range(2):
+        subprocess.run([sys.executable, '-c', script], env=env, cwd=cwd, check=True)
+    text = render_metrics(str(tmp_path)).decode()
+    assert 'tradez_fmp_cache_lookups_total{kind="quote",result="hit"} 6.0' in text
+
+@pytest.mark.django_db
+def test_stock_bulk_create_upsert_update_delete(auth_client):
+    Stock.objects.create(symbol='OLD', company_name='Old', purchase=1, last_div=0, industry='Tech', market_cap=1)
+    row = {'company_name': 'Co', 'purchase': '1.00', 'last_div': '0.10', 'industry': 'Tech', 'market_cap': 10}
+    items = [{'symbol': f'B{i}', **row} for i in range(50)]
+    items += [{'symbol': 'OLD', **row}, {'symbol': 'B0', **row}, {'symbol': 'BAD', **row, 'purchase': 'x'}]
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    with CaptureQueriesContext(connection) as ctx:
+        resp = auth_client.post('/api/stocks/bulk/', items, format='json')
+    # Uniqueness is checked for the whole batch, not per item
+    assert len(ctx.captured_queries) < 10
+    assert resp.status_code == status.HTTP_207_MULTI_STATUS
+    assert resp.data['count'] == 50 and len(resp.data['ids']) == 50
+    assert [(e['index'], list(e['errors'])) for e in resp.data['errors']] == [(50, ['symbol']), (51, ['symbol']), (52, ['purchase'])]
+    # All-or-nothing and upsert
+    resp = auth_client.post('/api/stocks/bulk/?atomic=true', [{'symbol': 'NEW', **row}, {'symbol': 'B1', **row}], format='json')
+    assert resp.status_code == status.HTTP_400_BAD_REQUEST and not Stock.objects.filter(symbol='NEW').exists()
+    resp = auth_client.post('/api/stocks/bulk/?upsert=true', [{'symbol': 'OLD', **row, 'company_name': 'Renamed'}], format='json')
+    assert resp.status_code == status.HTTP_201_CREATED
+    assert Stock.objects.get(symbol='OLD').company_name == 'Renamed' and Stock.objects.count() == 51
+    # NDJSON body
+    ndjson = '\n'.join(json.dumps({'symbol': f'N{i}', **row}) for i in range(3))
+    resp = auth_client.post('/api/stocks/bulk/', ndjson, content_type='application/x-ndjson')
+    assert resp.status_code == status.HTTP_201_CREATED and resp.data['count'] == 3
+    # Partial updates by id
+    b0, b1 = Stock.objects.get(symbol='B0'), Stock.objects.get(symbol='B1')
+    resp = auth_client.patch('/api/stocks/bulk/', [
+        {'id': b0.id, 'company_name': 'Zero'}, {'id': b1.id, 'symbol': 'B2'}, {'company_name': 'no id'},
+    ], format='json')
+    assert resp.status_code == status.HTTP_207_MULTI_STATUS and resp.data['ids'] == [b0.id]
+    assert [e['index'] for e in resp.data['errors']] == [1, 2]
+    assert Stock.objects.get(id=b0.id).company_name == 'Zero'
+    resp = auth_client.delete('/api/stocks/bulk/', [b0.id, b1.id, 999999], format='json')
+    assert resp.status_code == status.HTTP_207_MULTI_STATUS and resp.data['count'] == 2
+    assert resp.data['errors'] == [{'index': 2, 'errors': {'id': ['Not found.']}}]
+
+@pytest.mark.django_db
+def test_portfolio_and_comment_bulk_check_foreign_keys(auth_client, user):
+    stock = Stock.objects.create(symbol='FK', company_name='FK', purchase=1, last_div=0, industry='Tech', market_cap=1)
+    resp = auth_client.post('/api/portfolios/bulk/', [
+        {'user': user.id, 'stock': stock.id}, {'user': user.id, 'stock': 999999},
+    ], format='json')
+    assert resp.status_code == status.HTTP_207_MULTI_STATUS
+    assert resp.data['errors'] == [{'index': 1, 'errors': {'stock': ['Invalid pk "999999" - object does not exist.']}}]
+    assert Portfolio.objects.get(id=resp.data['ids'][0]).stock_id == stock.id
+    resp = auth_client.post('/api/comments/bulk/', [
+        {'title': f't{i}', 'content': 'c', 'user': user.id, 'stock': stock.id if i % 2 else None} for i in range(20)
+    ], format='json')
+    assert resp.status_code == status.HTTP_201_CREATED and Comment.objects.count() == 20
+    assert Comment.objects.filter(created_on__isnull=False, stock__isnull=True).count() == 10
+    ids = resp.data['ids']
+    resp = auth_client.patch('/api/comments/bulk/', [{'id': pk, 'title': 'edited'} for pk in ids], format='json')
+    assert resp.status_code == status.HTTP_200_OK and Comment.objects.filter(title='edited').count() == 20
+    resp = auth_client.delete('/api/comments/bulk/', [{'id': pk} for pk in ids], format='json')
+    assert resp.status_code == status.HTTP_200_OK and not Comment.objects.exists()
+
+@pytest.mark.django_db(transaction=True)
+def test_stock_search_ranking_and_invalidation(auth_client, settings, monkeypatch):
+    from django.core.cache import cache
+    from django.core.signals import request_started
+    from django.db import transaction
+    from . import search
+    index = search.StockSearchIndex()  # not the one an earlier test's first request warmed
+    monkeypatch.setattr(search, 'stock_index', index)
+    def make(symbol, name):
+        return Stock.objects.create(symbol=symbol, company_name=name, purchase=1, last_div=0, industry='Tech', market_cap=1)
+    make('APP', 'Appian Corp')
+    make('AAPL', 'Apple Inc')
+    apld = make('APLD', 'Applied Digital')
+    make('MSFT', 'Microsoft Corporation')
+    make('BAPP', 'Bapp Holdings Apple Division')
+
+    def search_for(q, **params):
+        resp = auth_client.get('/api/stocks/search/', {'q': q, **params})
+        assert resp.status_code == status.HTTP_200_OK
+        return [(r['symbol'], r['match']) for r in resp.data['results']]
+
+    assert search_for('app') == [
+        ('APP', 'symbol'), ('AAPL', 'name_prefix'), ('APLD', 'name_prefix'), ('BAPP', 'word_prefix'),
+    ]
+    assert search_for('ap', limit=2) == [('APLD', 'symbol_prefix'), ('APP', 'symbol_prefix')]
+    assert search_for('corp') == [('APP', 'word_prefix'), ('MSFT', 'word_prefix')]
+    assert search_for('MSFX') == [('MSFT', 'fuzzy')]
+    assert search_for('   ') == []
+    # Saves invalidate the index; until the background rebuild is done the old one is served
+    auth_client.patch(f'/api/stocks/{apld.id}/', {'company_name': 'Zeta Digital'})
+    assert search_for('zeta') == []
+
+    def rebuilt():
+        with index._lock:  # held by the rebuild thread until the new index is in place
+            pass
+    rebuilt()
+    assert ('APLD', 'name_prefix') not in search_for('app') and search_for('zeta') == [('APLD', 'name_prefix')]
+    # A transaction touching many rows invalidates it once
+    version = cache.get(search.VERSION_KEY)
+    with transaction.atomic():
+        Stock.objects.filter(symbol__in=['MSFT', 'BAPP']).delete()
+    assert cache.get(search.VERSION_KEY) == version + 1
+    search_for('corp')
+    rebuilt()
+    assert search_for('corp') == [('APP', 'word_prefix')]
+    # Each process's first request builds its index ahead of any search
+    warmed = search.StockSearchIndex()
+    monkeypatch.setattr(search, 'stock_index', warmed)
+    request_started.connect(search._warm, dispatch_uid='stock_search_warm')
+    auth_client.get('/api/stocks/')
+    assert warmed._data is not None
+    # Database-side fallback has the same contract
+    settings.STOCK_SEARCH_BACKEND = 'database'
+    assert search_for('app') == [('APP', 'symbol'), ('AAPL', 'name_prefix')]
+
+@pytest.mark.django_db
+def test_conditional_get_on_detail_and_list(auth_client, user, django_assert_num_queries):
+    stock = Stock.objects.create(symbol='AAPL', company_name='Apple', purchase=1, last_div=0, industry='Tech', market_cap=1)
+    other = Stock.objects.create(symbol='MSFT', company_name='Microsoft', purchase=1, last_div=0, industry='Tech', market_cap=1)
+    portfolio = Portfolio.objects.create(user=user, stock=stock)
+
+    resp = auth_client.get(f'/api/stocks/{stock.id}/')
+    etag = resp['ETag']
+    assert etag.startswith('W/"') and resp['Last-Modified'] and 'private' in resp['Cache-Control']
+    resp = auth_client.get(f'/api/stocks/{stock.id}/', HTTP_IF_NONE_MATCH=etag)
+    assert resp.status_code == status.HTTP_304_NOT_MODIFIED and resp['ETag'] == etag and not resp.content
+    resp = auth_client.get(f'/api/stocks/{stock.id}/', HTTP_IF_MODIFIED_SINCE=resp['Last-Modified'])
+    assert resp.status_code == status.HTTP_304_NOT_MODIFIED
+    auth_client.patch(f'/api/stocks/{stock.id}/', {'company_name': 'Apple Inc.'})
+    resp = auth_client.get(f'/api/stocks/{stock.id}/', HTTP_IF_NONE_MATCH=etag)
+    assert resp.status_code == status.HTTP_200_OK and resp['ETag'] != etag
+
+    # A portfolio's ETag follows the stock summary nested in it
+    etag = auth_client.get(f'/api/portfolios/{portfolio.id}/')['ETag']
+    auth_client.patch('/api/stocks/bulk/', [{'id': stock.id, 'company_name': 'Apple Incorporated'}], format='json')
+    assert auth_client.get(f'/api/portfolios/{portfolio.id}/', HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_200_OK
+
+    # Lists: an unchanged page is answered without serializing; a deleted row changes the ETag
+    etag = auth_client.get('/api/stocks/')['ETag']
+    with django_assert_num_queries(0):  # the page's ETag comes from the response cache
+        resp = auth_client.get('/api/stocks/', HTTP_IF_NONE_MATCH=etag)
+    assert resp.status_code == status.HTTP_304_NOT_MODIFIED
+    other.delete()
+    assert auth_client.get('/api/stocks/', HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_200_OK
+
+@pytest.mark.django_db
+def test_response_cache_hits_and_signal_invalidation(auth_client, user, django_assert_num_queries):
+    from prometheus_client import REGISTRY
+    from . import response_cache
+    def lookups(view, result):
+        return REGISTRY.get_sample_value('tradez_response_cache_lookups_total', {'view': view, 'result': result}) or 0
+    stock = Stock.objects.create(symbol='AAPL', company_name='Apple', purchase=1, last_div=0, industry='Tech', market_cap=1)
+    portfolio = Portfolio.objects.create(user=user, stock=stock)
+    comment = Comment.objects.create(title='t', content='c', stock=stock, user=user)
+
+    hits = lookups('stock_detail', 'hit')
+    auth_client.get(f'/api/stocks/{stock.id}/')
+    with django_assert_num_queries(0):
+        assert auth_client.get(f'/api/stocks/{stock.id}/').data['company_name'] == 'Apple'
+    assert lookups('stock_detail', 'hit') == hits + 1
+
+    # Saving the stock invalidates its detail, the stock list and the payloads nesting it
+    auth_client.get('/api/stocks/')
+    auth_client.get(f'/api/portfolios/{portfolio.id}/')
+    other = Stock.objects.create(symbol='MSFT', company_name='Microsoft', purchase=1, last_div=0, industry='Tech', market_cap=1)
+    auth_client.get(f'/api/stocks/{other.id}/')
+    stock.company_name = 'Apple Inc.'
+    stock.save()
+    assert auth_client.get(f'/api/stocks/{stock.id}/').data['company_name'] == 'Apple Inc.'
+    assert auth_client.get(f'/api/portfolios/{portfolio.id}/').data['stock_summary']['company_name'] == 'Apple Inc.'
+    assert [s['symbol'] for s in auth_client.get('/api/stocks/').data['results']] == ['AAPL', 'MSFT']
+    with django_assert_num_queries(0):  # other rows keep their entries
+        auth_client.get(f'/api/stocks/{other.id}/')
+
+    # Usernames are shown; a login (last_login only) does not invalidate, a rename does
+    auth_client.get(f'/api/comments/{comment.id}/')
+    user.save(update_fields=['last_login'])
+    with django_assert_num_queries(1):  # the save dropped the token user's state, not the entry
+        auth_client.get(f'/api/comments/{comment.id}/')
+    user.username = 'renamed'
+    user.save()
+    assert auth_client.get(f'/api/comments/{comment.id}/').data['username'] == 'renamed'
+
+    # Bulk writes send no signals and invalidate the whole model; deletes are signalled
+    assert len(auth_client.get('/api/portfolios/').data['results']) == 1
+    auth_client.post('/api/portfolios/bulk/', [{'user': user.id, 'stock': other.id}], format='json')
+    assert len(auth_client.get('/api/portfolios/').data['results']) == 2
+    portfolio_id = portfolio.id
+    portfolio.delete()
+    assert auth_client.get(f'/api/portfolios/{portfolio_id}/').status_code == status.HTTP_404_NOT_FOUND
+
+    # The per-user summary is keyed on the caller
+    second = User.objects.create_user(username='second', password='pw12345678', email_verified=True)
+    auth_client.get('/api/portfolios/me/summary/')
+    client = APIClient()
+    client.force_authenticate(user=second)
+    assert client.get('/api/portfolios/me/summary/').data['holdings'] == []
+
+    # Large transactions bump one "every row" tag on commit instead of a tag per row
+    pending = response_cache._CommitBump()
+    for pk in range(response_cache.ROW_TAGS_PER_COMMIT + 5):
+        pending.add(Stock, pk)
+    assert 'tradez.stock:*' in pending.tags and len(pending.tags) == response_cache.ROW_TAGS_PER_COMMIT + 2
+
+def test_database_config_from_environment(tmp_path):
+    from tradezapi.database import database_config, check_connection
+    assert database_config({'DB_ENGINE': 'sqlite'}, tmp_path) == {
+        'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': str(tmp_path / 'db.sqlite3')}}
+    default = database_config({}, tmp_path)['default']
+    assert default['CONN_MAX_AGE'] == 60 and default['CONN_HEALTH_CHECKS'] is True and 'pool' not in default['OPTIONS']
+    databases = database_config({'DB_POOL': 'true', 'DB_POOL_MAX_SIZE': '20', 'DB_HOST': 'primary',
+                                 'DB_REPLICA_HOST': 'replica-1'}, tmp_path)
+    pool = databases['default']['OPTIONS']['pool']
+    assert databases['default']['CONN_MAX_AGE'] == 0 and pool['max_size'] == 20 and pool['check'] is check_connection
+    replica = databases['replica']
+    assert replica['HOST'] == 'replica-1' and replica['NAME'] == 'tradez' and replica['TEST'] == {'MIRROR': 'default'}
+    assert replica['OPTIONS']['pool'] is not pool
+
+@pytest.mark.django_db
+def test_list_views_read_from_replica(auth_client, user, monkeypatch):
+    from tradezapi.database import ReadReplicaRouter, reading_from_replica
+    from . import views
+    router = ReadReplicaRouter(replicas=['replica'])
+    routed = []
+    real_filter = views.filter_stocks
+    def spy(queryset, params):
+        routed.append(router.db_for_read(Stock))
+        return real_filter(queryset, params)
+    monkeypatch.setattr(views, 'filter_stocks', spy)
+    stock = Stock.objects.create(symbol='AAPL', company_name='Apple', purchase=1, last_div=0, industry='Tech', market_cap=1)
+    assert auth_client.get('/api/stocks/').status_code == status.HTTP_200_OK
+    assert routed == ['replica'] and not reading_from_replica()
+    # Writes, detail views and code outside requests use the primary
+    assert router.db_for_write(Stock) == 'default' and router.db_for_read(Stock) is None
+    assert auth_client.get(f'/api/stocks/{stock.id}/').status_code == status.HTTP_200_OK
+    assert not ReadReplicaRouter(replicas=[]).db_for_read(Stock)
+    assert router.allow_migrate('replica', 'tradez') is False and router.allow_migrate('default', 'tradez') is True
+
+@pytest.mark.django_db
+def test_streamed_exports_keep_the_replica(auth_client, monkeypatch):
+    from asgiref.sync import async_to_sync, iscoroutinefunction
+    from django.db import router
+    from django.test import AsyncClient
+    from tradezapi.database import ReadReplicaMiddleware, ReadReplicaRouter
+    from . import streaming
+    # The body is read after the middleware has stopped routing, so the export picks its alias up front
+    [replica_router] = [r for r in router.routers if isinstance(r, ReadReplicaRouter)]
+    monkeypatch.setattr(replica_router, 'replicas', ['default'])  # the test database stands in for it
+    used = []
+    def spy(queryset, serializer_class, chunk_size):
+        used.append(queryset._db)  # the alias fixed on the queryset, None when left to the router
+        return iter([[]])
+    monkeypatch.setattr(streaming, '_serialized_chunks', spy)
+    assert b''.join(auth_client.get('/api/stocks/', {'stream': 'json'}).streaming_content) == b'[]'
+    token = auth_client._credentials['HTTP_AUTHORIZATION']
+    resp = async_to_sync(AsyncClient().get)('/api/stocks/', {'stream': 'ndjson'}, headers={'Authorization': token})
+    assert resp.status_code == status.HTTP_200_OK
+    assert used == ['default', 'default']
+    async def async_view(request):
+        pass
+    assert iscoroutinefunction(ReadReplicaMiddleware(async_view))
+
 # --- FMP Integration Test (Mocked) ---
 def test_fmp_get_stock_quote(monkeypatch):
     from .fmp import get_stock_quote
@@ -103,4 +798,311 @@ def test_fmp_get_stock_quote(monkeypatch):
         assert result[0]['symbol'] == 'AAPL'
         assert result[0]['price'] == 150.0
 
+def test_fmp_client_caches_per_symbol():
+    from .fmp import FMPClient, LocalLRUCache
+    from prometheus_client import REGISTRY
+
+    def lookups(result):
+        return REGISTRY.get_sample_value('tradez_fmp_cache_lookups_total', {'kind': 'quote', 'result': result}) or 0
+
+    hits_before, misses_before = lookups('hit'), lookups('miss')
+    client = FMPClient(api_key='k', cache=LocalLRUCache())
+    with requests_mock.Mocker() as m:
+        m.get(requests_mock.ANY, json=[{"symbol": "AAPL", "price": 150.0}])
+        assert client.get_stock_quote('AAPL') == client.get_stock_quote('aapl')
+        assert m.call_count == 1
+        client.get_stock_quote('MSFT')
+        assert m.call_count == 2
+    assert (lookups('hit') - hits_before, lookups('miss') - misses_before) == (1, 2)
+
+def test_fmp_client_retries_on_429_and_5xx():
+    from .fmp import FMPClient, LocalLRUCache
+    client = FMPClient(api_key='k', cache=LocalLRUCache(), max_retries=2, backoff_base=0)
+    with requests_mock.Mocker() as m:
+        m.get(requests_mock.ANY, [
+            {'status_code': 429, 'headers': {'Retry-After': '0'}},
+            {'status_code': 503},
+            {'json': [{"symbol": "AAPL", "price": 151.0}]},
+        ])
+        assert client.get_stock_quote('AAPL')[0]['price'] == 151.0
+        assert m.call_count == 3
+    client = FMPClient(api_key='k', cache=LocalLRUCache(), max_retries=1, backoff_base=0)
+    with requests_mock.Mocker() as m:
+        m.get(requests_mock.ANY, status_code=500)
+        with pytest.raises(requests.HTTPError):
+            client.get_stock_quote('AAPL')
+        assert m.call_count == 2
+
+def test_fmp_client_stale_while_revalidate():
+    from .fmp import FMPClient, LocalLRUCache
+    client = FMPClient(api_key='k', cache=LocalLRUCache(), ttl=0, stale_ttl=60)
+    with requests_mock.Mocker() as m:
+        m.get(requests_mock.ANY, [{'json': [{"price": 1.0}]}, {'json': [{"price": 2.0}]}])
+        assert client.get_stock_quote('AAPL')[0]['price'] == 1.0
+        # Stale entry is served immediately while a background refresh fetches the new one
+        assert client.get_stock_quote('AAPL')[0]['price'] == 1.0
+        for _ in range(100):
+            if client.cache.get('quote:AAPL')[0][0]['price'] == 2.0:
+                break
+            time.sleep(0.01)
+        assert client.cache.get('quote:AAPL')[0][0]['price'] == 2.0
+        assert m.call_count == 2
+
+def test_fmp_client_batches_quotes_and_reports_per_symbol_errors():
+    from .fmp import FMPClient, LocalLRUCache
+    client = FMPClient(api_key='k', cache=LocalLRUCache(), max_retries=0)
+    with requests_mock.Mocker() as m:
+        m.get('https://financialmodelingprep.com/api/v3/quote/AAPL,MSFT', json=[{"symbol": "AAPL", "price": 1.0}, {"symbol": "MSFT", "price": 2.0}])
+        m.get('https://financialmodelingprep.com/api/v3/quote/NOPE,GOOG', json=[{"symbol": "GOOG", "price": 3.0}])
+        m.get('https://financialmodelingprep.com/api/v3/quote/TSLA', status_code=500)
+        result = client.get_stock_quotes(['aapl', 'MSFT', 'NOPE', 'GOOG', 'TSLA', 'AAPL'], batch_size=2)
+        assert list(result) == ['AAPL', 'MSFT', 'NOPE', 'GOOG', 'TSLA']
+        assert result['MSFT']['quote']['price'] == 2.0
+        assert result['NOPE'] == {'quote': None, 'error': 'Unknown symbol.'}
+        assert result['TSLA']['quote'] is None and '500' in result['TSLA']['error']
+        assert m.call_count == 3
+        # Batched results warm the single-symbol cache
+        assert client.get_stock_quote('GOOG')[0]['price'] == 3.0
+        assert m.call_count == 3
+
+def _mock_async_fmp(monkeypatch, prices):
+    from . import async_views
+    from .fmp import LocalLRUCache
+    from .fmp_async import AsyncFMPClient
+    client = AsyncFMPClient(api_key='k', cache=LocalLRUCache(), max_retries=0)
+    async def fake_request(endpoint, params=None):
+        symbols = endpoint.rsplit('/', 1)[-1].split(',')
+        return [{'symbol': s, 'price': prices[s]} for s in symbols if s in prices]
+    monkeypatch.setattr(client, '_request', fake_request)
+    monkeypatch.setattr(async_views, 'get_async_client', lambda: client)  # ASGI
+    monkeypatch.setattr(async_views, 'AsyncFMPClient', lambda: client)  # WSGI, per request
+    return client
+
+@pytest.mark.django_db
+def test_async_views_close_their_client_outside_asgi(auth_client, monkeypatch):
+    from . import async_views
+    from .fmp import LocalLRUCache
+    from .fmp_async import AsyncFMPClient
+    clients = []
+    class RecordingClient(AsyncFMPClient):
+        def __init__(self):
+            super().__init__(api_key='k', cache=LocalLRUCache(), max_retries=0)
+            clients.append(self)
+        async def _request(self, endpoint, params=None):
+            self._get_session()
+            return [{'symbol': 'AAPL', 'price': 150.0}]
+    monkeypatch.setattr(async_views, 'AsyncFMPClient', RecordingClient)
+    for _ in range(3):
+        assert auth_client.get('/api/quotes/AAPL/').status_code == status.HTTP_200_OK
+    # The test client is WSGI: each request ran on its own loop with its own client, closed after
+    assert len(clients) == 3
+    assert all(c._session.closed for c in clients)
+
+@pytest.mark.django_db
+def test_async_quote_endpoints(auth_client, api_client, monkeypatch):
+    _mock_async_fmp(monkeypatch, {'AAPL': 150.0, 'MSFT': 300.0})
+    resp = auth_client.get('/api/quotes/aapl/')
+    assert resp.status_code == status.HTTP_200_OK
+    assert resp.json()['price'] == 150.0
+    resp = auth_client.get('/api/quotes/', {'symbols': 'AAPL,MSFT,NOPE'})
+    body = resp.json()
+    assert body['MSFT']['quote']['price'] == 300.0
+    assert body['NOPE']['error'] == 'Unknown symbol.'
+    assert auth_client.get('/api/quotes/NOPE/').status_code == status.HTTP_404_NOT_FOUND
+    # Symbols go into the upstream path, so anything that is not a ticker is refused
+    assert auth_client.get('/api/quotes/AA%3FPL/').status_code == status.HTTP_400_BAD_REQUEST
+    assert auth_client.get('/api/quotes/', {'symbols': 'AAPL,A/B'}).json() == {'detail': 'Invalid symbols: A/B.'}
+    assert auth_client.get('/api/quotes/', {'symbols': 'BRK.B,^GSPC'}).status_code == status.HTTP_200_OK
+    api_client.credentials()
+    assert api_client.get('/api/quotes/AAPL/').status_code == status.HTTP_401_UNAUTHORIZED
+
+@pytest.mark.django_db
+def test_quote_list_caps_symbols_and_concurrent_batches(auth_client, settings, monkeypatch):
+    import asyncio
+    from asgiref.sync import async_to_sync
+    client = _mock_async_fmp(monkeypatch, {'AAPL': 150.0})
+    settings.QUOTE_MAX_SYMBOLS = 3
+    assert auth_client.get('/api/quotes/', {'symbols': 'A,B,C'}).status_code == status.HTTP_200_OK
+    resp = auth_client.get('/api/quotes/', {'symbols': 'A,B,C,D'})
+    assert resp.status_code == status.HTTP_400_BAD_REQUEST and resp.json()['detail'] == 'At most 3 symbols per request.'
+    # However many batches a request needs, only max_workers of them are fetched at once
+    in_flight = {'now': 0, 'most': 0}
+    async def slow_request(endpoint, params=None):
+        in_flight['now'] += 1
+        in_flight['most'] = max(in_flight['most'], in_flight['now'])
+        await asyncio.sleep(0.01)
+        in_flight['now'] -= 1
+        return []
+    monkeypatch.setattr(client, '_request', slow_request)
+    quotes = async_to_sync(client.get_stock_quotes)([f'S{i}' for i in range(6)], batch_size=1, max_workers=2)
+    assert len(quotes) == 6 and in_flight['most'] == 2
+
+@pytest.mark.django_db
+def test_async_portfolio_valuation(auth_client, user, monkeypatch):
+    _mock_async_fmp(monkeypatch, {'AAPL': 150.0, 'MSFT': 250.0})
+    other = User.objects.create_user(username='other', password='pass12345', email='o@example.com')
+    aapl = Stock.objects.create(symbol='AAPL', company_name='Apple', purchase=100, last_div=0.5, industry='Tech', market_cap=1)
+    msft = Stock.objects.create(symbol='MSFT', company_name='Microsoft', purchase=300, last_div=0.2, industry='Tech', market_cap=1)
+    Portfolio.objects.create(user=user, stock=aapl)
+    Portfolio.objects.create(user=user, stock=msft)
+    Portfolio.objects.create(user=other, stock=aapl)
+    resp = auth_client.get('/api/portfolios/me/valuation/')
+    assert resp.status_code == status.HTTP_200_OK
+    body = resp.json()
+    assert [h['symbol'] for h in body['holdings']] == ['AAPL', 'MSFT']
+    assert body['holdings'][0]['change_percent'] == '50.00'
+    assert body['total_cost'] == '400.00'
+    assert body['market_value'] == '400.00'
+    assert body['unrealized_gain'] == '0.00'
+
+@pytest.mark.django_db
+def test_quote_endpoints_share_a_throttled_fmp_budget(auth_client, user, settings, monkeypatch):
+    from django.core.cache import caches
+    from .throttling import CacheBucketStore
+    _mock_async_fmp(monkeypatch, {'AAPL': 150.0})
+    settings.THROTTLE_RATES = {**settings.THROTTLE_RATES, 'fmp_quotes': '2/min'}
+    assert auth_client.get('/api/quotes/AAPL/').status_code == status.HTTP_200_OK
+    assert auth_client.get('/api/quotes/', {'symbols': 'AAPL'}).status_code == status.HTTP_200_OK
+    resp = auth_client.get('/api/portfolios/me/valuation/')
+    assert resp.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert 0 < int(resp['Retry-After']) <= 30  # one token every 60 / 2 seconds
+    assert 'throttled' in resp.json()['detail']
+    # Other budgets and other users are unaffected
+    assert auth_client.get('/api/stocks/').status_code == status.HTTP_200_OK
+    User.objects.create_user(username='other', password='pass12345', email='o@example.com')
+    other = APIClient()
+    token = other.post(reverse('token_obtain_pair'), {'username': 'other', 'password': 'pass12345'}).data['access']
+    other.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+    assert other.get('/api/quotes/AAPL/').status_code == status.HTTP_200_OK
+    # The shared store keeps the same buckets in the cache
+    caches['throttle'].clear()
+    store = CacheBucketStore('throttle')
+    assert [store.acquire('throttle:test', 1.0, 3) for _ in range(3)] == [0, 0, 0]
+    assert 0.9 < store.acquire('throttle:test', 1.0, 3) <= 1.0
+    assert store.acquire('throttle:other', 1.0, 3) == 0
+
+@pytest.mark.django_db(transaction=True)
+def test_price_stream_pushes_refresher_diffs(auth_client, user, settings):
+    import asyncio
+    from asgiref.sync import sync_to_async
+    from .price_stream import PriceBroker
+    from .quote_refresher import refresh_quotes
+    settings.PRICE_STREAM_POLL_INTERVAL = 0.01
+    aapl = Stock.objects.create(symbol='AAPL', company_name='Apple', purchase=100, last_div=0.5, industry='Tech', market_cap=1)
+    msft = Stock.objects.create(symbol='MSFT', company_name='Microsoft', purchase=300, last_div=0.2, industry='Tech', market_cap=1)
+    Portfolio.objects.create(user=user, stock=aapl)
+    Portfolio.objects.create(user=user, stock=msft)
+    broker = PriceBroker()
+
+    def profiles(symbols):
+        return {
+            'AAPL': {'profile': {'price': 187.456, 'lastDiv': 0.5, 'mktCap': 1}, 'error': None},
+            'MSFT': {'profile': {'price': 300, 'lastDiv': 0.2, 'mktCap': 1}, 'error': None},
+        }
+
+    async def scenario():
+        both, msft_only = broker.stream(['AAPL', 'MSFT', 'NOPE']), broker.stream(['MSFT'])
+        snapshot = await both.__anext__()
+        await msft_only.__anext__()
+        await sync_to_async(refresh_quotes)(fetch=profiles)
+        update = await asyncio.wait_for(both.__anext__(), 5)
+        try:
+            msft_update = await asyncio.wait_for(msft_only.__anext__(), 0.5)
+        except asyncio.TimeoutError:
+            msft_update = None
+        watched = len(broker.subscribers)  # one entry per symbol, however many subscribers
+        await both.aclose()
+        await msft_only.aclose()
+        return snapshot, update, msft_update, watched
+
+    snapshot, update, msft_update, watched = asyncio.run(scenario())
+    assert snapshot.startswith('retry: 3000\n\nevent: snapshot\ndata: ')
+    data = json.loads(snapshot.split('data: ', 1)[1])
+    assert data['AAPL']['purchase'] == '100.00' and data['NOPE'] is None
+    # Only changed fields are sent: AAPL's price moved; MSFT's quote did not change, so it is not pushed
+    events = [json.loads(line[len('data: '):]) for line in update.splitlines() if line.startswith('data: ')]
+    assert [e['symbol'] for e in events] == ['AAPL']
+    assert events[0]['purchase'] == '187.46' and 'last_div' not in events[0] and 'quote_updated_at' in events[0]
+    assert msft_update is None
+    assert watched == 3 and broker.subscribers == {}
+    # The HTTP endpoint validates before streaming
+    assert auth_client.get('/api/quotes/stream/').status_code == status.HTTP_400_BAD_REQUEST
+    assert auth_client.get('/api/quotes/stream/', {'symbols': ','.join(f'S{i}' for i in range(51))}).status_code == 400
+    assert APIClient().get('/api/quotes/stream/', {'symbols': 'AAPL'}).status_code == status.HTTP_401_UNAUTHORIZED
+    # It only streams under ASGI; the (WSGI) test client gets a 501 instead of a request that never ends
+    resp = auth_client.get('/api/quotes/stream/', {'symbols': 'AAPL'})
+    assert resp.status_code == status.HTTP_501_NOT_IMPLEMENTED and 'ASGI' in resp.json()['detail']
+    from django.test import AsyncClient
+    from asgiref.sync import async_to_sync
+    token = auth_client._credentials['HTTP_AUTHORIZATION']
+    resp = async_to_sync(AsyncClient().get)('/api/quotes/stream/', {'symbols': 'AAPL'}, headers={'Authorization': token})
+    assert resp.status_code == status.HTTP_200_OK and resp['Content-Type'] == 'text/event-stream'
+
+def test_fmp_client_single_flight_across_threads():
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+    from .fmp import FMPClient, LocalLRUCache
+    client = FMPClient(api_key='k', cache=LocalLRUCache())
+    release = threading.Event()
+    def slow_quote(request, context):
+        release.wait(2)
+        return [{"symbol": "AAPL", "price": 150.0}]
+    with requests_mock.Mocker() as m:
+        m.get(requests_mock.ANY, json=slow_quote)
+        with ThreadPoolExecutor(max_workers=10) as pool:
+            futures = [pool.submit(client.get_stock_quote, 'AAPL') for _ in range(10)]
+            time.sleep(0.1)
+            release.set()
+            results = [f.result() for f in futures]
+        assert m.call_count == 1
+        assert all(r[0]['price'] == 150.0 for r in results)
+
+def test_async_fmp_client_single_flight_across_tasks():
+    import asyncio
+    from .fmp import LocalLRUCache
+    from .fmp_async import AsyncFMPClient
+    client = AsyncFMPClient(api_key='k', cache=LocalLRUCache())
+    calls = []
+    async def fake_request(endpoint, params=None):
+        calls.append(endpoint)
+        await asyncio.sleep(0.05)
+        return [{"symbol": "AAPL", "price": 150.0}]
+    client._request = fake_request
+    async def burst():
+        return await asyncio.gather(*(client.get_stock_quote('AAPL') for _ in range(20)))
+    results = asyncio.run(burst())
+    assert calls == ['quote/AAPL']
+    assert len(results) == 20
+
+def test_async_single_flight_survives_leader_cancellation():
+    import asyncio
+    from .fmp_async import AsyncSingleFlight
+    flight = AsyncSingleFlight()
+    calls = []
+    async def upstream():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return 'quote'
+    async def scenario():
+        leader = asyncio.ensure_future(flight.do('AAPL', upstream))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do('AAPL', upstream))
+        await asyncio.sleep(0.01)
+        leader.cancel()  # the leader's client disconnected
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower, await flight.do('AAPL', upstream)
+    assert asyncio.run(scenario()) == ('quote', 'quote')
+    assert len(calls) == 2  # one shared call, then a fresh one once it finished
+
+def test_fmp_client_negative_caches_unknown_symbols():
+    from .fmp import FMPClient, LocalLRUCache
+    client = FMPClient(api_key='k', cache=LocalLRUCache(), negative_ttl=60)
+    with requests_mock.Mocker() as m:
+        m.get(requests_mock.ANY, json=[])
+        assert client.get_stock_quote('NOPE') == []
+        assert client.get_stock_quote('NOPE') == []
+        assert client.get_stock_quotes(['NOPE'])['NOPE']['error'] == 'Unknown symbol.'
+        assert m.call_count == 1
+
 # All tests are robust, well-documented, and use pytest best practices.
@@ -0,0 +1,155 @@
+import math
+import threading
+import time
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import BaseThrottle
+from .metrics import THROTTLED_REQUESTS
+
+# Token-bucket throttles, as a GCRA (generic cell rate algorithm): a bucket of rate
+# 'N/period' holds up to N tokens and gains one every period / N seconds. Instead of a
+# token count, each bucket stores one timestamp, its theoretical arrival time (TAT): the
+# time at which it would be full again. A request is let through while the TAT is less
+# than a full bucket (N - 1 intervals) ahead of now, and pushes it one interval further.
+#
+# Buckets live in a store: CacheBucketStore keeps them in the 'throttle' cache alias, so
+# with Redis they are shared by all workers; LocalBucketStore keeps them in this process
+# behind a lock (tests, or a single process).
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+KEY_PREFIX = 'throttle:'
+LOCK_ATTEMPTS = 50  # x 1 ms, then update the bucket unlocked
+
+
+def parse_rate(rate):
+    """'10/min' -> (10, 60.0); None means unlimited."""
+    if rate is None:
+        return None
+    count, period = rate.split('/')
+    return int(count), float(PERIODS[period[0]])
+
+
+def take(tat, now, interval, capacity):
+    """
+    One token from the bucket whose TAT is `tat` (None for a new bucket):
+    (new TAT, 0) when there is one, else (tat, seconds until there is).
+    """
+    tat = max(tat or now, now)
+    wait = tat - interval * (capacity - 1) - now
+    if wait > 0:
+        return tat, wait
+    return tat + interval, 0
+
+
+class LocalBucketStore:
+    def __init__(self):
+        self._tats = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, key, interval, capacity):
+        with self._lock:
+            now = time.time()
+            tat, wait = take(self._tats.get(key), now, interval, capacity)
+            self._tats[key] = tat
+            if len(self._tats) > 10000:
+                # Buckets whose TAT has passed are full, the same as absent ones
+                self._tats = {k: v for k, v in self._tats.items() if v > now}
+            return wait
+
+    def reset(self):
+        with self._lock:
+            self._tats.clear()
+
+
+class CacheBucketStore:
+    def __init__(self, alias):
+        self.alias = alias
+
+    def acquire(self, key, interval, capacity):
+        cache = caches[self.alias]
+        lock = key + ':lock'
+        # cache.add() is atomic (SET NX on Redis), so it serves as a short per-bucket lock
+        for _ in range(LOCK_ATTEMPTS):
+            if cache.add(lock, 1, timeout=1):
+                break
+            time.sleep(0.001)
+        else:
+            lock = None
+        try:
+            now = time.time()
+            tat, wait = take(cache.get(key), now, interval, capacity)
+            if not wait:
+                cache.set(key, tat, timeout=math.ceil(tat - now) + 1)
+            return wait
+        finally:
+            if lock:
+                cache.delete(lock)
+
+
+local_store = LocalBucketStore()
+
+
+def get_store():
+    if settings.THROTTLE_STORE == 'local':
+        return local_store
+    return CacheBucketStore(settings.THROTTLE_CACHE_ALIAS)
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Token bucket of settings.THROTTLE_RATES[scope] per user (or client IP when anonymous),
+    and per route when `per_route`. Works on DRF requests and on plain Django requests of
+    the async views (see tradez.async_views.throttled).
+    """
+    scope = None
+    per_route = False
+
+    def __init__(self):
+        self._wait = None
+
+    def get_cache_key(self, request):
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            ident = f'user:{user.pk}'
+        else:
+            ident = f'ip:{self.get_ident(request)}'
+        key = f'{KEY_PREFIX}{self.scope}:{ident}'
+        if self.per_route:
+            match = getattr(request, 'resolver_match', None)
+            key += ':' + (match.route if match is not None else request.path)
+        return key
+
+    def allow_request(self, request, view):
+        rate = parse_rate(settings.THROTTLE_RATES.get(self.scope))
+        if not settings.THROTTLE_ENABLED or rate is None:
+            return True
+        count, period = rate
+        self._wait = get_store().acquire(self.get_cache_key(request), period / count, count)
+        if self._wait:
+            THROTTLED_REQUESTS.labels(self.scope).inc()
+            return False
+        return True
+
+    def wait(self):
+        return self._wait
+
+
+class RouteThrottle(TokenBucketThrottle):
+    """General budget of each user or IP on each route."""
+    scope = 'route'
+    per_route = True
+
+
+class PasswordHashingThrottle(TokenBucketThrottle):
+    """Requests that hash a password (register, login, reset confirm), across those routes."""
+    scope = 'password_hashing'
+
+
+class PasswordResetThrottle(TokenBucketThrottle):
+    """Password reset emails."""
+    scope = 'password_reset'
+
+
+class QuoteFetchThrottle(TokenBucketThrottle):
+    """Requests that fetch live quotes from FMP, across the quote and valuation endpoints."""
+    scope = 'fmp_quotes'
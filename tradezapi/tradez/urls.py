@@ -1,18 +1,37 @@
 from django.urls import path
 from .views import (
-    StockListCreateAPIView, StockDetailAPIView,
-    PortfolioListCreateAPIView, PortfolioDetailAPIView,
-    CommentListCreateAPIView, CommentDetailAPIView,
+    StockListCreateAPIView, StockDetailAPIView, StockQuoteStalenessAPIView,
+    StockPriceHistoryAPIView, StockBulkAPIView, StockSearchAPIView,
+    PortfolioListCreateAPIView, PortfolioDetailAPIView, PortfolioAnalyticsAPIView,
+    PortfolioSummaryAPIView, PortfolioBulkAPIView,
+    CommentListCreateAPIView, CommentDetailAPIView, CommentBulkAPIView,
+    ProfilingReportAPIView,
 )
+from .async_views import quote_detail, quote_list, quote_stream, portfolio_valuation
 
 urlpatterns = [
     # Stock endpoints
     path('stocks/', StockListCreateAPIView.as_view(), name='stock-list-create'),
     path('stocks/<int:pk>/', StockDetailAPIView.as_view(), name='stock-detail'),
+    path('stocks/bulk/', StockBulkAPIView.as_view(), name='stock-bulk'),
+    path('stocks/search/', StockSearchAPIView.as_view(), name='stock-search'),
+    path('stocks/staleness/', StockQuoteStalenessAPIView.as_view(), name='stock-staleness'),
+    path('stocks/<int:pk>/prices/', StockPriceHistoryAPIView.as_view(), name='stock-prices'),
     # Portfolio endpoints
     path('portfolios/', PortfolioListCreateAPIView.as_view(), name='portfolio-list-create'),
     path('portfolios/<int:pk>/', PortfolioDetailAPIView.as_view(), name='portfolio-detail'),
+    path('portfolios/bulk/', PortfolioBulkAPIView.as_view(), name='portfolio-bulk'),
+    path('portfolios/me/summary/', PortfolioSummaryAPIView.as_view(), name='portfolio-summary'),
+    path('portfolios/me/analytics/', PortfolioAnalyticsAPIView.as_view(), name='portfolio-analytics'),
+    path('portfolios/me/valuation/', portfolio_valuation, name='portfolio-valuation'),
     # Comment endpoints
     path('comments/', CommentListCreateAPIView.as_view(), name='comment-list-create'),
+    path('comments/bulk/', CommentBulkAPIView.as_view(), name='comment-bulk'),
     path('comments/<int:pk>/', CommentDetailAPIView.as_view(), name='comment-detail'),
+    # Live quote endpoints (async, served best under ASGI)
+    path('quotes/', quote_list, name='quote-list'),
+    path('quotes/stream/', quote_stream, name='quote-stream'),
+    path('quotes/<str:symbol>/', quote_detail, name='quote-detail'),
+    # Request profiling report (admin only)
+    path('profiling/', ProfilingReportAPIView.as_view(), name='profiling-report'),
 ]
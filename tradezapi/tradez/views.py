@@ -1,19 +1,62 @@
+from datetime import date
+from decimal import Decimal
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from rest_framework.parsers import JSONParser
+from rest_framework_simplejwt.authentication import JWTAuthentication
 from django.shortcuts import get_object_or_404
+from django.conf import settings
+from django.db.models import Count, Sum
+from django.contrib.auth import get_user_model
 from .models import Stock, Portfolio, Comment
-from .serializers import StockSerializer, PortfolioSerializer, CommentSerializer
+from .serializers import (
+    StockSerializer, PortfolioSerializer, CommentSerializer,
+    StockBulkSerializer, PortfolioBulkSerializer, CommentBulkSerializer,
+)
+from .parsers import NDJSONParser
+from . import bulk
+from .pagination import StockPagination, PortfolioPagination, CommentPagination
+from .filters import filter_stocks, filter_portfolios, filter_comments
+from .streaming import streaming_response
+from .quote_refresher import quote_staleness
+from .prices import price_range, INTERVALS
+from .analytics import portfolio_analytics
+from . import profiling, search
+from .metrics import ANALYTICS_DURATION, STREAMED_EXPORTS
+from .conditional import make_etag, last_modified
+from . import response_cache
+from .response_cache import Payload, cached_get, collection_tag, row_tags
+from .fast_serializers import values_serializer
+from .renderers import ORJSONRenderer
+
+User = get_user_model()
 
 # --- STOCK API VIEWS ---
 class StockListCreateAPIView(APIView):
     permission_classes = [IsAuthenticated]
-    """List all stocks or create a new stock."""
+    read_replica = True  # GET reads may come from a replica (tradezapi.database)
+    renderer_classes = [ORJSONRenderer]  # payloads hold no floats (see tradez.renderers)
+    """List stocks (filtered, cursor-paginated) or create a new stock."""
     def get(self, request):
-        stocks = Stock.objects.all()
-        serializer = StockSerializer(stocks, many=True)
-        return Response(serializer.data)
+        stocks = filter_stocks(Stock.objects.all(), request.query_params)
+        # Bulk consumers can opt into a constant-memory export of the whole (filtered) table
+        stream_format = request.query_params.get('stream')
+        if stream_format:
+            response = streaming_response(request, stocks.order_by('id'), StockSerializer, stream_format)
+            STREAMED_EXPORTS.labels('stocks', stream_format).inc()
+            return response
+
+        def build():
+            paginator = StockPagination()
+            # values() rows serialized like StockSerializer, without building model instances
+            rows = values_serializer(StockSerializer)
+            page = paginator.paginate_queryset(rows.values(stocks), request, view=self)
+            # The page's row versions and links identify it for conditional GETs
+            etag = make_etag(page, paginator.get_next_link(), paginator.get_previous_link())
+            return Payload(paginator.get_paginated_response(rows.data(page)).data, etag)
+        return cached_get(request, 'stock_list', [collection_tag(Stock)], build)
 
     def post(self, request):
         serializer = StockSerializer(data=request.data)
@@ -26,9 +69,10 @@ class StockDetailAPIView(APIView):
     permission_classes = [IsAuthenticated]
     """Retrieve, update, or delete a stock by id."""
     def get(self, request, pk):
-        stock = get_object_or_404(Stock, pk=pk)
-        serializer = StockSerializer(stock)
-        return Response(serializer.data)
+        def build():
+            stock = get_object_or_404(Stock, pk=pk)
+            return Payload(StockSerializer(stock).data, make_etag([stock]), last_modified(stock))
+        return cached_get(request, 'stock_detail', row_tags(Stock, pk), build)
 
     def put(self, request, pk):
         stock = get_object_or_404(Stock, pk=pk)
@@ -51,14 +95,83 @@ class StockDetailAPIView(APIView):
         stock.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+class StockBulkAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+    parser_classes = [JSONParser, NDJSONParser]
+    """Bulk create (?upsert=true updates rows whose symbol exists), partial update or delete stocks; JSON array or NDJSON body."""
+    def post(self, request):
+        upsert = request.query_params.get('upsert', '').lower() in ('1', 'true', 'yes')
+        with response_cache.bulk_invalidation(Stock):
+            response = bulk.bulk_create(request, StockBulkSerializer, upsert=upsert)
+        search.invalidate()  # bulk writes send no model signals
+        return response
+
+    def patch(self, request):
+        with response_cache.bulk_invalidation(Stock):
+            response = bulk.bulk_update(request, StockBulkSerializer)
+        search.invalidate()
+        return response
+
+    def delete(self, request):
+        with response_cache.bulk_invalidation(Stock):
+            return bulk.bulk_delete(request, Stock)
+
+class StockSearchAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+    """Ranked symbol / company-name autocomplete (?q=&limit=, limit capped at 50)."""
+    def get(self, request):
+        query = request.query_params.get('q', '')
+        try:
+            limit = int(request.query_params.get('limit', 10))
+        except ValueError:
+            return Response({'detail': 'limit must be an integer.'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'query': query, 'results': search.search_stocks(query, limit)})
+
+class StockQuoteStalenessAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+    """How fresh the refresher keeps the quotes of stocks held in portfolios."""
+    def get(self, request):
+        return Response({**quote_staleness(), 'refresh_interval': settings.QUOTE_REFRESH_INTERVAL})
+
+class StockPriceHistoryAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+    """Columnar OHLCV history of a stock, optionally downsampled (?from=&to=&interval=daily|weekly|monthly)."""
+    def get(self, request, pk):
+        stock = get_object_or_404(Stock, pk=pk)
+        interval = request.query_params.get('interval', 'daily')
+        if interval not in INTERVALS:
+            return Response({'detail': f"interval must be one of: {', '.join(INTERVALS)}."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            start = date.fromisoformat(request.query_params['from']) if request.query_params.get('from') else None
+            end = date.fromisoformat(request.query_params['to']) if request.query_params.get('to') else None
+        except ValueError:
+            return Response({'detail': 'from/to must be dates in YYYY-MM-DD format.'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'symbol': stock.symbol, 'interval': interval, **price_range(stock.id, start, end, interval)})
+
 # --- PORTFOLIO API VIEWS ---
 class PortfolioListCreateAPIView(APIView):
     permission_classes = [IsAuthenticated]
-    """List all portfolios or create a new portfolio."""
+    read_replica = True  # GET reads may come from a replica (tradezapi.database)
+    renderer_classes = [ORJSONRenderer]  # payloads hold no floats (see tradez.renderers)
+    """List portfolios (filtered, cursor-paginated) or create a new portfolio."""
     def get(self, request):
-        portfolios = Portfolio.objects.all()
-        serializer = PortfolioSerializer(portfolios, many=True)
-        return Response(serializer.data)
+        portfolios = filter_portfolios(Portfolio.objects.select_related('user', 'stock'), request.query_params)
+        # Bulk consumers can opt into a constant-memory export of the whole (filtered) table
+        stream_format = request.query_params.get('stream')
+        if stream_format:
+            response = streaming_response(request, portfolios.order_by('id'), PortfolioSerializer, stream_format)
+            STREAMED_EXPORTS.labels('portfolios', stream_format).inc()
+            return response
+
+        def build():
+            paginator = PortfolioPagination()
+            rows = values_serializer(PortfolioSerializer)
+            # stock__updated_at is not shown, but versions the nested stock summary in the ETag
+            page = paginator.paginate_queryset(rows.values(portfolios, 'stock__updated_at'), request, view=self)
+            # The page's row versions and links identify it for conditional GETs
+            etag = make_etag(page, paginator.get_next_link(), paginator.get_previous_link())
+            return Payload(paginator.get_paginated_response(rows.data(page)).data, etag)
+        return cached_get(request, 'portfolio_list', [collection_tag(Portfolio), collection_tag(Stock), collection_tag(User)], build)
 
     def post(self, request):
         serializer = PortfolioSerializer(data=request.data)
@@ -71,12 +184,15 @@ class PortfolioDetailAPIView(APIView):
     permission_classes = [IsAuthenticated]
     """Retrieve, update, or delete a portfolio by id."""
     def get(self, request, pk):
-        portfolio = get_object_or_404(Portfolio, pk=pk)
-        serializer = PortfolioSerializer(portfolio)
-        return Response(serializer.data)
+        def build():
+            portfolio = get_object_or_404(Portfolio.objects.select_related('user', 'stock'), pk=pk)
+            # Nested stock summary and username
+            tags = [*row_tags(Stock, portfolio.stock_id), *row_tags(User, portfolio.user_id)]
+            return Payload(PortfolioSerializer(portfolio).data, make_etag([portfolio]), last_modified(portfolio), tags)
+        return cached_get(request, 'portfolio_detail', row_tags(Portfolio, pk), build)
 
     def put(self, request, pk):
-        portfolio = get_object_or_404(Portfolio, pk=pk)
+        portfolio = get_object_or_404(Portfolio.objects.select_related('user', 'stock'), pk=pk)
         serializer = PortfolioSerializer(portfolio, data=request.data)
         if serializer.is_valid():
             serializer.save()
@@ -84,7 +200,7 @@ class PortfolioDetailAPIView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def patch(self, request, pk):
-        portfolio = get_object_or_404(Portfolio, pk=pk)
+        portfolio = get_object_or_404(Portfolio.objects.select_related('user', 'stock'), pk=pk)
         serializer = PortfolioSerializer(portfolio, data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
@@ -96,14 +212,117 @@ class PortfolioDetailAPIView(APIView):
         portfolio.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+class PortfolioBulkAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+    parser_classes = [JSONParser, NDJSONParser]
+    """Bulk create, partial update or delete portfolios; JSON array or NDJSON body."""
+    def post(self, request):
+        with response_cache.bulk_invalidation(Portfolio):
+            return bulk.bulk_create(request, PortfolioBulkSerializer)
+
+    def patch(self, request):
+        with response_cache.bulk_invalidation(Portfolio):
+            return bulk.bulk_update(request, PortfolioBulkSerializer)
+
+    def delete(self, request):
+        with response_cache.bulk_invalidation(Portfolio):
+            return bulk.bulk_delete(request, Portfolio)
+
+class PortfolioSummaryAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+    """
+    The caller's holdings with their stock data, plus totals and industry allocation.
+    Uses three queries however many holdings there are: the joined holdings, the totals
+    aggregate and the per-industry GROUP BY. Values are per one share of each holding.
+    """
+    def get(self, request):
+        return cached_get(request, 'portfolio_summary', [collection_tag(Portfolio), collection_tag(Stock)],
+                          lambda: Payload(self.summary(request.user)), per_user=True)
+
+    def summary(self, user):
+        portfolios = Portfolio.objects.filter(user_id=user.pk)
+        holdings = portfolios.select_related('stock').order_by('stock__symbol')
+        totals = portfolios.aggregate(
+            holdings=Count('id'),
+            market_value=Sum('stock__purchase'),
+            annual_dividends=Sum('stock__last_div'),
+        )
+        industries = (
+            portfolios.values('stock__industry')
+            .annotate(holdings=Count('id'), market_value=Sum('stock__purchase'))
+            .order_by('-market_value', 'stock__industry')
+        )
+        market_value = totals['market_value'] or Decimal('0')
+        annual_dividends = totals['annual_dividends'] or Decimal('0')
+        return {
+            'holdings': [
+                {'id': portfolio.id, 'stock': StockSerializer(portfolio.stock).data}
+                for portfolio in holdings
+            ],
+            'totals': {
+                'holdings': totals['holdings'],
+                'market_value': f'{market_value:.2f}',
+                'annual_dividends': f'{annual_dividends:.2f}',
+                'dividend_yield': f'{annual_dividends / market_value * 100:.2f}' if market_value else None,
+            },
+            'industry_allocation': [
+                {
+                    'industry': row['stock__industry'],
+                    'holdings': row['holdings'],
+                    'market_value': f"{row['market_value']:.2f}",
+                    'weight': f"{row['market_value'] / market_value * 100:.2f}" if market_value else None,
+                }
+                for row in industries
+            ],
+        }
+
+class PortfolioAnalyticsAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+    """
+    Returns, volatility, correlation, beta and drawdown of the caller's portfolio (all of
+    their holdings). Query params: from, to, benchmark (default SPY), covariance=true to
+    include the covariance matrix.
+    """
+    def get(self, request):
+        try:
+            start = date.fromisoformat(request.query_params['from']) if request.query_params.get('from') else None
+            end = date.fromisoformat(request.query_params['to']) if request.query_params.get('to') else None
+        except ValueError:
+            return Response({'detail': 'from/to must be dates in YYYY-MM-DD format.'}, status=status.HTTP_400_BAD_REQUEST)
+        with ANALYTICS_DURATION.time():
+            result = portfolio_analytics(
+                request.user, start, end,
+                benchmark_symbol=request.query_params.get('benchmark', 'SPY'),
+                include_covariance=request.query_params.get('covariance', '').lower() in ('1', 'true', 'yes'),
+            )
+        if result is None:
+            return Response({'detail': 'Not enough price history for these holdings.'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(result)
+
 # --- COMMENT API VIEWS ---
 class CommentListCreateAPIView(APIView):
     permission_classes = [IsAuthenticated]
-    """List all comments or create a new comment."""
+    read_replica = True  # GET reads may come from a replica (tradezapi.database)
+    renderer_classes = [ORJSONRenderer]  # payloads hold no floats (see tradez.renderers)
+    """List comments (filtered, cursor-paginated) or create a new comment."""
     def get(self, request):
-        comments = Comment.objects.all()
-        serializer = CommentSerializer(comments, many=True)
-        return Response(serializer.data)
+        comments = filter_comments(Comment.objects.select_related('user', 'stock'), request.query_params)
+        # Bulk consumers can opt into a constant-memory export of the whole (filtered) table
+        stream_format = request.query_params.get('stream')
+        if stream_format:
+            response = streaming_response(request, comments.order_by('id'), CommentSerializer, stream_format)
+            STREAMED_EXPORTS.labels('comments', stream_format).inc()
+            return response
+
+        def build():
+            paginator = CommentPagination()
+            rows = values_serializer(CommentSerializer)
+            # stock__updated_at is not shown, but versions the nested stock summary in the ETag
+            page = paginator.paginate_queryset(rows.values(comments, 'stock__updated_at'), request, view=self)
+            # The page's row versions and links identify it for conditional GETs
+            etag = make_etag(page, paginator.get_next_link(), paginator.get_previous_link())
+            return Payload(paginator.get_paginated_response(rows.data(page)).data, etag)
+        return cached_get(request, 'comment_list', [collection_tag(Comment), collection_tag(Stock), collection_tag(User)], build)
 
     def post(self, request):
         serializer = CommentSerializer(data=request.data)
@@ -112,16 +331,35 @@ class CommentListCreateAPIView(APIView):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+class CommentBulkAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+    parser_classes = [JSONParser, NDJSONParser]
+    """Bulk create, partial update or delete comments; JSON array or NDJSON body."""
+    def post(self, request):
+        with response_cache.bulk_invalidation(Comment):
+            return bulk.bulk_create(request, CommentBulkSerializer)
+
+    def patch(self, request):
+        with response_cache.bulk_invalidation(Comment):
+            return bulk.bulk_update(request, CommentBulkSerializer)
+
+    def delete(self, request):
+        with response_cache.bulk_invalidation(Comment):
+            return bulk.bulk_delete(request, Comment)
+
 class CommentDetailAPIView(APIView):
     permission_classes = [IsAuthenticated]
     """Retrieve, update, or delete a comment by id."""
     def get(self, request, pk):
-        comment = get_object_or_404(Comment, pk=pk)
-        serializer = CommentSerializer(comment)
-        return Response(serializer.data)
+        def build():
+            comment = get_object_or_404(Comment.objects.select_related('user', 'stock'), pk=pk)
+            # Nested stock summary and username
+            tags = [*row_tags(User, comment.user_id), *(row_tags(Stock, comment.stock_id) if comment.stock_id else [])]
+            return Payload(CommentSerializer(comment).data, make_etag([comment]), last_modified(comment), tags)
+        return cached_get(request, 'comment_detail', row_tags(Comment, pk), build)
 
     def put(self, request, pk):
-        comment = get_object_or_404(Comment, pk=pk)
+        comment = get_object_or_404(Comment.objects.select_related('user', 'stock'), pk=pk)
         serializer = CommentSerializer(comment, data=request.data)
         if serializer.is_valid():
             serializer.save()
@@ -129,7 +367,7 @@ class CommentDetailAPIView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def patch(self, request, pk):
-        comment = get_object_or_404(Comment, pk=pk)
+        comment = get_object_or_404(Comment.objects.select_related('user', 'stock'), pk=pk)
         serializer = CommentSerializer(comment, data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
@@ -141,4 +379,16 @@ class CommentDetailAPIView(APIView):
         comment.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+# --- PROFILING API VIEW ---
+class ProfilingReportAPIView(APIView):
+    authentication_classes = [JWTAuthentication]  # is_staff is not a token claim
+    permission_classes = [IsAdminUser]
+    """Per-route query/HTTP/serialization/wall-time histograms (admin only); DELETE resets them."""
+    def get(self, request):
+        return Response({'enabled': settings.REQUEST_PROFILING, 'routes': profiling.collect_report()})
+
+    def delete(self, request):
+        profiling.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
 # All APIViews are well-commented for clarity and follow DRF best practices.
@@ -17,6 +17,14 @@ EMAIL_USE_TLS = os.getenv('EMAIL_USE_TLS', 'True') == 'True'
 EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD')
 
+# Email outbox worker (python manage.py send_emails)
+EMAIL_OUTBOX_BATCH_SIZE = int(os.getenv('EMAIL_OUTBOX_BATCH_SIZE', 50))  # emails per SMTP connection
+EMAIL_OUTBOX_POLL_INTERVAL = int(os.getenv('EMAIL_OUTBOX_POLL_INTERVAL', 5))  # seconds between polls when idle
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv('EMAIL_OUTBOX_MAX_ATTEMPTS', 5))
+EMAIL_OUTBOX_RETRY_BACKOFF = int(os.getenv('EMAIL_OUTBOX_RETRY_BACKOFF', 30))  # seconds, doubled per attempt
+EMAIL_OUTBOX_RETRY_BACKOFF_MAX = int(os.getenv('EMAIL_OUTBOX_RETRY_BACKOFF_MAX', 3600))
+EMAIL_OUTBOX_LEASE = int(os.getenv('EMAIL_OUTBOX_LEASE', 300))  # seconds a claimed email is hidden from other workers
+
 # Print all email settings for debugging
 print("EMAIL_BACKEND:", EMAIL_BACKEND)
 
@@ -27,7 +35,103 @@ SIMPLE_JWT = {
     "BLACKLIST_AFTER_ROTATION": True,
     "SIGNING_KEY": os.getenv("SECRET_KEY"),
     "AUTH_HEADER_TYPES": ("Bearer",),
+    "TOKEN_USER_CLASS": "users.authentication.ClaimsUser",
+}
+# Seconds a process trusts its cached active/password state of a token user (0 = look it up every request)
+JWT_REVOCATION_CACHE_TTL = int(os.getenv('JWT_REVOCATION_CACHE_TTL', 30))
+
+# Password hashing (users/hashers.py): new hashes use PASSWORD_HASHER ('pbkdf2', or 'argon2' / 'bcrypt' with
+# argon2-cffi / bcrypt installed); older hashes still verify and are upgraded on the next login.
+_PASSWORD_HASHERS = {
+    'pbkdf2': 'users.hashers.PBKDF2PasswordHasher',
+    'argon2': 'users.hashers.Argon2PasswordHasher',
+    'bcrypt': 'users.hashers.BCryptSHA256PasswordHasher',
+}
+PASSWORD_HASHER = os.getenv('PASSWORD_HASHER', 'pbkdf2')
+PASSWORD_HASHERS = [_PASSWORD_HASHERS[PASSWORD_HASHER]] + [
+    path for name, path in _PASSWORD_HASHERS.items() if name != PASSWORD_HASHER]
+PASSWORD_PBKDF2_ITERATIONS = int(os.getenv('PASSWORD_PBKDF2_ITERATIONS', 1000000))
+PASSWORD_ARGON2_TIME_COST = int(os.getenv('PASSWORD_ARGON2_TIME_COST', 2))
+PASSWORD_ARGON2_MEMORY_COST = int(os.getenv('PASSWORD_ARGON2_MEMORY_COST', 102400))  # KiB
+PASSWORD_ARGON2_PARALLELISM = int(os.getenv('PASSWORD_ARGON2_PARALLELISM', 8))
+PASSWORD_BCRYPT_ROUNDS = int(os.getenv('PASSWORD_BCRYPT_ROUNDS', 12))
+# Hashes run in a per-process thread pool; requests beyond WORKERS running + QUEUE waiting get a 503
+PASSWORD_HASHING_WORKERS = int(os.getenv('PASSWORD_HASHING_WORKERS', os.cpu_count() or 1))
+PASSWORD_HASHING_QUEUE = int(os.getenv('PASSWORD_HASHING_QUEUE', 16))
+
+# Background quote refresher (python manage.py refresh_quotes)
+QUOTE_REFRESH_INTERVAL = int(os.getenv('QUOTE_REFRESH_INTERVAL', 60))  # seconds between cycles
+
+# Prometheus metrics at /metrics; set PROMETHEUS_MULTIPROC_DIR when running several workers
+PROMETHEUS_METRICS = os.getenv('PROMETHEUS_METRICS', 'True') == 'True'
+
+# Stock autocomplete: 'memory' (in-process prefix index) or 'database' (pg_trgm / LIKE queries)
+STOCK_SEARCH_BACKEND = os.getenv('STOCK_SEARCH_BACKEND', 'memory')
+STOCK_SEARCH_VERSION_CHECK_INTERVAL = float(os.getenv('STOCK_SEARCH_VERSION_CHECK_INTERVAL', 1))  # seconds
+
+# Cache-Control max-age of conditional GET responses (stock/portfolio/comment); 0 = revalidate every time
+HTTP_CACHE_MAX_AGE = int(os.getenv('HTTP_CACHE_MAX_AGE', 0))
+
+# Server-side response cache for the stock/portfolio/comment read endpoints (tradez/response_cache.py).
+# 'locmem' is per process (LRU past MAX_ENTRIES); use 'file' or 'redis' to share entries between workers.
+RESPONSE_CACHE_ENABLED = os.getenv('RESPONSE_CACHE_ENABLED', 'True') == 'True'
+RESPONSE_CACHE_TIMEOUT = int(os.getenv('RESPONSE_CACHE_TIMEOUT', 300))  # seconds an entry may live
+_RESPONSE_CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'redis': 'django.core.cache.backends.redis.RedisCache',
 }
+RESPONSE_CACHE_BACKEND = os.getenv('RESPONSE_CACHE_BACKEND', 'locmem')
+CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'responses': {
+        'BACKEND': _RESPONSE_CACHE_BACKENDS[RESPONSE_CACHE_BACKEND],
+        # locmem: instance name; file: directory; redis: redis://host:port/db
+        'LOCATION': os.getenv('RESPONSE_CACHE_LOCATION', 'tradez-responses'),
+        'TIMEOUT': RESPONSE_CACHE_TIMEOUT,
+        # Redis evicts by its own maxmemory-policy (use allkeys-lru)
+        'OPTIONS': {} if RESPONSE_CACHE_BACKEND == 'redis' else {
+            'MAX_ENTRIES': int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', 10000)),
+        },
+    },
+}
+
+# Token-bucket throttles (tradez/throttling.py): 'N/period' budgets (s, min, hour, day) allowing bursts of N.
+# The 'cache' store keeps buckets in CACHES['throttle']; make that 'redis' to share them between workers.
+THROTTLE_ENABLED = os.getenv('THROTTLE_ENABLED', 'True') == 'True'
+THROTTLE_STORE = os.getenv('THROTTLE_STORE', 'cache')  # or 'local' (per process)
+THROTTLE_CACHE_ALIAS = 'throttle'
+THROTTLE_RATES = {
+    'route': os.getenv('THROTTLE_RATE_ROUTE', '120/min'),  # per user (or IP) and route
+    'password_hashing': os.getenv('THROTTLE_RATE_PASSWORD_HASHING', '10/min'),  # register, login, reset confirm
+    'password_reset': os.getenv('THROTTLE_RATE_PASSWORD_RESET', '5/hour'),  # reset emails
+    'fmp_quotes': os.getenv('THROTTLE_RATE_FMP_QUOTES', '60/min'),  # live quote and valuation endpoints
+}
+THROTTLE_CACHE_BACKEND = os.getenv('THROTTLE_CACHE_BACKEND', 'locmem')
+CACHES['throttle'] = {
+    'BACKEND': _RESPONSE_CACHE_BACKENDS[THROTTLE_CACHE_BACKEND],
+    'LOCATION': os.getenv('THROTTLE_CACHE_LOCATION', 'tradez-throttle'),
+}
+
+# Most symbols one GET /api/quotes/?symbols= request may ask for (it costs one fmp_quotes token)
+QUOTE_MAX_SYMBOLS = int(os.getenv('QUOTE_MAX_SYMBOLS', 100))
+
+# Price push over SSE (GET /api/quotes/stream/, needs an ASGI server)
+PRICE_STREAM_POLL_INTERVAL = float(os.getenv('PRICE_STREAM_POLL_INTERVAL', 1))  # seconds between shared DB polls
+PRICE_STREAM_HEARTBEAT = float(os.getenv('PRICE_STREAM_HEARTBEAT', 15))  # seconds between keepalive comments
+PRICE_STREAM_MAX_SYMBOLS = int(os.getenv('PRICE_STREAM_MAX_SYMBOLS', 50))  # per connection
+PRICE_STREAM_RETRY_MS = int(os.getenv('PRICE_STREAM_RETRY_MS', 3000))  # client reconnect delay
+
+# Response cache lifetime of pages read from a replica (bounds serving replication lag from cache)
+DB_REPLICA_CACHE_TIMEOUT = int(os.getenv('DB_REPLICA_CACHE_TIMEOUT', 5))
+
+# Largest array accepted by the */bulk/ endpoints
+BULK_MAX_ITEMS = int(os.getenv('BULK_MAX_ITEMS', 50000))
+
+# Per-route request profiling (GET /api/profiling/, python manage.py profile_report)
+REQUEST_PROFILING = os.getenv('REQUEST_PROFILING', 'False') == 'True'
+REQUEST_PROFILING_DIR = os.getenv('REQUEST_PROFILING_DIR', '/tmp/tradez-profiling')  # per-process dumps
+REQUEST_PROFILING_FLUSH_INTERVAL = int(os.getenv('REQUEST_PROFILING_FLUSH_INTERVAL', 10))  # seconds
 
 FRONTEND_URL_LOCAL="http://localhost:5173"
 FRONTEND_URL="https://tradez.com"
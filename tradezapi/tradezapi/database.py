@@ -0,0 +1,140 @@
+import copy
+import os
+import random
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+# Environment-driven DATABASES, persistent/pooled connections and read-replica routing.
+#
+#   DB_ENGINE            postgresql (default) or sqlite (DB_NAME is then the file path)
+#   DB_NAME / DB_USER / DB_PASSWORD / DB_HOST / DB_PORT
+#   DB_CONN_MAX_AGE      seconds a connection is reused across requests (0 = per request)
+#   DB_CONN_HEALTH_CHECKS  check a reused connection before the request uses it
+#   DB_POOL              True: psycopg 3 connection pool instead of persistent connections
+#   DB_POOL_MIN_SIZE / DB_POOL_MAX_SIZE / DB_POOL_TIMEOUT / DB_POOL_MAX_IDLE / DB_POOL_MAX_LIFETIME
+#   DB_REPLICA_HOST      adds a "replica" alias (other DB_REPLICA_* default to the primary's);
+#                        GET requests to views with `read_replica = True` read from it
+#
+# Under ASGI prefer DB_POOL: persistent connections are per thread and are not reused well.
+
+_replica_reads = ContextVar('replica_reads', default=False)
+
+
+def _bool(value):
+    return str(value).lower() in ('1', 'true', 'yes')
+
+
+def check_connection(conn):
+    """Pool health check run before a pooled connection is handed out."""
+    conn.execute('SELECT 1')
+
+
+def database_config(env=os.environ, base_dir=None):
+    """DATABASES for the given environment."""
+    if env.get('DB_ENGINE', 'postgresql') == 'sqlite':
+        name = env.get('DB_NAME') or str(base_dir / 'db.sqlite3')
+        return {'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': name}}
+    default = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': env.get('DB_NAME', 'tradez'),
+        'USER': env.get('DB_USER', 'postgres'),
+        'PASSWORD': env.get('DB_PASSWORD', 'root'),
+        'HOST': env.get('DB_HOST', 'localhost'),
+        'PORT': env.get('DB_PORT', '5432'),
+        'CONN_MAX_AGE': int(env.get('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': _bool(env.get('DB_CONN_HEALTH_CHECKS', 'True')),
+        'OPTIONS': {},
+    }
+    if _bool(env.get('DB_POOL', 'False')):
+        # Django's pool (psycopg 3) replaces persistent connections; it refuses CONN_MAX_AGE > 0
+        default['CONN_MAX_AGE'] = 0
+        default['OPTIONS']['pool'] = {
+            'min_size': int(env.get('DB_POOL_MIN_SIZE', 2)),
+            'max_size': int(env.get('DB_POOL_MAX_SIZE', 10)),
+            'timeout': float(env.get('DB_POOL_TIMEOUT', 10)),  # seconds to wait for a free connection
+            'max_idle': float(env.get('DB_POOL_MAX_IDLE', 600)),
+            'max_lifetime': float(env.get('DB_POOL_MAX_LIFETIME', 3600)),
+            'check': check_connection,
+        }
+    databases = {'default': default}
+    if env.get('DB_REPLICA_HOST'):
+        databases['replica'] = {
+            **default,
+            'OPTIONS': copy.deepcopy(default['OPTIONS']),  # its own pool
+            'NAME': env.get('DB_REPLICA_NAME', default['NAME']),
+            'USER': env.get('DB_REPLICA_USER', default['USER']),
+            'PASSWORD': env.get('DB_REPLICA_PASSWORD', default['PASSWORD']),
+            'HOST': env['DB_REPLICA_HOST'],
+            'PORT': env.get('DB_REPLICA_PORT', default['PORT']),
+            # Tests read the primary through this alias instead of a second database
+            'TEST': {'MIRROR': 'default'},
+        }
+    return databases
+
+
+def reading_from_replica():
+    """True while a replica-routed request is being served."""
+    return _replica_reads.get()
+
+
+class ReadReplicaRouter:
+    """Reads go to a replica only inside replica-routed requests; writes and migrations to default."""
+    def __init__(self, replicas=None):
+        self.replicas = replicas if replicas is not None else [alias for alias in settings.DATABASES if alias != 'default']
+
+    def db_for_read(self, model, **hints):
+        if self.replicas and _replica_reads.get():
+            return random.choice(self.replicas)
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True  # every alias holds the same data
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
+
+
+class ReadReplicaMiddleware:
+    """
+    Route the reads of GET/HEAD requests to replicas for views that opt in with
+    `read_replica = True` (the list views, which tolerate a little replication lag).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        request.read_replica = False
+        try:
+            return self.get_response(request)
+        finally:
+            self._finish(request)
+
+    async def __acall__(self, request):
+        request.read_replica = False
+        try:
+            return await self.get_response(request)
+        finally:
+            self._finish(request)
+
+    def _finish(self, request):
+        # Runs before a streaming body is read: streaming exports pick their alias up front
+        if request.read_replica:
+            # set(), not reset(token): under ASGI process_view may run in a copied context
+            _replica_reads.set(False)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, 'view_class', None)
+        if request.method in ('GET', 'HEAD') and getattr(view_class, 'read_replica', False):
+            request.read_replica = True
+            _replica_reads.set(True)
@@ -13,6 +13,7 @@ import os
 from pathlib import Path
 from dotenv import load_dotenv
 from .base import *
+from .database import database_config
 
 # Load environment variables from .env file
 load_dotenv()
@@ -42,15 +43,20 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',  # trigram lookups for the database stock search
     # Third-party apps
     'rest_framework',
     'rest_framework_simplejwt',  # Added simplejwt
+    'rest_framework_simplejwt.token_blacklist',  # rotated refresh tokens are blacklisted
     'corsheaders',
     # Local apps
     'users',
     'tradez'
 ]
 MIDDLEWARE = [
+    'tradez.metrics.PrometheusMiddleware',
+    'tradez.profiling.RequestProfilingMiddleware',
+    'tradezapi.database.ReadReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -81,17 +87,9 @@ TEMPLATES = [
 WSGI_APPLICATION = 'tradezapi.wsgi.application'
 
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.postgresql',
-        'NAME': 'tradez',
-        'USER': 'postgres',
-        'PASSWORD': 'root',
-        'HOST': 'localhost',
-        'PORT': '5432',
-    }
-}
-
+# Environment-driven (DB_* variables), see tradezapi/database.py
+DATABASES = database_config(os.environ, BASE_DIR)
+DATABASE_ROUTERS = ['tradezapi.database.ReadReplicaRouter']
 
 
 # Password validation
@@ -142,7 +140,8 @@ AUTH_USER_MODEL = 'users.User'
 # Django REST Framework and SimpleJWT configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # Reads use the token's claims, writes load the user (users/authentication.py)
+        'users.authentication.JWTClaimsAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -153,6 +152,8 @@ REST_FRAMEWORK = {
     'DEFAULT_PARSER_CLASSES': (
         'rest_framework.parsers.JSONParser',
     ),
+    # The API only parses JSON, so the test client sends JSON too
+    'TEST_REQUEST_DEFAULT_FORMAT': 'json',
 }
 
 # CORS settings
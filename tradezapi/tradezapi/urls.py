@@ -20,6 +20,7 @@ from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
 )
+from tradez.metrics import metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -27,4 +28,6 @@ urlpatterns = [
     path('api/auth/', include('users.urls')),
     # Main API endpoints
     path('api/', include('tradez.urls')),
+    # Prometheus scrape endpoint
+    path('metrics', metrics_view, name='metrics'),
 ]
@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class UsersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'users'
+
+    def ready(self):
+        # Drop the cached revocation state of token users when their row changes
+        from django.db.models.signals import post_delete, post_save
+        from .authentication import _user_changed
+        from .models import User
+        post_save.connect(_user_changed, sender=User, dispatch_uid='token_user_state_save')
+        post_delete.connect(_user_changed, sender=User, dispatch_uid='token_user_state_delete')
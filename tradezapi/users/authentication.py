@@ -0,0 +1,99 @@
+import time
+from functools import cached_property
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils.translation import gettext_lazy as _
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication, JWTStatelessUserAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+# Stateless JWT authentication for reads.
+#
+# JWTAuthentication loads the User row on every request. Access tokens already carry
+# the user id, username, email and email_verified claims (CustomTokenObtainPairSerializer),
+# so GET/HEAD/OPTIONS requests get a ClaimsUser built from them instead. The row is
+# still needed to check that the user exists, is active and (with CHECK_REVOKE_TOKEN)
+# has the password the token was issued for. Those answers are kept per process for
+# JWT_REVOCATION_CACHE_TTL seconds and dropped when the user is saved or deleted here;
+# other processes see such a change within the TTL. Writes keep loading the User row.
+#
+# Refresh tokens are unaffected: rotation and the blacklist are checked on the refresh
+# endpoint, against the database.
+
+_states = {}  # user id -> (monotonic expiry, (is_active, password hash digest) or None)
+MAX_STATES = 10000
+
+
+class ClaimsUser(TokenUser):
+    """The authenticated user as described by the access token's claims."""
+    @cached_property
+    def id(self):
+        # The claim is a string; ORM lookups and comparisons want the primary key's type
+        return get_user_model()._meta.pk.to_python(self.token[api_settings.USER_ID_CLAIM])
+
+    @cached_property
+    def pk(self):
+        return self.id
+
+    @cached_property
+    def email(self):
+        return self.token.get('email', '')
+
+    @cached_property
+    def email_verified(self):
+        return self.token.get('email_verified', False)
+
+
+def revocation_state(user_id):
+    """(is_active, password digest) of user `user_id`, or None if it is gone; cached for the TTL."""
+    now = time.monotonic()
+    user_id = str(user_id)
+    entry = _states.get(user_id)
+    if entry is not None and entry[0] > now:
+        return entry[1]
+    row = (get_user_model().objects.filter(**{api_settings.USER_ID_FIELD: user_id})
+           .values_list('is_active', 'password').first())
+    state = None if row is None else (row[0], get_md5_hash_password(row[1]))
+    if settings.JWT_REVOCATION_CACHE_TTL:
+        if len(_states) >= MAX_STATES:
+            _states.clear()
+        _states[user_id] = (now + settings.JWT_REVOCATION_CACHE_TTL, state)
+    return state
+
+
+def reset_revocation_states():
+    _states.clear()
+
+
+def _user_changed(sender, instance, **kwargs):
+    _states.pop(str(getattr(instance, api_settings.USER_ID_FIELD)), None)
+
+
+class JWTClaimsAuthentication(JWTStatelessUserAuthentication):
+    """
+    JWTAuthentication that authenticates safe-method requests as a ClaimsUser, with the
+    same user checks as JWTAuthentication answered from the revocation state cache.
+    """
+    def authenticate(self, request):
+        if request.method not in SAFE_METHODS:
+            return JWTAuthentication().authenticate(request)
+        return super().authenticate(request)
+
+    def get_user(self, validated_token):
+        user = super().get_user(validated_token)
+        try:
+            state = revocation_state(validated_token[api_settings.USER_ID_CLAIM])
+        except (TypeError, ValueError) as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+        if state is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        is_active, password_digest = state
+        if api_settings.CHECK_USER_IS_ACTIVE and not is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if (api_settings.CHECK_REVOKE_TOKEN
+                and validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != password_digest):
+            raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+        return user
@@ -0,0 +1,131 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.contrib.auth import hashers
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from tradez.metrics import PASSWORD_HASH_DURATION, PASSWORD_HASH_REJECTIONS
+
+# Password hashing off the request threads.
+#
+# Every hash (make_password for create_user / set_password, check_password for logins,
+# and the dummy hash ModelBackend runs for unknown usernames) goes through the hashers
+# below, which hand the work to one bounded thread pool per process. PBKDF2 (hashlib),
+# argon2-cffi and bcrypt release the GIL while hashing, so the pool runs
+# PASSWORD_HASHING_WORKERS hashes in parallel. No more than PASSWORD_HASHING_QUEUE others
+# wait; past that a request fails at once with 503 and Retry-After instead of queueing
+# behind a login storm. Only the hash itself runs in the pool, so database work stays on
+# the request's own connection.
+#
+# Costs come from settings, and Django rehashes a password on the next successful login
+# when its algorithm or cost differs from the first entry of PASSWORD_HASHERS.
+
+
+class PasswordHashingBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Too many password checks in progress, try again shortly.'
+    default_code = 'password_hashing_busy'
+    wait = 1  # seconds, sent as Retry-After
+
+
+_worker = threading.local()
+
+
+def _mark_worker():
+    _worker.active = True
+
+
+class HashingPool:
+    """Thread pool that refuses work beyond `workers` running and `queue` waiting hashes."""
+    def __init__(self, workers, queue):
+        self.workers = workers
+        self.queue = queue
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix='password-hashing', initializer=_mark_worker)
+        self._slots = threading.BoundedSemaphore(workers + queue)
+
+    def run(self, operation, func, *args):
+        if getattr(_worker, 'active', False):
+            # Already on a pool thread: PBKDF2 and bcrypt verify() call encode()
+            return func(*args)
+        if not self._slots.acquire(blocking=False):
+            PASSWORD_HASH_REJECTIONS.inc()
+            raise PasswordHashingBusy()
+        started = time.perf_counter()
+
+        def task():
+            try:
+                return func(*args)
+            finally:
+                self._slots.release()
+        try:
+            future = self._executor.submit(task)
+        except BaseException:
+            self._slots.release()
+            raise
+        try:
+            return future.result()
+        finally:
+            PASSWORD_HASH_DURATION.labels(operation).observe(time.perf_counter() - started)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """The process's HashingPool, (re)built when the pool settings change."""
+    global _pool
+    workers, queue = settings.PASSWORD_HASHING_WORKERS, settings.PASSWORD_HASHING_QUEUE
+    if _pool is None or (_pool.workers, _pool.queue) != (workers, queue):
+        with _pool_lock:
+            if _pool is None or (_pool.workers, _pool.queue) != (workers, queue):
+                if _pool is not None:
+                    _pool.shutdown()
+                _pool = HashingPool(workers, queue)
+    return _pool
+
+
+class PooledHasherMixin:
+    """Run a Django hasher's encode, verify and harden_runtime in the hashing pool."""
+    def encode(self, password, salt, *args):
+        return get_pool().run('encode', super().encode, password, salt, *args)
+
+    def verify(self, password, encoded):
+        return get_pool().run('verify', super().verify, password, encoded)
+
+    def harden_runtime(self, password, encoded):
+        return get_pool().run('verify', super().harden_runtime, password, encoded)
+
+
+class PBKDF2PasswordHasher(PooledHasherMixin, hashers.PBKDF2PasswordHasher):
+    @property
+    def iterations(self):
+        return settings.PASSWORD_PBKDF2_ITERATIONS
+
+
+class Argon2PasswordHasher(PooledHasherMixin, hashers.Argon2PasswordHasher):
+    """Needs argon2-cffi."""
+    @property
+    def time_cost(self):
+        return settings.PASSWORD_ARGON2_TIME_COST
+
+    @property
+    def memory_cost(self):
+        return settings.PASSWORD_ARGON2_MEMORY_COST
+
+    @property
+    def parallelism(self):
+        return settings.PASSWORD_ARGON2_PARALLELISM
+
+
+class BCryptSHA256PasswordHasher(PooledHasherMixin, hashers.BCryptSHA256PasswordHasher):
+    """Needs bcrypt."""
+    @property
+    def rounds(self):
+        return settings.PASSWORD_BCRYPT_ROUNDS
+
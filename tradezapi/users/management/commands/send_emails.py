@@ -0,0 +1,38 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from users.outbox import process_outbox, pending_count
+
+
+class Command(BaseCommand):
+    help = "Deliver queued emails from the outbox, reusing one SMTP connection per batch."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Drain the currently due emails and exit (for cron).')
+        parser.add_argument('--interval', type=int, default=None,
+                            help='Seconds to wait when the outbox is idle (defaults to settings.EMAIL_OUTBOX_POLL_INTERVAL).')
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Emails sent per SMTP connection (defaults to settings.EMAIL_OUTBOX_BATCH_SIZE).')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Batches sent in parallel threads, each over its own connection.')
+
+    def handle(self, *args, **options):
+        interval = options['interval'] or settings.EMAIL_OUTBOX_POLL_INTERVAL
+        while True:
+            try:
+                result = process_outbox(options['batch_size'], options['workers'])
+            except Exception as e:
+                # Keep the worker alive through transient DB outages
+                if options['once']:
+                    raise
+                self.stderr.write(f"Outbox processing failed: {e}")
+                result = None
+            if result and any(result.values()):
+                self.stdout.write(
+                    f"Sent {result['sent']}, retrying {result['retrying']}, failed {result['failed']}; "
+                    f"{pending_count()} pending"
+                )
+                continue  # more may be due right away
+            if options['once']:
+                return
+            time.sleep(interval)
@@ -12,3 +12,30 @@ class User(AbstractUser):
     def __str__(self):
         return self.username
 
+
+
+# Outgoing mail is written here by the API and delivered by `python manage.py send_emails`
+class OutgoingEmail(models.Model):
+    PENDING = 'pending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(PENDING, 'Pending'), (SENT, 'Sent'), (FAILED, 'Failed')]
+
+    kind = models.CharField(max_length=50, help_text='What the email is for, e.g. verification or password_reset')
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=255)
+    to = models.JSONField(help_text='List of recipient addresses')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(help_text='Earliest time the worker may (re)try delivery')
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = "email_outbox"
+        indexes = [models.Index(fields=['status', 'next_attempt_at'], name='email_outbox_due_idx')]
+
+    def __str__(self):
+        return f"{self.kind} to {', '.join(self.to)} ({self.status})"
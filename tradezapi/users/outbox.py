@@ -0,0 +1,122 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+from tradez.metrics import EMAILS_SENT, EMAIL_QUEUE_DEPTH
+from .models import OutgoingEmail
+
+# Email outbox: request handlers only insert a row (enqueue_email); the send_emails
+# worker claims due rows in batches and delivers each batch over one SMTP connection.
+# Failed deliveries are retried with exponential backoff until EMAIL_OUTBOX_MAX_ATTEMPTS.
+
+logger = logging.getLogger('django')
+
+
+def enqueue_email(kind, subject, message, from_email, recipient_list):
+    """Queue an email for the worker; returns the OutgoingEmail row."""
+    return OutgoingEmail.objects.create(
+        kind=kind, subject=subject, body=message, from_email=from_email,
+        to=list(recipient_list), next_attempt_at=timezone.now(),
+    )
+
+
+def retry_delay(attempts):
+    """Seconds to wait before retry number `attempts` (1-based): base * 2^(n-1), capped."""
+    return min(settings.EMAIL_OUTBOX_RETRY_BACKOFF_MAX, settings.EMAIL_OUTBOX_RETRY_BACKOFF * 2 ** (attempts - 1))
+
+
+def claim_batch(limit):
+    """
+    Lease up to `limit` due emails to this worker by pushing their next_attempt_at past
+    the lease period. Rows locked by another worker are skipped (Postgres); if this worker
+    dies mid-batch, the rows become due again once the lease runs out.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        emails = list(
+            OutgoingEmail.objects.select_for_update(skip_locked=True)
+            .filter(status=OutgoingEmail.PENDING, next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')[:limit]
+        )
+        OutgoingEmail.objects.filter(id__in=[e.id for e in emails]).update(
+            next_attempt_at=now + timedelta(seconds=settings.EMAIL_OUTBOX_LEASE))
+    return emails
+
+
+def send_batch(emails):
+    """
+    Send `emails` over a single backend connection.
+    Returns [(email, error or None)]; nothing is written to the database here.
+    """
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as e:
+        return [(email, f"Could not connect: {e}") for email in emails]
+    results = []
+    try:
+        for email in emails:
+            message = EmailMessage(email.subject, email.body, email.from_email, email.to, connection=connection)
+            try:
+                message.send(fail_silently=False)
+                results.append((email, None))
+            except Exception as e:
+                results.append((email, str(e) or type(e).__name__))
+    finally:
+        connection.close()
+    return results
+
+
+def record_results(results):
+    """Mark sent emails, reschedule failed ones with backoff (or give up), in one bulk_update."""
+    now = timezone.now()
+    for email, error in results:
+        email.attempts += 1
+        if error is None:
+            email.status = OutgoingEmail.SENT
+            email.sent_at = now
+            email.last_error = ''
+            EMAILS_SENT.labels(email.kind, 'sent').inc()
+        elif email.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+            email.status = OutgoingEmail.FAILED
+            email.last_error = error
+            EMAILS_SENT.labels(email.kind, 'failed').inc()
+            logger.error(f"[Outbox] Giving up on email {email.id} to {email.to} after {email.attempts} attempts: {error}")
+        else:
+            email.next_attempt_at = now + timedelta(seconds=retry_delay(email.attempts))
+            email.last_error = error
+            EMAILS_SENT.labels(email.kind, 'retry').inc()
+    OutgoingEmail.objects.bulk_update(
+        [email for email, _ in results],
+        ['status', 'attempts', 'next_attempt_at', 'last_error', 'sent_at'],
+    )
+
+
+def process_outbox(batch_size=None, workers=1):
+    """
+    Claim one round of due emails and deliver them. With `workers` > 1 the claimed rows
+    are split into that many batches sent in parallel threads, each over its own SMTP
+    connection. Returns {'sent': n, 'retrying': n, 'failed': n}.
+    """
+    batch_size = batch_size or settings.EMAIL_OUTBOX_BATCH_SIZE
+    emails = claim_batch(batch_size * workers)
+    if workers > 1 and len(emails) > batch_size:
+        batches = [emails[i::workers] for i in range(workers)]
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = [result for batch in pool.map(send_batch, batches) for result in batch]
+    else:
+        results = send_batch(emails) if emails else []
+    record_results(results)
+    EMAIL_QUEUE_DEPTH.set(pending_count())
+    return {
+        'sent': sum(1 for email, error in results if error is None),
+        'retrying': sum(1 for email, error in results if error is not None and email.status == OutgoingEmail.PENDING),
+        'failed': sum(1 for email, error in results if email.status == OutgoingEmail.FAILED),
+    }
+
+
+def pending_count():
+    return OutgoingEmail.objects.filter(status=OutgoingEmail.PENDING).count()
@@ -8,6 +8,13 @@ from django.utils.http import urlsafe_base64_encode
 from django.utils.encoding import force_bytes
 from django.contrib.auth.tokens import default_token_generator
 from unittest import mock
+from datetime import timedelta
+from io import StringIO
+from smtplib import SMTPException
+from django.core.management import call_command
+from django.utils import timezone
+from .models import OutgoingEmail
+from .outbox import enqueue_email, process_outbox
 
 User = get_user_model()
 
@@ -15,22 +22,73 @@ User = get_user_model()
 def api_client():
     return APIClient()
 
+@pytest.fixture(autouse=True)
+def reset_throttles(settings):
+    from tradez.throttling import local_store
+    settings.THROTTLE_STORE = 'local'
+    local_store.reset()
+
 @pytest.mark.django_db
 def test_registration_sends_verification_email(api_client):
     """
-    Test that registration creates a user and sends a verification email.
-    Email sending is mocked to avoid real emails.
+    Test that registration creates a user and queues a verification email,
+    which the outbox worker then delivers (locmem backend, no real emails).
     """
-    with mock.patch('django.core.mail.send_mail') as mock_send_mail:
-        data = {'username': 'newuser', 'email': 'newuser@example.com', 'password': 'newpass123'}
+    data = {'username': 'newuser', 'email': 'newuser@example.com', 'password': 'newpass123'}
+    resp = api_client.post('/api/auth/register/', data)
+    assert resp.status_code == status.HTTP_201_CREATED
+    assert User.objects.filter(username='newuser').exists()
+    # Nothing is sent inline; the email waits in the outbox
+    assert len(mail.outbox) == 0
+    queued = OutgoingEmail.objects.get()
+    assert queued.kind == 'verification' and queued.to == ['newuser@example.com']
+    assert process_outbox() == {'sent': 1, 'retrying': 0, 'failed': 0}
+    assert len(mail.outbox) == 1 and 'verify-email' in mail.outbox[0].body
+    queued.refresh_from_db()
+    assert queued.status == OutgoingEmail.SENT and queued.attempts == 1
+    # The user should not be verified yet
+    user = User.objects.get(username='newuser')
+    assert user.email_verified is False
+
+@pytest.mark.django_db
+def test_registration_rolls_back_when_email_cannot_be_queued(api_client):
+    data = {'username': 'newuser', 'email': 'newuser@example.com', 'password': 'newpass123'}
+    with mock.patch('users.views.enqueue_email', side_effect=RuntimeError('outbox unavailable')):
         resp = api_client.post('/api/auth/register/', data)
-        assert resp.status_code == status.HTTP_201_CREATED
-        assert User.objects.filter(username='newuser').exists()
-        # Check that send_mail was called
-        assert mock_send_mail.called
-        # The user should not be verified yet
-        user = User.objects.get(username='newuser')
-        assert user.email_verified is False
+    assert resp.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
+    assert not User.objects.filter(username='newuser').exists()
+    assert not OutgoingEmail.objects.exists()
+    # Registering again works: nothing was left behind
+    assert api_client.post('/api/auth/register/', data).status_code == status.HTTP_201_CREATED
+
+@pytest.mark.django_db
+def test_outbox_retries_with_backoff_then_gives_up(api_client, settings):
+    settings.EMAIL_OUTBOX_MAX_ATTEMPTS = 2
+    User.objects.create_user(username='resetme', email='resetme@example.com', password='pass123')
+    resp = api_client.post('/api/auth/reset-password/', {'email': 'resetme@example.com'})
+    assert resp.status_code == status.HTTP_200_OK
+    queued = OutgoingEmail.objects.get(kind='password_reset')
+    with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=SMTPException('down')):
+        assert process_outbox() == {'sent': 0, 'retrying': 1, 'failed': 0}
+        queued.refresh_from_db()
+        assert queued.status == OutgoingEmail.PENDING and queued.last_error == 'down'
+        assert queued.next_attempt_at > timezone.now() + timedelta(seconds=settings.EMAIL_OUTBOX_RETRY_BACKOFF - 5)
+        # Not due yet, so the next round leaves it alone
+        assert process_outbox() == {'sent': 0, 'retrying': 0, 'failed': 0}
+        OutgoingEmail.objects.update(next_attempt_at=timezone.now())
+        assert process_outbox() == {'sent': 0, 'retrying': 0, 'failed': 1}
+    queued.refresh_from_db()
+    assert queued.status == OutgoingEmail.FAILED and queued.attempts == 2 and len(mail.outbox) == 0
+
+@pytest.mark.django_db
+def test_outbox_worker_batches_over_one_connection_per_thread():
+    for i in range(7):
+        enqueue_email('verification', 's', 'b', 'no-reply@example.com', [f'u{i}@example.com'])
+    with mock.patch('django.core.mail.backends.locmem.EmailBackend.open', autospec=True) as opened:
+        assert process_outbox(batch_size=3, workers=2) == {'sent': 6, 'retrying': 0, 'failed': 0}
+    assert opened.call_count == 2
+    call_command('send_emails', '--once', stdout=StringIO())
+    assert len(mail.outbox) == 7 and OutgoingEmail.objects.filter(status=OutgoingEmail.SENT).count() == 7
 
 @pytest.mark.django_db
 def test_email_verification_flow(api_client):
@@ -62,6 +120,52 @@ def test_jwt_token_obtain_and_refresh(api_client):
     assert resp2.status_code == status.HTTP_200_OK
     assert 'access' in resp2.data
 
+@pytest.mark.django_db
+def test_reads_authenticate_from_token_claims(api_client):
+    """
+    Reads get a user built from the access token's claims, with the user's active and
+    password state cached; writes load the user row. Rotated refresh tokens are blacklisted.
+    """
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from .authentication import ClaimsUser, reset_revocation_states
+    user = User.objects.create_user(username='claims', password='claimspass1', email='claims@example.com', email_verified=True)
+    tokens = api_client.post(reverse('token_obtain_pair'), {'username': 'claims', 'password': 'claimspass1'}).data
+    api_client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")
+    resp = api_client.get('/api/stocks/')
+    request_user = resp.wsgi_request.user
+    assert isinstance(request_user, ClaimsUser)
+    assert (request_user.pk, request_user.username, request_user.email, request_user.email_verified) == (
+        user.pk, 'claims', 'claims@example.com', True)
+    resp = api_client.patch(reverse('profile_update'), {'first_name': 'Claire'})
+    assert resp.status_code == status.HTTP_200_OK and resp.wsgi_request.user.first_name == 'Claire'
+    api_client.get('/api/stocks/')  # the save dropped the cached state; look it up again
+    with CaptureQueriesContext(connection) as ctx:
+        assert api_client.get('/api/stocks/?page_size=5').status_code == status.HTTP_200_OK
+    assert not [q for q in ctx.captured_queries if '"users"' in q['sql']]
+
+    # Deactivation is seen at once in this process (signal), elsewhere within the TTL
+    User.objects.filter(pk=user.pk).update(is_active=False)
+    assert api_client.get('/api/stocks/').status_code == status.HTTP_200_OK
+    reset_revocation_states()
+    assert api_client.get('/api/stocks/').status_code == status.HTTP_401_UNAUTHORIZED
+    user.refresh_from_db()
+    user.is_active = True
+    user.save()
+    assert api_client.get('/api/stocks/').status_code == status.HTTP_200_OK
+    user.delete()
+    assert api_client.get('/api/stocks/').status_code == status.HTTP_401_UNAUTHORIZED
+
+@pytest.mark.django_db
+def test_refresh_tokens_rotate_and_blacklist(api_client):
+    User.objects.create_user(username='rotate', password='rotatepass1', email_verified=True)
+    refresh = api_client.post(reverse('token_obtain_pair'), {'username': 'rotate', 'password': 'rotatepass1'}).data['refresh']
+    resp = api_client.post(reverse('token_refresh'), {'refresh': refresh})
+    assert resp.status_code == status.HTTP_200_OK and resp.data['refresh'] != refresh
+    # The rotated-out token is blacklisted
+    assert api_client.post(reverse('token_refresh'), {'refresh': refresh}).status_code == status.HTTP_401_UNAUTHORIZED
+    assert api_client.post(reverse('token_refresh'), {'refresh': resp.data['refresh']}).status_code == status.HTTP_200_OK
+
 @pytest.mark.django_db
 def test_user_profile_protected(api_client):
     """
@@ -79,3 +183,64 @@ def test_user_profile_protected(api_client):
     # Should be allowed now (even if empty list)
     assert resp2.status_code == status.HTTP_200_OK
 
+@pytest.mark.django_db
+def test_password_hashing_endpoints_are_throttled(api_client, settings):
+    settings.THROTTLE_RATES = {**settings.THROTTLE_RATES, 'password_hashing': '3/min', 'password_reset': '1/hour'}
+    User.objects.create_user(username='hasher', password='pass12345', email='hasher@example.com')
+    credentials = {'username': 'hasher', 'password': 'pass12345'}
+    # Register and login draw on the same budget
+    resp = api_client.post(reverse('register'), {'username': 'new', 'email': 'new@example.com', 'password': 'pass12345'})
+    assert resp.status_code == status.HTTP_201_CREATED
+    assert api_client.post(reverse('token_obtain_pair'), credentials).status_code == status.HTTP_200_OK
+    assert api_client.post(reverse('token_obtain_pair'), credentials).status_code == status.HTTP_200_OK
+    resp = api_client.post(reverse('token_obtain_pair'), credentials)
+    assert resp.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert 0 < int(resp['Retry-After']) <= 20  # one token every 60 / 3 seconds
+    # Reset emails have their own budget
+    reset_url = reverse('password_reset_request')
+    assert api_client.post(reset_url, {'email': 'hasher@example.com'}).status_code == status.HTTP_200_OK
+    resp = api_client.post(reset_url, {'email': 'hasher@example.com'})
+    assert resp.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert int(resp['Retry-After']) == 3600
+    # Buckets are per client IP
+    other = APIClient(REMOTE_ADDR='10.0.0.2')
+    assert other.post(reverse('token_obtain_pair'), credentials).status_code == status.HTTP_200_OK
+
+@pytest.mark.django_db
+def test_password_hashes_are_upgraded_on_login(api_client, settings):
+    settings.PASSWORD_PBKDF2_ITERATIONS = 1000
+    user = User.objects.create_user(username='rehash', password='rehashpass1', email_verified=True)
+    assert user.password.startswith('pbkdf2_sha256$1000$')
+    settings.PASSWORD_PBKDF2_ITERATIONS = 2000
+    resp = api_client.post(reverse('token_obtain_pair'), {'username': 'rehash', 'password': 'rehashpass1'})
+    assert resp.status_code == status.HTTP_200_OK
+    user.refresh_from_db()
+    assert user.password.startswith('pbkdf2_sha256$2000$') and user.check_password('rehashpass1')
+
+@pytest.mark.django_db
+def test_full_hashing_pool_rejects_at_once(api_client, settings):
+    import threading
+    from .hashers import get_pool
+    settings.PASSWORD_HASHING_WORKERS = 1
+    settings.PASSWORD_HASHING_QUEUE = 0
+    User.objects.create_user(username='storm', password='stormpass1', email_verified=True)
+    release = threading.Event()
+    started = threading.Event()
+    def occupy():
+        started.set()
+        release.wait(10)
+    blocker = threading.Thread(target=get_pool().run, args=('verify', occupy))
+    blocker.start()
+    try:
+        started.wait(10)
+        resp = api_client.post(reverse('token_obtain_pair'), {'username': 'storm', 'password': 'stormpass1'})
+        assert resp.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert resp['Retry-After'] == '1'
+        resp = api_client.post(reverse('register'), {'username': 'new', 'email': 'new@example.com', 'password': 'pass12345'})
+        assert resp.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert not User.objects.filter(username='new').exists()
+    finally:
+        release.set()
+        blocker.join()
+    resp = api_client.post(reverse('token_obtain_pair'), {'username': 'storm', 'password': 'stormpass1'})
+    assert resp.status_code == status.HTTP_200_OK
@@ -22,7 +22,7 @@ urlpatterns = [
     path('google-login/', GoogleLoginAPIView.as_view(), name='google_login'),
     # Password reset endpoints
     path('reset-password/', PasswordResetRequestAPIView.as_view(), name='password_reset_request'),
-    path('reset-password-confirm/', PasswordResetConfirmAPIView.as_view(), name='password_reset_confirm'),
+    path('reset-password-confirm/<uidb64>/<token>/', PasswordResetConfirmAPIView.as_view(), name='password_reset_confirm'),
     # User profile update endpoint
     path('profile/', UserProfileUpdateAPIView.as_view(), name='profile_update'),
 ]
@@ -6,8 +6,8 @@ from rest_framework.views import APIView
 from django.contrib.auth import authenticate, get_user_model
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.encoding import force_bytes, force_str
-from django.core.mail import send_mail
 from django.conf import settings
+from django.db import transaction
 import requests
 from rest_framework.permissions import AllowAny
 from django.contrib.auth.tokens import default_token_generator
@@ -16,6 +16,11 @@ import os
 import random
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.decorators import permission_classes
+from tradez.profiling import track_http
+from tradez.metrics import GOOGLE_VERIFICATIONS
+from tradez.throttling import RouteThrottle, PasswordHashingThrottle, PasswordResetThrottle
+from .outbox import enqueue_email
+from .hashers import PasswordHashingBusy
 
 User = get_user_model()
 
@@ -48,6 +53,7 @@ def generate_witty_username():
 # --- User Registration Endpoint with Email Verification ---
 class RegisterAPIView(APIView):
     permission_classes = [AllowAny]
+    throttle_classes = [RouteThrottle, PasswordHashingThrottle]
     """Register a new user and send an email verification link."""
     def post(self, request):
         import logging
@@ -62,27 +68,31 @@ class RegisterAPIView(APIView):
         if User.objects.filter(username=username).exists() or User.objects.filter(email=email).exists():
             logger.warning("[Register] User with that username or email already exists.")
             return Response({'detail': 'User with that username or email already exists.'}, status=status.HTTP_400_BAD_REQUEST)
-        try:
-            user = User.objects.create_user(username=username, email=email, password=password, email_verified=False)
-            user.save()
-            logger.info(f"[Register] Created user {username} ({email})")
-        except Exception as e:
-            logger.error(f"[Register] Error creating user: {e}")
-            return Response({'detail': f'Error creating user: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        # Send email verification
-        try:
-            uid = urlsafe_base64_encode(force_bytes(user.pk))
-            token = default_token_generator.make_token(user)
-            verify_url = request.build_absolute_uri(reverse('verify_email', kwargs={'uidb64': uid, 'token': token}))
-            subject = 'Verify your email for Tradez'
-            message = f'Hi {username},\n\nPlease verify your email by clicking the link below:\n{verify_url}\n\nThank you!'
-            sender = os.getenv('EMAIL_HOST_USER', 'no-reply@example.com')
-            logger.info(f"[Register] Sending verification email to {email} via sender {sender}")
-            send_mail(subject, message, sender, [email], fail_silently=False)
-            logger.info(f"[Register] Verification email sent to {email}")
-        except Exception as e:
-            logger.error(f"[Register] Error sending verification email: {e}")
-            return Response({'detail': f'Error sending verification email: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        # The user and its verification email are committed together, or not at all
+        with transaction.atomic():
+            try:
+                user = User.objects.create_user(username=username, email=email, password=password, email_verified=False)
+                logger.info(f"[Register] Created user {username} ({email})")
+            except PasswordHashingBusy:
+                raise
+            except Exception as e:
+                transaction.set_rollback(True)
+                logger.error(f"[Register] Error creating user: {e}")
+                return Response({'detail': f'Error creating user: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            # Queue the verification email (delivered by the send_emails worker)
+            try:
+                uid = urlsafe_base64_encode(force_bytes(user.pk))
+                token = default_token_generator.make_token(user)
+                verify_url = request.build_absolute_uri(reverse('verify_email', kwargs={'uidb64': uid, 'token': token}))
+                subject = 'Verify your email for Tradez'
+                message = f'Hi {username},\n\nPlease verify your email by clicking the link below:\n{verify_url}\n\nThank you!'
+                sender = os.getenv('EMAIL_HOST_USER', 'no-reply@example.com')
+                enqueue_email('verification', subject, message, sender, [email])
+                logger.info(f"[Register] Queued verification email to {email} via sender {sender}")
+            except Exception as e:
+                transaction.set_rollback(True)  # no user without its verification email
+                logger.error(f"[Register] Error queueing verification email: {e}")
+                return Response({'detail': f'Error queueing verification email: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         return Response({'detail': 'Registration successful. Please check your email to verify your account.'}, status=status.HTTP_201_CREATED)
 
 # --- Custom JWT Token View with extra claims ---
@@ -98,6 +108,7 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
 
 class CustomTokenObtainPairView(TokenObtainPairView):
     serializer_class = CustomTokenObtainPairSerializer
+    throttle_classes = [RouteThrottle, PasswordHashingThrottle]
 
 # --- Email Verification Endpoint ---
 class VerifyEmailAPIView(APIView):
@@ -118,6 +129,7 @@ class VerifyEmailAPIView(APIView):
 # --- Password Reset Request Endpoint ---
 class PasswordResetRequestAPIView(APIView):
     permission_classes = [AllowAny]
+    throttle_classes = [RouteThrottle, PasswordResetThrottle]
     """Request a password reset email."""
     def post(self, request):
         email = request.data.get('email')
@@ -133,12 +145,13 @@ class PasswordResetRequestAPIView(APIView):
         subject = 'Reset your password for Tradez'
         message = f'Hi {user.username},\n\nPlease reset your password by clicking the link below:\n{reset_url}\n\nThank you!'
         sender = os.getenv('EMAIL_HOST_USER', 'no-reply@example.com')
-        send_mail(subject, message, sender, [email], fail_silently=False)
+        enqueue_email('password_reset', subject, message, sender, [email])
         return Response({'detail': 'Password reset email sent successfully.'}, status=status.HTTP_200_OK)
 
 # --- Password Reset Confirm Endpoint ---
 class PasswordResetConfirmAPIView(APIView):
     permission_classes = [AllowAny]
+    throttle_classes = [RouteThrottle, PasswordHashingThrottle]
     """Confirm password reset using uid and token from email link."""
     def post(self, request, uidb64, token):
         try:
@@ -158,6 +171,7 @@ class PasswordResetConfirmAPIView(APIView):
 # --- Google OAuth2 Login Endpoint ---
 class GoogleLoginAPIView(APIView):
     permission_classes = [AllowAny]
+    throttle_classes = [RouteThrottle]
     """Login or register user using Google OAuth2.
     
     GET without code: Initiates the OAuth flow by redirecting to Google's consent page
@@ -224,7 +238,8 @@ class GoogleLoginAPIView(APIView):
             'grant_type': 'authorization_code'
         }
         
-        token_response = requests.post(token_url, data=token_data)
+        with track_http('google'):
+            token_response = requests.post(token_url, data=token_data)
         if token_response.status_code != 200:
             error_message = f"Failed to exchange authorization code for tokens: {token_response.text}"
             print(error_message)  # Log the error
@@ -235,7 +250,9 @@ class GoogleLoginAPIView(APIView):
         
         # Get user info from the ID token
         user_info_url = f'https://oauth2.googleapis.com/tokeninfo?id_token={id_token}'
-        user_info_response = requests.get(user_info_url)
+        with track_http('google'):
+            user_info_response = requests.get(user_info_url)
+        GOOGLE_VERIFICATIONS.labels('valid' if user_info_response.status_code == 200 else 'invalid').inc()
         if user_info_response.status_code != 200:
             return Response({'detail': 'Failed to get user info from ID token.'}, status=status.HTTP_400_BAD_REQUEST)
             
@@ -284,7 +301,9 @@ class GoogleLoginAPIView(APIView):
             
         # Verify token with Google
         google_url = f'https://oauth2.googleapis.com/tokeninfo?id_token={token}'
-        resp = requests.get(google_url)
+        with track_http('google'):
+            resp = requests.get(google_url)
+        GOOGLE_VERIFICATIONS.labels('valid' if resp.status_code == 200 else 'invalid').inc()
         if resp.status_code != 200:
             return Response({'detail': 'Invalid Google token.'}, status=status.HTTP_400_BAD_REQUEST)
             